@@ -36,6 +36,7 @@ from beorn_lib.logging import Logging
 from beorn_lib.scm_tree import SCMTree
 from beorn_lib.tree_item import TreeItem
 from beorn_lib.source_tree import SourceTree
+from beorn_lib.compact_tree import CompactTree
 from beorn_lib.code_review import CodeReview
 from beorn_lib.nested_tree import NestedTree
 from beorn_lib.project_plan import ProjectPlan
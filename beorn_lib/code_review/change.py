@@ -28,6 +28,8 @@ from collections import namedtuple as namedtuple
 DummyChange = namedtuple('DummyChange', ['commit_id', 'timestamp', 'author', 'description', 'changes'])
 
 class Change(NestedTreeNode):
+	__slots__ = ('is_local', 'approver', 'approval_state', 'change_id', 'timestamp', 'author', 'description', 'votes')
+
 	@classmethod
 	def decode(cls, previous, decode_string, local):
 		parts = decode_string.split(',')
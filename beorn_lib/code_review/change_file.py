@@ -27,6 +27,8 @@ from collections import namedtuple as namedtuple
 DummyChangeItem	= namedtuple('DummyChangeItem', ['new_file', 'change_list'])
 
 class ChangeFile(NestedTreeNode):
+	__slots__ = ('is_local', 'name')
+
 	@classmethod
 	def decode(cls, previous, decode_string, local):
 		parts = decode_string.split(',')
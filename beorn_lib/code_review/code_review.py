@@ -25,6 +25,8 @@ from .change import Change
 from .comment import Comment
 
 class CodeReview(NestedTreeNode):
+	__slots__ = ('is_local', 'review_id', 'author', 'state', 'title', 'date')
+
 	CODE_REVIEW_STATUS_UNKNOWN		= 0
 	CODE_REVIEW_STATUS_OPEN			= 1
 	CODE_REVIEW_STATUS_APPROVED		= 2
@@ -22,6 +22,8 @@
 from beorn_lib.nested_tree import NestedTreeNode
 
 class Comment(NestedTreeNode):
+	__slots__ = ('is_local', 'user_name', 'time', 'line', 'side', 'comment_id', 'text')
+
 	last_comment_id = 1
 
 	@classmethod
@@ -25,6 +25,8 @@ from collections import namedtuple as namedtuple
 DummyHunk = namedtuple('DummyHunk', [ 'original_line', 'original_length', 'new_line', 'new_length', 'lines'])
 
 class Hunk(NestedTreeNode):
+	__slots__ = ('is_local', 'original_line', 'original_length', 'new_line', 'new_length', 'hunk_id', 'lines')
+
 	@classmethod
 	def decode(cls, parent, decode_string, local):
 		parts = decode_string.split(",")
@@ -25,6 +25,8 @@ from beorn_lib.nested_tree import NestedTreeNode
 from beorn_lib.code_review import CodeReview, Change, Comment, ChangeFile, Hunk
 
 class LocalReviewEngine(ReviewEngine):
+	__slots__ = ('directory',)
+
 	decode_jump_list = {'change':	Change,
 						'file':		ChangeFile,
 						'comment':	Comment,
@@ -43,6 +43,10 @@ def getSupportedEngines():
 	return result
 
 class ReviewEngine(NestedTree):
+	# there is only one engine per server and the engines add their own
+	# values, so the engines keep a __dict__.
+	__slots__ = ('is_dirty', '__dict__')
+
 	@classmethod
 	def getDefaultConfiguration(cls):
 		return {}
@@ -98,7 +102,7 @@ class ReviewEngine(NestedTree):
 		self.is_dirty = True
 
 	def clearDirty(self):
-		self.isDirty = False
+		self.is_dirty = False
 
 	def isDirty(self):
 		return self.is_dirty
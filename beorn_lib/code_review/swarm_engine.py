@@ -33,6 +33,8 @@ from .code_review import CodeReview
 from .review_engine import ReviewEngine, registerEngine
 
 class SwarmReviewEngine(ReviewEngine):
+	__slots__ = ('scm', 'server_url', 'perforce_server', 'as_author', 'user_group', 'user', 'working_directory', 'key')
+
 	def __init__(self, configuration, password_function=None):
 		super(SwarmReviewEngine, self).__init__(configuration, password_function)
 
@@ -0,0 +1,565 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: compact_tree
+#    desc: A compact, array based, version of the SourceTree.
+#
+#          Each SourceTree node is a full python object with its own dicts,
+#          for repositories with hundreds of thousands of files this uses a
+#          lot of memory. The CompactTree keeps the tree in flat arrays (one
+#          entry per node) and the nodes are only created as views on to the
+#          arrays when they are asked for. The views are NestedTreeNodes so the
+#          tree can be walked in the same way as the other trees.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import os
+from array import array
+from beorn_lib.source_tree import SourceTree
+from beorn_lib.nested_tree import NestedTreeNode
+
+# bits for the node state
+IS_DIR			= 0x01
+IS_LINK			= 0x02
+ON_FILESYSTEM	= 0x04
+IS_OPEN			= 0x08
+IS_LEAF			= 0x10
+
+NO_NODE = -1
+
+#---------------------------------------------------------------------------------
+# Local Classes
+#---------------------------------------------------------------------------------
+class CompactTree(object):
+	""" Compact Tree
+
+		The store for the tree. All the links between the nodes are indexes
+		in to the arrays, the names and flags are kept once in tables and the
+		nodes hold the index of the name and flag. Node 0 is the root of the
+		tree. The rarely used values (states and colours) are kept in dicts
+		only for the nodes that have them.
+	"""
+	def __init__(self, name, root=None):
+		self.names = []
+		self.name_ids = {}
+		self.flags = [None]
+		self.flag_ids = {None: 0}
+
+		self.name = array('i')
+		self.parent = array('i')
+		self.child = array('i')
+		self.last_child = array('i')
+		self.next = array('i')
+		self.prev = array('i')
+		self.flag = array('H')
+		self.bits = bytearray()
+
+		self.states = {}
+		self.colours = {}
+		self.child_cache = {}
+
+		if root is not None:
+			self.root = os.path.abspath(root)
+		else:
+			self.root = None
+
+		self.__newNode(name, 0)
+
+	def __len__(self):
+		return len(self.name)
+
+	def __internName(self, name):
+		""" [PRIVATE] returns the id of the name, adding it to the table if needed """
+		result = self.name_ids.get(name)
+
+		if result is None:
+			result = len(self.names)
+			self.names.append(name)
+			self.name_ids[name] = result
+
+		return result
+
+	def internFlag(self, flag):
+		""" Intern Flag
+
+			Returns the id of the flag, adding it to the table if needed.
+		"""
+		result = self.flag_ids.get(flag)
+
+		if result is None:
+			result = len(self.flags)
+			self.flags.append(flag)
+			self.flag_ids[flag] = result
+
+		return result
+
+	def __newNode(self, name, bits):
+		""" [PRIVATE] add a node with no links and return its index """
+		result = len(self.name)
+
+		self.name.append(self.__internName(name))
+		self.parent.append(NO_NODE)
+		self.child.append(NO_NODE)
+		self.last_child.append(NO_NODE)
+		self.next.append(NO_NODE)
+		self.prev.append(NO_NODE)
+		self.flag.append(0)
+		self.bits.append(bits)
+
+		return result
+
+	def node(self, index):
+		""" Node
+
+			Returns the view of the node at the index, or None if there is no node.
+		"""
+		if index == NO_NODE:
+			return None
+		else:
+			return CompactTreeNode(self, index)
+
+	def getRoot(self):
+		return CompactTreeNode(self, 0)
+
+	def getName(self, index):
+		return self.names[self.name[index]]
+
+	def findChild(self, index, name):
+		""" Find Child
+
+			Returns the index of the named child of the node or NO_NODE. The
+			children of the nodes that are searched are indexed by name, so only
+			the directories that are used pay for the index.
+		"""
+		children = self.child_cache.get(index)
+
+		if children is None:
+			children = {}
+			current = self.child[index]
+
+			while current != NO_NODE:
+				children.setdefault(self.names[self.name[current]], current)
+				current = self.next[current]
+
+			self.child_cache[index] = children
+
+		return children.get(name, NO_NODE)
+
+	def addChild(self, parent, name, bits):
+		""" Add Child
+
+			Adds a new node to the children of the parent keeping the children
+			in ascending name order. Returns the index of the new node.
+		"""
+		result = self.__newNode(name, bits)
+		self.parent[result] = parent
+
+		# find the child that the node goes before.
+		before = NO_NODE
+		last = self.last_child[parent]
+
+		if last != NO_NODE and name < self.names[self.name[last]]:
+			before = self.child[parent]
+
+			while before != NO_NODE and not name < self.names[self.name[before]]:
+				before = self.next[before]
+
+		if before == NO_NODE:
+			self.prev[result] = last
+			self.last_child[parent] = result
+
+			if last == NO_NODE:
+				self.child[parent] = result
+			else:
+				self.next[last] = result
+		else:
+			self.next[result] = before
+			self.prev[result] = self.prev[before]
+			self.prev[before] = result
+
+			if self.prev[result] == NO_NODE:
+				self.child[parent] = result
+			else:
+				self.next[self.prev[result]] = result
+
+		if parent in self.child_cache:
+			self.child_cache[parent].setdefault(name, result)
+
+		return result
+
+	def setFlag(self, index, flag):
+		""" Set Flag
+
+			Sets the flag on the node and raises the flag of the parents in the
+			same way as SourceTree.setFlag().
+		"""
+		flag_id = self.internFlag(flag)
+		self.flag[index] = flag_id
+
+		current = self.parent[index]
+
+		while current != NO_NODE:
+			current_flag = self.flags[self.flag[current]]
+
+			if current_flag is None or current_flag < flag:
+				self.flag[current] = flag_id
+				current = self.parent[current]
+			else:
+				break
+
+	def addSortedPaths(self, entries):
+		""" Add Sorted Paths
+
+			This function will add a list of paths to the tree, it takes the
+			same entries as SourceTree.addSortedPaths():
+
+				(path, flag, is_link, on_filesystem)
+
+			The entries should be sorted by path component as then the new nodes
+			are always added to the end of the children.
+		"""
+		stack = [0]
+		names = []
+
+		suffix_filter = SourceTree.getSuffixFilter()
+		directory_filter = SourceTree.getDirectoryFilter()
+
+		for (path, flag, is_link, on_filesystem) in entries:
+			if suffix_filter != [] and os.path.splitext(path)[1][1:] in suffix_filter:
+				continue
+
+			parts = path.split('/')
+
+			# reuse the part of the path that is the same as the last one.
+			common = 0
+			while common < len(names) and common < len(parts) and names[common] == parts[common]:
+				common += 1
+
+			del stack[common + 1:]
+			del names[common:]
+
+			for index in range(common, len(parts)):
+				part = parts[index]
+				parent = stack[-1]
+				last = self.last_child[parent]
+
+				if last != NO_NODE and self.names[self.name[last]] == part:
+					node = last
+
+				elif last == NO_NODE or self.names[self.name[last]] < part:
+					node = NO_NODE
+
+				else:
+					node = self.findChild(parent, part)
+
+				if node == NO_NODE:
+					if part in directory_filter:
+						break
+
+					if index != len(parts) - 1:
+						node = self.addChild(parent, part, IS_DIR)
+					else:
+						node = self.addChild(parent, part, 0)
+
+				stack.append(node)
+				names.append(part)
+			else:
+				node = stack[-1]
+
+				if is_link:
+					self.bits[node] |= IS_LINK
+				else:
+					self.bits[node] &= ~IS_LINK
+
+				if on_filesystem:
+					self.bits[node] |= ON_FILESYSTEM
+
+					# the directories that hold the item must be on the filesystem.
+					for parent in reversed(stack[1:-1]):
+						if self.bits[parent] & ON_FILESYSTEM:
+							break
+						self.bits[parent] |= ON_FILESYSTEM
+				else:
+					self.bits[node] &= ~ON_FILESYSTEM
+
+				if flag is not None:
+					self.setFlag(node, flag)
+
+class CompactTreeNode(NestedTreeNode):
+	""" Compact Tree Node
+
+		A view of a node in a CompactTree. The views are created when they are
+		needed and hold nothing but the tree and the index of the node, so two
+		views of the same node are equal but are not the same object. The links
+		are read only, the tree can only be changed though the CompactTree.
+	"""
+	__slots__ = ('tree', 'index')
+
+	def __init__(self, tree, index):
+		# the NestedTreeNode values are all properties of the view.
+		self.tree = tree
+		self.index = index
+
+	def __eq__(self, other):
+		return isinstance(other, CompactTreeNode) and self.tree is other.tree and self.index == other.index
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
+	def __hash__(self):
+		return hash((id(self.tree), self.index))
+
+	def __lt__(self, other):
+		if isinstance(other, CompactTreeNode):
+			return self.name < other.name
+		return NotImplemented
+
+	def __repr__(self):
+		return "CompactTreeNode(" + self.getPath() + ")"
+
+	def __contains__(self, other):
+		if isinstance(other, CompactTreeNode):
+			other = other.name
+
+		return self.tree.findChild(self.index, other) != NO_NODE
+
+	#---------------------------------------------------------------------------------
+	# The NestedTreeNode values.
+	#---------------------------------------------------------------------------------
+	@property
+	def next_node(self):
+		return self.tree.node(self.tree.next[self.index])
+
+	@property
+	def prev_node(self):
+		return self.tree.node(self.tree.prev[self.index])
+
+	@property
+	def parent_node(self):
+		return self.tree.node(self.tree.parent[self.index])
+
+	@property
+	def child_node(self):
+		return self.tree.node(self.tree.child[self.index])
+
+	@property
+	def last_child_node(self):
+		return self.tree.node(self.tree.last_child[self.index])
+
+	@property
+	def payload(self):
+		return self.name
+
+	@property
+	def is_sub_node(self):
+		return False
+
+	@property
+	def colour(self):
+		return self.tree.colours.get(self.index)
+
+	@colour.setter
+	def colour(self, colour):
+		self.tree.colours[self.index] = colour
+
+	def __getBit(self, bit):
+		return (self.tree.bits[self.index] & bit) != 0
+
+	def __setBit(self, bit, state):
+		if state:
+			self.tree.bits[self.index] |= bit
+		else:
+			self.tree.bits[self.index] &= ~bit
+
+	@property
+	def open(self):
+		return self.__getBit(IS_OPEN)
+
+	@open.setter
+	def open(self, state):
+		self.__setBit(IS_OPEN, state)
+
+	@property
+	def is_leaf(self):
+		return self.__getBit(IS_LEAF)
+
+	@is_leaf.setter
+	def is_leaf(self, state):
+		self.__setBit(IS_LEAF, state)
+
+	#---------------------------------------------------------------------------------
+	# The SourceTree values.
+	#---------------------------------------------------------------------------------
+	@property
+	def name(self):
+		return self.tree.names[self.tree.name[self.index]]
+
+	@property
+	def root(self):
+		if self.index == 0:
+			return self.tree.root
+		else:
+			return None
+
+	@property
+	def is_dir(self):
+		return self.__getBit(IS_DIR)
+
+	@is_dir.setter
+	def is_dir(self, state):
+		self.__setBit(IS_DIR, state)
+
+	@property
+	def is_link(self):
+		return self.__getBit(IS_LINK)
+
+	@is_link.setter
+	def is_link(self, state):
+		self.__setBit(IS_LINK, state)
+
+	@property
+	def on_filesystem(self):
+		return self.__getBit(ON_FILESYSTEM)
+
+	@on_filesystem.setter
+	def on_filesystem(self, state):
+		self.__setBit(ON_FILESYSTEM, state)
+
+	@property
+	def flag(self):
+		return self.tree.flags[self.tree.flag[self.index]]
+
+	@property
+	def item_state(self):
+		return self.tree.states.get(self.index, {})
+
+	#---------------------------------------------------------------------------------
+	# The SourceTree API.
+	#---------------------------------------------------------------------------------
+	def getName(self):
+		return self.name
+
+	def isDir(self):
+		return self.is_dir
+
+	def isLink(self):
+		return self.is_link
+
+	def isOnFilesystem(self):
+		return self.on_filesystem
+
+	def isOnFileSystem(self):
+		return self.on_filesystem
+
+	def getFlag(self):
+		return self.flag
+
+	def setFlag(self, flag):
+		self.tree.setFlag(self.index, flag)
+
+	def updateItemState(self, name, state):
+		self.tree.states.setdefault(self.index, {})[name] = state
+
+		# We have been changed, so all parents have to be modified.
+		self.setFlag('M')
+
+	def removeItemState(self, name):
+		states = self.tree.states.get(self.index)
+
+		if states is not None and name in states:
+			del states[name]
+
+			if len(states) == 0:
+				del self.tree.states[self.index]
+
+	def hasState(self):
+		return self.index in self.tree.states
+
+	def getState(self, scm_name=None):
+		result = None
+
+		if scm_name is not None:
+			result = self.item_state.get(scm_name)
+		else:
+			result = self.item_state
+
+		return result
+
+	def getChilden(self):
+		tree = self.tree
+		current = tree.child[self.index]
+
+		while current != NO_NODE:
+			yield CompactTreeNode(tree, current)
+			current = tree.next[current]
+
+	def findChild(self, other):
+		if isinstance(other, CompactTreeNode):
+			other = other.name
+
+		return self.tree.node(self.tree.findChild(self.index, other))
+
+	def getPath(self, full=False):
+		""" Get Path
+
+			Returns the path of the item, in the same form as SourceTree.getPath().
+		"""
+		tree = self.tree
+
+		if self.index == 0 and tree.root is not None:
+			result = tree.root
+		else:
+			parts = []
+			current = self.index
+
+			while current != 0:
+				parts.append(tree.names[tree.name[current]])
+				current = tree.parent[current]
+
+			if full and tree.root is not None:
+				parts.append(tree.root)
+			else:
+				parts.append(tree.names[tree.name[0]])
+
+			result = os.path.join(*reversed(parts))
+
+		return result
+
+	def findItemNode(self, path):
+		""" Find Item Node
+
+			Returns the view of the node at the path, or None.
+		"""
+		if self.root is not None and self.root == path:
+			result = self
+		else:
+			if self.root is not None and path.startswith(self.root):
+				path = os.path.relpath(path, self.root)
+
+			result = self
+
+			for part in os.path.normpath(path).split(os.sep):
+				if part in ('', '.'):
+					continue
+
+				result = result.findChild(part)
+
+				if result is None:
+					break
+
+		return result
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
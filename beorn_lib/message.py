@@ -23,13 +23,16 @@ from base64 import b64encode, b64decode
 from beorn_lib.nested_tree import NestedTreeNode
 
 class Message(NestedTreeNode):
+	__slots__ = ('mid', 'name', 'date', 'user', 'parent_id', 'reference', 'message', 'user_id')
+
 	def __init__(self, mid = None, name = None, date = None, user = None, parent_id = None, reference = None, message = None):
 		super(Message, self).__init__(name, None)
 
 		self.mid=mid
 		self.name=name
 		self.date=date
-		self.user=user_id
+		self.user=user
+		self.user_id=None
 		self.parent_id=parent_id
 		self.reference=reference
 		self.message=message
@@ -22,6 +22,8 @@ class NestedTree (NestedTreeNode):
 		The tree is nested, that is each node is allowed to have a sub-tree that
 		is independent of the rest of the tree.
 	"""
+	__slots__ = ()
+
 	def __init__(self):
 		super(NestedTree, self).__init__()
 
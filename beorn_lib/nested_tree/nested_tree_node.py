@@ -21,6 +21,7 @@
 
 class NestedTreeNode (object):
 	""" This is the node for the tree """
+	__slots__ = ('next_node', 'prev_node', 'parent_node', 'open', 'is_sub_node', 'child_node', 'last_child_node', 'payload', 'colour', 'is_leaf')
 
 	# constants for tree walking
 	DIRECTION_UP	= 1
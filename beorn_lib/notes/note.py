@@ -29,6 +29,7 @@ from beorn_lib.nested_tree import NestedTreeNode
 #---------------------------------------------------------------------------------
 class Note(NestedTreeNode):
 	""" Note class """
+	__slots__ = ('name', 'message', 'versions', 'subject', 'amended', 'checksum', 'date')
 
 	#---------------------------------------------------------------------------------
 	# class Methods
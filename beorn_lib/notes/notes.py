@@ -31,6 +31,7 @@ from beorn_lib.nested_tree import NestedTreeNode
 #---------------------------------------------------------------------------------
 class Notes(NestedTreeNode):
 	""" Notes class """
+	__slots__ = ('name', 'current_user', 'current_machine', 'current_id', 'directory')
 
 	def __init__(self, name, directory):
 		super(Notes, self).__init__(name, None)
@@ -29,6 +29,7 @@ from beorn_lib.nested_tree import NestedTreeNode
 #---------------------------------------------------------------------------------
 class Subject(NestedTreeNode):
 	""" Subject class """
+	__slots__ = ('name',)
 
 	def __init__(self, name):
 		super(Subject, self).__init__(name, None)
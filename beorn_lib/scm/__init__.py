@@ -21,9 +21,15 @@ from .scm import new
 from .scm import create
 from .scm import getSupportedSCMs
 from .scm import findRepositories
+from .scm import findRepositoryRoot
+from .scm import clearDiscoveryCache
 from .scmp4 import SCM_P4
 from .scmgit import SCM_GIT
 from .scmbase import SCM_BASE
 from .bigraph import BIGRAPH
+from .aio import AsyncSCM
+from .scm_cache import SCMCache, CachedSCM
+from .multi_repo import MultiRepo, MultiRepoResult
+from .diff_buffer import parseUnifiedDiffBuffer, parseUnifiedDiffStream, UnifiedDiffParser, DiffLines, DiffChanges
 
-from .scm import ChangeList, Commit, Branch, Tag, Change, HistoryItem, ChangeItem, SCMItem, SCMStatus, SupportedSCM, startLocalServer, stopLocalServer, Details
+from .scm import ChangeList, Commit, Branch, Tag, Ref, Change, HistoryItem, ChangeItem, SCMItem, SCMStatus, StatusEntry, StatusSnapshot, SupportedSCM, startLocalServer, stopLocalServer, Details
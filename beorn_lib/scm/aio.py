@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: aio
+#    desc: asyncio versions of the SCM query functions.
+#
+#          The SCM classes block the caller until the scm command has finished.
+#          The classes here wrap a SCM object and give awaitable versions of
+#          the query functions. The commands are run with
+#          asyncio.create_subprocess_exec() and the output is decoded with the
+#          same functions that the SCM classes use, so the results are the
+#          same. If the awaiting task is cancelled then the scm process is
+#          killed.
+#
+#          The number of scm processes that can be running at the same time is
+#          limited by max_concurrent.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import sys
+import asyncio
+import subprocess
+from . import scm
+from . import scmgit
+from . import scmp4
+
+CREATE_NO_WINDOW = 0x08000000
+
+#---------------------------------------------------------------------------------
+# Global Functions
+#---------------------------------------------------------------------------------
+def new(scm_object, max_concurrent=4):
+	""" New
+
+		Returns the async wrapper for the given SCM object.
+	"""
+	if isinstance(scm_object, scmgit.SCM_GIT):
+		return AsyncGit(scm_object, max_concurrent)
+
+	elif isinstance(scm_object, scmp4.SCM_P4):
+		return AsyncP4(scm_object, max_concurrent)
+
+	else:
+		return AsyncSCM(scm_object, max_concurrent)
+
+#---------------------------------------------------------------------------------
+# Local Classes
+#---------------------------------------------------------------------------------
+class AsyncSCM(object):
+	""" Async SCM
+
+		This is the base (and default) async wrapper. The SCMs that do not have
+		an async version of a function have the blocking function run in the
+		loop's default executor, so the loop is not blocked.
+	"""
+	def __init__(self, scm_object, max_concurrent=4):
+		self.scm = scm_object
+		self.max_concurrent = max_concurrent
+		self.semaphore = asyncio.Semaphore(max_concurrent)
+		self.processes = set()
+
+	def getSCM(self):
+		return self.scm
+
+	async def runCommand(self, command_list, env=None):
+		""" Run Command
+
+			This function will run the command and return a tuple of the status
+			of the command and the output (as bytes). If the task is cancelled
+			the process is killed before the CancelledError is passed on.
+		"""
+		async with self.semaphore:
+			try:
+				if sys.platform == 'win32':
+					process = await asyncio.create_subprocess_exec(*command_list,
+											stdout=subprocess.PIPE,
+											stderr=subprocess.DEVNULL,
+											env=env,
+											creationflags=CREATE_NO_WINDOW)
+				else:
+					process = await asyncio.create_subprocess_exec(*command_list,
+											stdout=subprocess.PIPE,
+											stderr=subprocess.DEVNULL,
+											env=env)
+			except OSError:
+				return (False, b'')
+
+			self.processes.add(process)
+
+			try:
+				(output, _) = await process.communicate()
+
+			except asyncio.CancelledError:
+				if process.returncode is None:
+					process.kill()
+
+				await process.wait()
+				raise
+
+			finally:
+				self.processes.discard(process)
+
+		return (process.returncode == 0, output)
+
+	async def _blocking(self, function, *args):
+		""" [PRIVATE] run a blocking SCM function in the default executor. """
+		async with self.semaphore:
+			return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+	def close(self):
+		""" Close
+
+			Kill any of the scm processes that are still running.
+		"""
+		for process in list(self.processes):
+			if process.returncode is None:
+				process.kill()
+
+	async def getBranch(self):
+		return await self._blocking(self.scm.getBranch)
+
+	async def getCurrentVersion(self):
+		return await self._blocking(self.scm.getCurrentVersion)
+
+	async def getHistory(self, filename=None, version=None, max_entries=None):
+		return await self._blocking(self.scm.getHistory, filename, version, max_entries)
+
+	async def getCommitList(self):
+		return await self._blocking(self.scm.getCommitList)
+
+	async def getTreeChanges(self, from_version = None, to_version = None, path = None, check_server=False):
+		return await self._blocking(self.scm.getTreeChanges, from_version, to_version, path, check_server)
+
+	async def getTags(self):
+		return await self._blocking(self.scm.getTags)
+
+	async def getBranches(self):
+		return await self._blocking(self.scm.getBranches)
+
+	async def getRefs(self):
+		return await self._blocking(self.scm.getRefs)
+
+	async def getStatusSnapshot(self, path = None):
+		return await self._blocking(self.scm.getStatusSnapshot, path)
+
+	async def isRepositoryClean(self):
+		return await self._blocking(self.scm.isRepositoryClean)
+
+	async def sync(self, pull = True, push = False):
+		return await self._blocking(self.scm.sync, pull, push)
+
+class AsyncGit(AsyncSCM):
+	""" Async Git
+
+		The git commands are built by the SCM_GIT object so they use the same
+		repository and version as the wrapped object.
+	"""
+	async def __callGit(self, command):
+		""" [PRIVATE] the async version of SCM_GIT.__callGit() """
+		(status, output) = await self.runCommand(self.scm.buildCommand(command))
+
+		if status:
+			return (True, output.decode(errors='replace'))
+		else:
+			return (False, '')
+
+	async def getBranch(self):
+		(_, output) = await self.__callGit(["rev-parse", "--abbrev-ref", "HEAD"])
+		return output.strip('\n')
+
+	async def getCurrentVersion(self):
+		(status, output) = await self.__callGit(["describe", "--abbrev=0"])
+
+		if status:
+			result = output
+
+		else:
+			(status, output) = await self.__callGit(["rev-parse", "--abbrev-ref", "HEAD"])
+
+			if status and output != "HEAD":
+				result = output.strip('\n')
+
+			else:
+				(status, output) = await self.__callGit(["rev-parse", "--short", "HEAD"])
+
+				if status:
+					result = output
+				else:
+					result = ''
+
+		return result.strip()
+
+	async def getHistory(self, filename=None, version=None, max_entries=None):
+		result = []
+
+		(_, output) = await self.__callGit(self.scm.historyCommand(filename, version, max_entries))
+
+		for line in output.splitlines():
+			item = scmgit.decodeHistoryLine(line)
+
+			if item is not None:
+				result.append(item)
+
+		return result
+
+	async def getCommitList(self):
+		result = []
+
+		(_, output) = await self.__callGit(scmgit.SCM_GIT.commit_list_command)
+
+		for line in output.splitlines():
+			item = scmgit.decodeCommitLine(line)
+
+			if item is not None:
+				result.append(item)
+
+		return result
+
+	async def getStatusSnapshot(self, path = None):
+		(status, output) = await self.runCommand(self.scm.buildCommand(self.scm.statusCommand(path)))
+
+		if status:
+			return scmgit.decodeStatusSnapshot(output)
+		else:
+			return None
+
+	async def getTreeChanges(self, from_version = None, to_version = None, path = None, check_server=False):
+		result = []
+
+		if from_version is None and to_version is None:
+			snapshot = await self.getStatusSnapshot(path)
+
+			if snapshot is not None:
+				result = scmgit.statusTreeChanges(snapshot)
+
+			return result
+
+		(git_command, new_files) = self.scm.treeChangesCommands(from_version, to_version, path)
+
+		if new_files is None:
+			(_, output) = await self.__callGit(git_command)
+			new_output = ''
+		else:
+			((_, output), (_, new_output)) = await asyncio.gather(self.__callGit(git_command), self.__callGit(new_files))
+
+		for line in output.splitlines():
+			item = scmgit.decodeTreeChangeLine(line)
+
+			if item is not None:
+				result.append(item)
+
+		for file_name in new_output.splitlines():
+			result.append(scm.SCMStatus('A', file_name))
+
+		return result
+
+	async def getTags(self):
+		(status, output) = await self.__callGit(self.scm.tagsCommand())
+
+		if status:
+			return scmgit.decodeTags(output)
+		else:
+			return (-1, [])
+
+	async def getBranches(self, remotes=True):
+		(status, output) = await self.__callGit(self.scm.branchesCommand(remotes))
+
+		if status:
+			return scmgit.decodeBranches(output)
+		else:
+			return (-1, [])
+
+	async def getRefs(self):
+		(status, output) = await self.__callGit(self.scm.refsCommand())
+
+		if status:
+			return scmgit.decodeRefs(output)
+		else:
+			return []
+
+	async def isRepositoryClean(self):
+		snapshot = None
+		(status, output) = await self.runCommand(self.scm.buildCommand(self.scm.cleanCommand()))
+
+		if status:
+			snapshot = scmgit.decodeStatusSnapshot(output)
+
+		return (snapshot is not None and
+				snapshot.commit_id is not None and
+				len(snapshot.staged) == 0 and
+				len(snapshot.unstaged) == 0 and
+				len(snapshot.conflicted) == 0)
+
+	async def sync(self, pull = True, push = True):
+		status = False
+
+		if pull:
+			(status, _) = await self.__callGit(['pull'])
+
+		if (not pull) or (status and push):
+			(status, _) = await self.__callGit(['push'])
+
+		return status
+
+class AsyncP4(AsyncSCM):
+	""" Async P4
+
+		The p4 commands are run with -G and the objects are decoded as the sync
+		versions do. The login is checked (once) with "p4 login -s", if that
+		fails the blocking login of the SCM_P4 object is used as it may need to
+		ask for the password.
+	"""
+	def __init__(self, scm_object, max_concurrent=4):
+		super(AsyncP4, self).__init__(scm_object, max_concurrent)
+		self.logged_in = False
+
+	async def __login(self):
+		""" [PRIVATE] check that the user is logged in.
+
+			The check uses the same p4 settings as the other commands.
+		"""
+		if not self.logged_in:
+			(self.logged_in, _) = await self.runCommand(self.scm.buildCommand(True) + ['login', '-s'], self.scm.environ)
+
+			if not self.logged_in:
+				self.logged_in = (await self._blocking(self.scm.getUserKey, self.scm.user_name)) is not None
+
+		return self.logged_in
+
+	async def __p4ObjectCommand(self, command_list, use_client=True):
+		""" [PRIVATE] run the command and return (status, objects). """
+		if await self.__login():
+			(status, output) = await self.runCommand(self.scm.buildCommand(use_client, True) + command_list, self.scm.environ)
+
+			if status:
+				return (True, scmp4.decodeObjects(output))
+
+		return (False, [])
+
+	async def getBranch(self):
+		return self.scm.getBranch()
+
+	async def getCurrentVersion(self):
+		return self.scm.getCurrentVersion()
+
+	async def getHistory(self, filename=None, version=None, max_entries=None):
+		(status, objects) = await self.__p4ObjectCommand(self.scm.historyCommand(filename, version, max_entries))
+
+		if status:
+			return [scm.HistoryItem(obj['change'], obj['desc'], obj['time'], None, None) for obj in objects if 'change' in obj]
+		else:
+			return None
+
+	async def getCommitList(self):
+		return await self.getHistory()
+
+	async def getTreeChanges(self, from_version = None, to_version = None, path = None, check_server=False):
+		result = None
+
+		if check_server is True:
+			result = []
+
+			commands = [self.__p4ObjectCommand(command) for command in self.scm.treeChangeCommands()]
+
+			for (_, objects) in await asyncio.gather(*commands):
+				for obj in objects:
+					self.scm.treeChangeFunction(result, obj)
+
+		return result
+
+	async def getTags(self):
+		return self.scm.getTags()
+
+	async def getBranches(self):
+		(status, objects) = await self.__p4ObjectCommand(['branches'])
+
+		return (status, [scm.Branch(None, obj['branch'], None, None) for obj in objects if 'branch' in obj])
+
+	async def isRepositoryClean(self):
+		return self.scm.isRepositoryClean()
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
@@ -23,22 +23,71 @@
 #---------------------------------------------------------------------------------
 
 from . import scm
+import os
+import heapq
+import array
+import marshal
+import itertools
 import collections
 from .bigraph_entry import BiGraphEntry as BiGraphEntry
+from .bigraph_entry import BiGraphIndex as BiGraphIndex
+from .bigraph_entry import BiGraphNodes as BiGraphNodes
+from .bigraph_layout import BiGraphLayout as BiGraphLayout
 from .bigraph_search_element import BiGraphSearchElement as BiGraphSearchElement
 
 #---------------------------------------------------------------------------------
 # Module functions.
 #---------------------------------------------------------------------------------
+def buildAdjacency(count, from_nodes, to_nodes):
+	""" Build Adjacency
 
-class BIGRAPH(object):
-	""" Bi-Directional Class """
-	def __init__(self, nodes = None, branches = None, tags = None):
-		if nodes is None:
-			self.nodes = {}
-		else:
-			self.nodes = nodes
+		This function builds the compressed (CSR) adjacency arrays for the edges
+		from_nodes[n] -> to_nodes[n]. It returns the (offsets, targets) arrays,
+		the edges of node n are targets[offsets[n]:offsets[n+1]] and they are
+		kept in the order that they were given.
+	"""
+	counts = [0] * count
+
+	for node in from_nodes:
+		counts[node] += 1
+
+	offsets = list(itertools.accumulate(counts, initial=0))
+	position = offsets[:-1]
+	targets = [0] * len(from_nodes)
+
+	for (node, target) in zip(from_nodes, to_nodes):
+		targets[position[node]] = target
+		position[node] += 1
 
+	return (array.array('i', offsets), array.array('i', targets))
+
+def splitStrings(joined, count):
+	""" Split Strings
+
+		Split the strings that were joined with '\0' by BIGRAPH.save().
+	"""
+	if count == 0:
+		return []
+	else:
+		return joined.split('\0')
+
+class BIGRAPH(object):
+	""" Bi-Directional Class
+
+		The commits are numbered in the order that they are first seen, and the
+		graph is held as arrays of these numbers. The parents of node n are
+		parent_ids[parent_offsets[n]:parent_offsets[n+1]] (in the order the scm
+		gave them) and the children are held the same way. The BiGraphEntry
+		objects in nodes and index are views of the arrays.
+	"""
+	GRAPH_FILE_NAME		= 'beorn_bigraph'
+	GRAPH_FILE_VERSION	= 1
+
+	# the arrays that are saved in the graph file
+	graph_arrays = ('edge_child', 'edge_parent', 'parent_offsets', 'parent_ids', 'child_offsets', 'child_ids')
+
+	def __init__(self, branches = None, tags = None):
+		# the branches and the tags are both name -> commit_id.
 		if branches is None:
 			self.branches = {}
 		else:
@@ -49,82 +98,405 @@ class BIGRAPH(object):
 		else:
 			self.tags = tags
 
-		self.head = None		# the root commit of the graph
-		self.index = []			# the ordered list of the graph entries
+		self.remote_branches = {}		# "remote/branch" -> commit_id
+		self.head = None				# the root commit of the graph
+		self.ids = {}					# commit_id -> node
+		self.commit_ids = []			# node -> commit_id
+		self.descriptions = []			# node -> description
+		self.node_tags = {}				# node -> tag names
+		self.node_branches = {}			# node -> branch names
+		self.recorded = bytearray()		# node -> 1 if the commit has been added
+		self.tips = set()				# the commits of the references when it was built
+		self.generations = None			# node -> generation, made when first needed
+
+		# the edges child -> parent, in the order that they were added.
+		self.edge_child = array.array('i')
+		self.edge_parent = array.array('i')
+
+		self.parent_offsets = array.array('i', [0])
+		self.parent_ids = array.array('i')
+		self.child_offsets = array.array('i', [0])
+		self.child_ids = array.array('i')
+
+		self.nodes = BiGraphNodes(self)		# commit_id -> BiGraphEntry
+		self.index = BiGraphIndex(self)		# the ordered list of the graph entries
 
 	# class worker functions
-	def addEntry(self, commit_id):
-		new_entry = BiGraphEntry(commit_id, [], [], [], [], '')
+	def addNode(self, commit_id):
+		""" Add Node
+
+			Returns the node number for the commit, adding it if it is new.
+		"""
+		node = self.ids.get(commit_id)
+
+		if node is None:
+			node = len(self.commit_ids)
+			self.ids[commit_id] = node
+			self.commit_ids.append(commit_id)
+			self.descriptions.append('')
+			self.recorded.append(0)
+
+		return node
+
+	def addCommits(self, commit_list):
+		""" Add Commits
+
+			Add the Commits to the graph and rebuild the adjacency arrays. The
+			parents of a commit do not have to have been added first, and the
+			commits that are already in the graph are ignored.
+		"""
+		ids = self.ids
+		recorded = self.recorded
+		edge_child = self.edge_child
+		edge_parent = self.edge_parent
+		edge_count = len(edge_child)
+
+		for commit in commit_list:
+			node = ids.get(commit.commit_id)
+
+			if node is None:
+				node = self.addNode(commit.commit_id)
+
+			elif recorded[node]:
+				continue
+
+			recorded[node] = 1
+
+			if commit.parents == []:
+				self.head = commit.commit_id
+
+			self.descriptions[node] = commit.description
+
+			for pid in commit.parents:
+				parent = ids.get(pid)
+
+				if parent is None:
+					parent = self.addNode(pid)
+
+				edge_child.append(node)
+				edge_parent.append(parent)
+
+		count = len(self.commit_ids)
+
+		if len(edge_child) == edge_count and len(self.parent_offsets) == count + 1:
+			# nothing has been connected, the arrays are still good.
+			return
+
+		(self.parent_offsets, self.parent_ids) = buildAdjacency(count, edge_child, edge_parent)
+		(self.child_offsets, self.child_ids) = buildAdjacency(count, edge_parent, edge_child)
+		self.generations = None
+
+	def attachReferences(self):
+		""" Attach References
+
+			Attach the tags and the branches to the nodes of the graph, the remote
+			branches are attached as branches named "remote/branch".
+		"""
+		self.node_tags = {}
+		self.node_branches = {}
+
+		for (tag, commit_id) in self.tags.items():
+			if commit_id in self.ids:
+				self.node_tags.setdefault(self.ids[commit_id], []).append(tag)
+
+		for branches in [self.branches, self.remote_branches]:
+			for (branch, commit_id) in branches.items():
+				if commit_id in self.ids:
+					self.node_branches.setdefault(self.ids[commit_id], []).append(branch)
+
+	def parentNodes(self, node):
+		return self.parent_ids[self.parent_offsets[node]:self.parent_offsets[node + 1]]
+
+	def childNodes(self, node):
+		return self.child_ids[self.child_offsets[node]:self.child_offsets[node + 1]]
+
+	def getGenerations(self):
+		""" Get Generations
+
+			Returns the generation number of each of the nodes. A commit without
+			parents has the generation 1, the others have one more than the
+			largest generation of their parents. So an ancestor always has a
+			smaller generation than the commit, and commits with the same
+			generation cannot be ancestors of each other.
+		"""
+		if self.generations is None:
+			count = len(self.commit_ids)
+			parent_offsets = self.parent_offsets
+			child_offsets = self.child_offsets
+			child_ids = self.child_ids
+
+			remaining = [parent_offsets[node + 1] - parent_offsets[node] for node in range(count)]
+			generations = [1] * count
+			ready = [node for node in range(count) if remaining[node] == 0]
 
-		# add the node the node dictionary
-		self.nodes[commit_id] = new_entry
-		self.index.append(new_entry)
+			# walk down from the roots, a node is ready when all its parents are done.
+			while len(ready) > 0:
+				node = ready.pop()
+				generation = generations[node] + 1
 
-		return new_entry
+				for child in child_ids[child_offsets[node]:child_offsets[node + 1]]:
+					if generations[child] < generation:
+						generations[child] = generation
 
-	def updateEntry(self, entry, commit):
-		result = True
+					remaining[child] -= 1
 
-		if commit.parents == []:
-			self.head = commit.commit_id
+					if remaining[child] == 0:
+						ready.append(child)
 
-		entry.description = commit.description
+			self.generations = array.array('i', generations)
 
-		for pid in commit.parents:
-			parent = self.nodes.get(pid)
+		return self.generations
 
-			if parent is None:
-				parent = self.addEntry(pid)
+	def isAncestor(self, ancestor, commit):
+		""" Is Ancestor
 
-			# connect the node to parents
-			entry.parents.append(parent)
-			parent.children.append(entry)
+			Returns True if the ancestor commit can be reached from the commit (a
+			commit is its own ancestor). The walk does not go past the
+			generation of the ancestor.
+		"""
+		target = self.ids[ancestor]
+		start = self.ids[commit]
+		generations = self.getGenerations()
+		parent_offsets = self.parent_offsets
+		parent_ids = self.parent_ids
+
+		limit = generations[target]
+		result = (target == start)
+
+		if not result and generations[start] > limit:
+			visited = bytearray(len(self.commit_ids))
+			visited[start] = 1
+			search_list = [start]
+
+			while len(search_list) > 0 and not result:
+				node = search_list.pop()
+
+				for parent in parent_ids[parent_offsets[node]:parent_offsets[node + 1]]:
+					if parent == target:
+						result = True
+						break
+
+					if not visited[parent] and generations[parent] > limit:
+						visited[parent] = 1
+						search_list.append(parent)
+
+		return result
+
+	def commonAncestors(self, commit_list):
+		""" Common Ancestors
+
+			Returns the best common ancestors of the commits (as "git merge-base
+			--all --octopus" does), these are the commits that can be reached from
+			all the commits and are not an ancestor of another one of them. The
+			result is in generation order, the newest first.
+
+			The commits are walked in generation order, each commit has a bit
+			for each of the start commits that can reach it. When a commit has
+			all the bits it is a result, and its ancestors are marked as stale.
+			The walk stops when there is nothing but stale commits left.
+		"""
+		generations = self.getGenerations()
+		parent_offsets = self.parent_offsets
+		parent_ids = self.parent_ids
+
+		all_found = (1 << len(commit_list)) - 1
+		stale = 1 << len(commit_list)
+		flags = {}
+		queue = []
+		active = 0
+		result = []
+
+		for (index, commit_id) in enumerate(commit_list):
+			node = self.ids[commit_id]
+
+			if node not in flags:
+				heapq.heappush(queue, (-generations[node], node))
+				active += 1
+
+			flags[node] = flags.get(node, 0) | (1 << index)
+
+		while active > 0:
+			(_, node) = heapq.heappop(queue)
+			node_flags = flags[node]
+
+			if node_flags & stale == 0:
+				active -= 1
+
+				if node_flags == all_found:
+					result.append(self.commit_ids[node])
+					node_flags |= stale
+					flags[node] = node_flags
+
+			for parent in parent_ids[parent_offsets[node]:parent_offsets[node + 1]]:
+				parent_flags = flags.get(parent, 0)
+
+				if parent_flags | node_flags != parent_flags:
+					if parent_flags == 0:
+						heapq.heappush(queue, (-generations[parent], parent))
+
+						if node_flags & stale == 0:
+							active += 1
+
+					elif parent_flags & stale == 0 and node_flags & stale != 0:
+						# it was going to be searched, it is now stale.
+						active -= 1
+
+					flags[parent] = parent_flags | node_flags
+
+		return result
+
+	def save(self, file_name):
+		""" Save
+
+			Save the graph to the file. The file is written to a temporary file
+			first so a reader will never see half a graph. The strings are saved
+			as one string each, as that is much faster to load than a list.
+		"""
+		contents = {'version': BIGRAPH.GRAPH_FILE_VERSION,
+					'itemsize': self.edge_child.itemsize,
+					'head': self.head,
+					'tips': sorted(self.tips),
+					'count': len(self.commit_ids),
+					'commit_ids': '\0'.join(self.commit_ids),
+					'descriptions': '\0'.join(self.descriptions),
+					'recorded': bytes(self.recorded)}
+
+		for name in BIGRAPH.graph_arrays:
+			contents[name] = getattr(self, name).tobytes()
+
+		temp_name = file_name + '.' + str(os.getpid())
+
+		try:
+			with open(temp_name, 'wb') as f:
+				marshal.dump(contents, f)
+
+			os.replace(temp_name, file_name)
+			result = True
+
+		except OSError:
+			result = False
+
+			if os.path.exists(temp_name):
+				os.remove(temp_name)
 
 		return result
 
 	@classmethod
-	def buildGraph(cls, scm_instance):
+	def load(cls, file_name):
+		""" Load
+
+			Load the graph from a file made by save(). It returns None if the
+			file does not exist or cannot be used.
+		"""
+		result = None
+
+		try:
+			with open(file_name, 'rb') as f:
+				contents = marshal.load(f)
+
+			if (contents.get('version') == BIGRAPH.GRAPH_FILE_VERSION and
+					contents.get('itemsize') == array.array('i').itemsize):
+				result = BIGRAPH()
+				result.head = contents['head']
+				result.tips = set(contents['tips'])
+				result.commit_ids = splitStrings(contents['commit_ids'], contents['count'])
+				result.descriptions = splitStrings(contents['descriptions'], contents['count'])
+				result.recorded = bytearray(contents['recorded'])
+				result.ids = dict(zip(result.commit_ids, range(len(result.commit_ids))))
+
+				for name in BIGRAPH.graph_arrays:
+					value = array.array('i')
+					value.frombytes(contents[name])
+					setattr(result, name, value)
+
+				if (len(result.parent_offsets) != len(result.commit_ids) + 1 or
+						len(result.descriptions) != len(result.commit_ids)):
+					result = None
+
+		except (OSError, EOFError, ValueError, TypeError, KeyError, AttributeError):
+			result = None
+
+		return result
+
+	@classmethod
+	def cacheFile(cls, scm_instance):
+		""" Cache File
+
+			Returns the name of the file that the graph of the repository is
+			saved in, or None if the scm does not have a cache directory.
+		"""
+		directory = scm_instance.getCacheDirectory()
+
+		if directory is None:
+			return None
+		else:
+			return os.path.join(directory, BIGRAPH.GRAPH_FILE_NAME)
+
+	@classmethod
+	def buildGraph(cls, scm_instance, use_cache = True):
 		""" Build Graph
 
 			This method will take in the list of commits, tags and branches and it
 			will create a bi-directional graph that models the repository. This allows
 			for the repository to be walked and displayed in the way the user requires.
-		"""
-		commit_list = scm_instance.getCommitList()
 
-		# NOTE: can speed this up be using a specific command that returns a dictionary (same with tags)
+			If use_cache is set then the graph is saved in the cache directory of
+			the repository. The next time that the graph is built, if the tips of
+			the references are the same it is just loaded, else only the commits
+			that cannot be reached from the old tips are read from the scm and
+			added. The commits that are no longer reachable are not removed.
+		"""
+		# build the branch and tags dictionaries, from the one call.
 		branches = {}
-		(_, branch_list) = scm_instance.getBranches()
-		for branch in branch_list:
-			branches[branch[1]] = branch[0]
-
-		# build the tags dictionary
+		remote_branches = {}
 		tags = {}
-		(_, tag_list) = scm_instance.getTags()
-		for tag in tag_list:
-			tags[tag[0]] = tag[1]
 
-		# create the object
-		result = BIGRAPH(None, branches, tags)
+		for ref in scm_instance.getRefs():
+			if ref.ref_type == 'branch':
+				branches[ref.name] = ref.commit_id
 
-		# build the graph
-		for commit in commit_list:
-			if commit.commit_id in list(result.nodes.keys()):
-				entry = result.nodes[commit.commit_id]
-			else:
-				entry = result.addEntry(commit.commit_id)
+			elif ref.ref_type == 'remote':
+				remote_branches[ref.remote + '/' + ref.name] = ref.commit_id
+
+			elif ref.ref_type == 'tag':
+				tags[ref.name] = ref.commit_id
+
+		tips = set(branches.values()) | set(remote_branches.values()) | set(tags.values())
+		cache_file = None
+		result = None
+
+		if use_cache:
+			cache_file = BIGRAPH.cacheFile(scm_instance)
+
+			if cache_file is not None:
+				result = BIGRAPH.load(cache_file)
+
+		if result is not None and set(map(len, tips)) != set(map(len, result.tips)):
+			# the length of the abbreviated ids has changed, the ids wont match.
+			result = None
+
+		if result is None:
+			# create the object and build the graph, reading the commits as the scm returns them.
+			result = BIGRAPH(branches, tags)
+			result.addCommits(scm_instance.getCommitListGenerator())
 
-			result.updateEntry(entry, commit)
+		elif result.tips != tips:
+			# only read the commits that are new.
+			result.addCommits(scm_instance.getCommitListGenerator(exclude = sorted(result.tips)))
 
-		# now attach the tags to the entries in the graph
-		for tag in tags:
-			if tag in result.nodes:
-				result.nodes[tag].tags.append(tag)
+		else:
+			cache_file = None
+
+		result.branches = branches
+		result.remote_branches = remote_branches
+		result.tags = tags
+		result.tips = tips
+
+		if cache_file is not None:
+			result.save(cache_file)
 
-		# now attach the branches
-		for branch in branches:
-			if branch in result.nodes:
-				result.nodes[branch].branches.append(branch)
+		# now attach the tags and branches to the entries in the graph
+		result.attachReferences()
 
 		return result
 
@@ -136,16 +508,12 @@ class BIGRAPH(object):
 		"""
 		result = []
 		commit_list = []
-
 		for tag in tag_list:
-			for item in self.tags.keys:
-				if tag == self.tags[item]:
-					commit_list.append(item)
-					break
+			if tag in self.tags:
+				commit_list.append(self.tags[tag])
 			else:
-				failed = True
-
-		if not failed:
+				break
+		else:
 			result = self.searchByCommits(commit_list)
 
 		return result
@@ -189,15 +557,16 @@ class BIGRAPH(object):
 
 		# validate the search
 		for item in commit_list:
-			if item not in self.nodes:
-				result = True
+			if item not in self.ids:
+				break
 
-		if len(commit_list) == 1:
-			# this is a straight branch retrieval - simple walk function
-			result = self.retrieveBranch(commit_list[0])
 		else:
-			# lets do the complex search
-			result = self.searchTree(commit_list)
+			if len(commit_list) == 1:
+				# this is a straight branch retrieval - simple walk function
+				result = self.retrieveBranch(commit_list[0])
+			else:
+				# lets do the complex search
+				result = self.searchTree(commit_list)
 
 		return result
 
@@ -210,54 +579,175 @@ class BIGRAPH(object):
 
 			If only commits that are accessible from a single commit is required
 			then set both stop flags. The stop flags will reduce the amount of
-			commits that are returned.
+			commits that are returned. If stop_at_merge is set then only the
+			first parent of a merge is followed, if stop_at_branch is set then
+			the walk stops at the commit that another branch starts from.
 
 			This function expects the start_commit to have been validated before
 			the function is called.
 
 			This function will return a list of HistoryItem tuples.
 		"""
+		parent_offsets = self.parent_offsets
+		parent_ids = self.parent_ids
+		child_offsets = self.child_offsets
+
+		start = self.ids[start_commit]
+		visited = bytearray(len(self.commit_ids))
+		visited[start] = 1
+		search_list = [start]
+		found = []
+
+		# walk the parents, each node is only visited once.
+		while len(search_list) > 0:
+			node = search_list.pop()
+			found.append(node)
+
+			if stop_at_branch and node != start and child_offsets[node + 1] - child_offsets[node] > 1:
+				continue
+
+			parents = parent_ids[parent_offsets[node]:parent_offsets[node + 1]]
+
+			if stop_at_merge:
+				parents = parents[0:1]
+
+			for parent in parents:
+				if not visited[parent]:
+					visited[parent] = 1
+					search_list.append(parent)
+
+		return [self.exportCommit(BiGraphEntry(self, node)) for node in self.sortNodes(found)]
+
+	def sortNodes(self, nodes):
+		""" Sort Nodes
+
+			Sort the nodes so that the children come before their parents, the
+			newest first.
+		"""
+		generations = self.getGenerations()
+		return sorted(nodes, key=lambda node: (generations[node], node), reverse=True)
+
+	def reachable(self, include, exclude = None):
+		""" Reachable
+
+			This function returns the commits that can be reached from the
+			include commits but not from the exclude commits (as "git rev-list
+			include ^exclude" does). The commits are returned newest first, with
+			the children before their parents.
+
+			The commits are walked in generation order and each has a flag for
+			the side that can reach it. When all the commits that are left to
+			walk can be reached from the exclude commits the walk stops, so only
+			the commits near the result are walked.
+		"""
+		WANTED = 1
+		EXCLUDED = 2
+
+		generations = self.getGenerations()
+		parent_offsets = self.parent_offsets
+		parent_ids = self.parent_ids
+
+		flags = bytearray(len(self.commit_ids))
+		queue = []
+		active = 0
 		result = []
 
-		search_set = set(start_commit)
+		for (flag, commit_list) in [(EXCLUDED, exclude or []), (WANTED, include)]:
+			for commit_id in commit_list:
+				node = self.ids[commit_id]
 
-		index_num = self.index[start_commit]
+				if flags[node] == 0:
+					heapq.heappush(queue, (-generations[node], node))
 
-		# search the index, from after the start commit
-		# do the search in reverse chronological order.
-		for item in self.index[index_num::-1]:
-			if len(search_set) > 0:
-				if item.commit_id in search_set:
-					# add to the found search results
-					result.append(self.exportCommit(item))
+					if flag == WANTED:
+						active += 1
 
-					# update the search, looking for the current parents. Only adding
-					# items that are not already in the list. The commit_id's of the
-					# parents have been made a list by the export function.
-					search_set.remove(item.commit_id)
-					search_set.union(result[-1].parents)
-				else:
-					# search ended
-					break
+				flags[node] |= flag
+
+		while active > 0:
+			(_, node) = heapq.heappop(queue)
+			node_flags = flags[node]
+
+			if node_flags == WANTED:
+				active -= 1
+				result.append(self.commit_ids[node])
+
+			for parent in parent_ids[parent_offsets[node]:parent_offsets[node + 1]]:
+				parent_flags = flags[parent]
+
+				if parent_flags | node_flags != parent_flags:
+					if parent_flags == 0:
+						heapq.heappush(queue, (-generations[parent], parent))
+
+						if node_flags == WANTED:
+							active += 1
+
+					elif parent_flags == WANTED:
+						# it was going to be returned, but can be reached from the excluded.
+						active -= 1
+
+					flags[parent] = parent_flags | node_flags
 
 		return result
 
+	def sinceForkPoint(self, branch, base_branch):
+		""" Since Fork Point
+
+			Returns the commits that are on the branch since it forked from (or
+			was last merged with) the base branch. The branches can be branch
+			names or commit ids.
+		"""
+		return self.reachable([self.branches.get(branch, branch)], [self.branches.get(base_branch, base_branch)])
+
+	def tagsContaining(self, commit_id):
+		""" Tags Containing
+
+			Returns the names of the tags that the commit can be reached from.
+			The children are walked from the commit, and the walk stops when all
+			the tags that are newer than the commit have been found.
+		"""
+		generations = self.getGenerations()
+		child_offsets = self.child_offsets
+		child_ids = self.child_ids
+		node_tags = self.node_tags
+
+		start = self.ids[commit_id]
+		limit = generations[start]
+
+		# only a tag on a newer commit can contain this one.
+		remaining = len([node for node in node_tags if generations[node] > limit or node == start])
+		visited = bytearray(len(self.commit_ids))
+		visited[start] = 1
+		search_list = [start]
+		result = []
+
+		while len(search_list) > 0 and remaining > 0:
+			node = search_list.pop()
+
+			if node in node_tags:
+				result.extend(node_tags[node])
+				remaining -= 1
+
+			for child in child_ids[child_offsets[node]:child_offsets[node + 1]]:
+				if not visited[child]:
+					visited[child] = 1
+					search_list.append(child)
+
+		return sorted(result)
+
 	def exportCommit(self, commit):
 		""" Export Commit
 
 			This function export a commit graph node to an external self contained
 			item.
 		"""
-		# Ok, add to the result
-		children = []
-		for child in commit.children:
-			children.append(child.commit_id)
+		commit_ids = self.commit_ids
 
-		parents = []
-		for parent in commit.parents:
-			parents.append(parent.commit_id)
+		# Ok, add to the result
+		children = [commit_ids[child] for child in self.childNodes(commit.node)]
+		parents = [commit_ids[parent] for parent in self.parentNodes(commit.node)]
 
-		return scm.HistoryItem(commit.commit_id, 'no desc', parents, children)
+		return scm.HistoryItem(commit.commit_id, commit.description, None, parents, children)
 
 	def searchTree(self, commit_list, all_commits = False):
 		#pylint: disable=e1103
@@ -289,6 +779,9 @@ class BIGRAPH(object):
 			   o - id_4
 
 		"""
+		parent_offsets = self.parent_offsets
+		parent_ids = self.parent_ids
+
 		index = 0
 		found = None
 		found_id = None
@@ -305,7 +798,7 @@ class BIGRAPH(object):
 
 			# now add to the search queue - add the set of branches that make up
 			# this branch.
-			search_queue[commit] = BiGraphSearchElement(colour, index, (1 << index))
+			search_queue[self.ids[commit]] = BiGraphSearchElement(colour, index, (1 << index))
 			streams.append([])
 
 		# now do the search
@@ -316,16 +809,17 @@ class BIGRAPH(object):
 			joined = False
 
 			while current_commit not in search_queue and found is None:
-				commit = self.nodes[current_commit]
+				commit = current_commit
+				parents = parent_ids[parent_offsets[commit]:parent_offsets[commit + 1]]
 
-				if len(commit.parents) == 0:
+				if len(parents) == 0:
 					# Ok, we have no more parents
 					break
 
 				else:
-					if commit.commit_id in found_dict:
-						if found_dict[commit.commit_id].colour == all_found:
-							found = found_dict[commit.commit_id]
+					if commit in found_dict:
+						if found_dict[commit].colour == all_found:
+							found = found_dict[commit]
 							found_id = commit
 							break
 
@@ -334,15 +828,15 @@ class BIGRAPH(object):
 								current_stream.append(commit)
 								joined = True
 
-							found_dict[commit.commit_id].colour  |= current_item.colour
-							found_dict[commit.commit_id].streams |= current_item.streams
+							found_dict[commit].colour  |= current_item.colour
+							found_dict[commit].streams |= current_item.streams
 
 					else:
 						# needs to be added to a stream - and the found dictionary
 						if not joined:
 							current_stream.append(commit)
 
-						found_dict[commit.commit_id] = BiGraphSearchElement(current_item.colour, index, current_item.streams)
+						found_dict[commit] = BiGraphSearchElement(current_item.colour, index, current_item.streams)
 
 					# Search all parents:
 					# 1. All parents that are joins, need to do the join
@@ -352,31 +846,31 @@ class BIGRAPH(object):
 					got_first = False
 					next_first = None
 
-					for parent in commit.parents:
-						if parent.commit_id in found_dict:
+					for parent in parents:
+						if parent in found_dict:
 							# It joins with a commit that has been visited before
-							found_dict[parent.commit_id].colour  |= current_item.colour
-							found_dict[parent.commit_id].streams |= current_item.streams
+							found_dict[parent].colour  |= current_item.colour
+							found_dict[parent].streams |= current_item.streams
 
-							current_item.colour = found_dict[parent.commit_id].colour
-							current_item.streams = found_dict[parent.commit_id].streams
+							current_item.colour = found_dict[parent].colour
+							current_item.streams = found_dict[parent].streams
 
 							# check to see if we have completed the search
-							if found_dict[parent.commit_id].colour == all_found:
-								found = found_dict[parent.commit_id]
+							if found_dict[parent].colour == all_found:
+								found = found_dict[parent]
 								found_id = parent
 								break
 
-						elif parent.commit_id in search_queue:
+						elif parent in search_queue:
 							# Ok, we have a join with commit that is waiting to be visited
-							search_queue[parent.commit_id].colour  |= current_item.colour
-							search_queue[parent.commit_id].streams |= current_item.streams
+							search_queue[parent].colour  |= current_item.colour
+							search_queue[parent].streams |= current_item.streams
 
-							streams[search_queue[parent.commit_id].index].append(commit)
+							streams[search_queue[parent].index].append(commit)
 
 							# check to see if we have completed the search
-							if search_queue[parent.commit_id].colour == all_found:
-								found = search_queue[parent.commit_id]
+							if search_queue[parent].colour == all_found:
+								found = search_queue[parent]
 								found_id = parent
 								break
 
@@ -385,12 +879,12 @@ class BIGRAPH(object):
 							index += 1
 							streams.append([commit])
 							current_streams = (current_item.streams | (1 << index))
-							search_queue[parent.commit_id] = BiGraphSearchElement(current_item.colour, index, current_streams)
+							search_queue[parent] = BiGraphSearchElement(current_item.colour, index, current_streams)
 
 						if not got_first:
 							# Ok, we now have the next commit.
 							got_first = True
-							next_first = parent.commit_id
+							next_first = parent
 
 					current_commit = next_first
 
@@ -405,9 +899,11 @@ class BIGRAPH(object):
 				if found_streams & 0x01:
 					if found_id in streams[index]:
 						# trim the list down to the common commit
-						result.append(streams[index][0:streams[index].index(found_id)+1])
+						stream = streams[index][0:streams[index].index(found_id)+1]
 					else:
-						result.append(streams[index])
+						stream = streams[index]
+
+					result.append([BiGraphEntry(self, node) for node in stream])
 
 				index += 1
 				found_streams = found_streams >> 1
@@ -428,12 +924,16 @@ class BIGRAPH(object):
 		pointers = [0] * len(search_results)
 		wait_count = {}
 		stream_len = []
+		positions = {}
 		result = []
 
-		# count the lengths, to know when to stop
-		for stream in search_results:
+		# count the lengths, to know when to stop, and where each commit is.
+		for index, stream in enumerate(search_results):
 			stream_len.append(len(stream))
 
+			for position, commit in enumerate(stream):
+				positions.setdefault(commit, []).append((index, position))
+
 		while stream_len != pointers:
 			for index, stream in enumerate(search_results):
 
@@ -458,7 +958,7 @@ class BIGRAPH(object):
 							for wait in wait_count[stream[pointers[index]]]:
 								pointers[wait] += 1
 
-					elif self.addToWaitList(index, search_results, pointers, wait_count):
+					elif self.addToWaitList(index, search_results, pointers, wait_count, positions):
 						# If got here then it was added to the wait list, need to
 						# do nothing now.
 						pass
@@ -471,26 +971,45 @@ class BIGRAPH(object):
 						pointers[index] += 1
 		return result
 
-	def addToWaitList(self, item, lists, start_points, wait_list):
+	def addToWaitList(self, item, lists, start_points, wait_list, positions = None):
 		""" Add To Wait List
 
 			 This function is used in the search and it used to build the wait list.
 			 It should not be called from outside the search.
+
+			 The positions are the (list, position) of each commit in the lists,
+			 so the lists don't have to be searched.
 		"""
 		result = False
+		commit = lists[item][start_points[item]]
 
-		for index, stream in enumerate(lists):
-			if index != item:
-				if lists[item][start_points[item]] in stream[start_points[index]:]:
-					# Ok, we have a match
-					if lists[item][start_points[item]] in wait_list:
-						if index not in wait_list[lists[item][start_points[item]]]:
-							wait_list[lists[item][start_points[item]]].append(index)
-					else:
-						wait_list[lists[item][start_points[item]]] = [item, index]
+		if positions is None:
+			positions = {}
 
-					result = True
+			for index, stream in enumerate(lists):
+				for position, entry in enumerate(stream):
+					positions.setdefault(entry, []).append((index, position))
+
+		for index, position in positions[commit]:
+			if index != item and position >= start_points[index]:
+				# Ok, we have a match
+				if commit in wait_list:
+					if index not in wait_list[commit]:
+						wait_list[commit].append(index)
+				else:
+					wait_list[commit] = [item, index]
+
+				result = True
 
 		return result
 
+	def layout(self, commit_list = None):
+		""" Layout
+
+			Returns a BiGraphLayout of the graph, that gives each commit a row
+			and a column for drawing the history. If the commit_list is given
+			then only the commits that can be reached from them are laid out.
+		"""
+		return BiGraphLayout(self, commit_list)
+
 # vim: ts=4 sw=4 noexpandtab nocin ai
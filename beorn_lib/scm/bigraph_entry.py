@@ -4,6 +4,9 @@
 #    file: bigraph_entry
 #    desc: This python class is the bygraph entry class.
 #
+#          The graph is held as arrays of node numbers, the entries are views
+#          of a node in the graph and are made when they are used.
+#
 #  author: Peter Antoine
 #    date: 14/12/2013
 #---------------------------------------------------------------------------------
@@ -12,16 +15,99 @@
 #                      Released Under the MIT Licence
 #---------------------------------------------------------------------------------
 
+import collections.abc
+
 class BiGraphEntry(object):
 	""" An entry in the bi-graph """
-	__slots__ = ('commit_id', 'parents', 'children', 'tags', 'branches', 'description')
-
-	def __init__(self, commit_id, parents, children, tags, branches, description):
-		self.tags			= tags
-		self.parents		= parents
-		self.children		= children
-		self.branches		= branches
-		self.commit_id		= commit_id
-		self.description	= description
+	__slots__ = ('graph', 'node')
+
+	def __init__(self, graph, node):
+		self.graph			= graph
+		self.node			= node
+
+	@property
+	def commit_id(self):
+		return self.graph.commit_ids[self.node]
+
+	@property
+	def description(self):
+		return self.graph.descriptions[self.node]
+
+	@property
+	def parents(self):
+		return [BiGraphEntry(self.graph, node) for node in self.graph.parentNodes(self.node)]
+
+	@property
+	def children(self):
+		return [BiGraphEntry(self.graph, node) for node in self.graph.childNodes(self.node)]
+
+	@property
+	def tags(self):
+		return self.graph.node_tags.get(self.node, [])
+
+	@property
+	def branches(self):
+		return self.graph.node_branches.get(self.node, [])
+
+	def __eq__(self, other):
+		if isinstance(other, BiGraphEntry):
+			return self.node == other.node and self.graph is other.graph
+		else:
+			return NotImplemented
+
+	def __ne__(self, other):
+		result = self.__eq__(other)
+
+		if result is NotImplemented:
+			return result
+		else:
+			return not result
+
+	def __hash__(self):
+		return hash(self.node)
+
+	def __repr__(self):
+		return 'BiGraphEntry(' + self.commit_id + ')'
+
+class BiGraphIndex(collections.abc.Sequence):
+	""" The entries of the graph in the order they were added """
+	__slots__ = ('graph',)
+
+	def __init__(self, graph):
+		self.graph = graph
+
+	def __len__(self):
+		return len(self.graph.commit_ids)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [BiGraphEntry(self.graph, node) for node in range(*index.indices(len(self)))]
+
+		if index < 0:
+			index += len(self)
+
+		if index < 0 or index >= len(self):
+			raise IndexError('BiGraphIndex index out of range')
+
+		return BiGraphEntry(self.graph, index)
+
+class BiGraphNodes(collections.abc.Mapping):
+	""" The entries of the graph by commit_id """
+	__slots__ = ('graph',)
+
+	def __init__(self, graph):
+		self.graph = graph
+
+	def __len__(self):
+		return len(self.graph.ids)
+
+	def __iter__(self):
+		return iter(self.graph.ids)
+
+	def __contains__(self, commit_id):
+		return commit_id in self.graph.ids
+
+	def __getitem__(self, commit_id):
+		return BiGraphEntry(self.graph, self.graph.ids[commit_id])
 
 # vim: ts=4 sw=4 noexpandtab nocin ai
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: bigraph_layout
+#    desc: This class lays out the commits of a BIGRAPH for display.
+#
+#          Each commit is given a row and a column (lane), and the edges that
+#          join the row to the next one. Each lane is waiting for one commit,
+#          when the commit is reached it takes the lane and the lane is given
+#          to its first parent. The other parents are given the lowest free
+#          lane, and a parent that already has a lane is joined to it (and
+#          moved left into the commit's lane if that lane is free).
+#
+#          The rows are laid out when they are asked for, and the state of the
+#          lanes is saved every CHECKPOINT_INTERVAL rows, so moving a window
+#          over the history only lays out the rows in (or just before) the
+#          window.
+#
+#  author: Peter Antoine
+#    date: 18/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import heapq
+import array
+import collections
+
+LayoutRow = collections.namedtuple('LayoutRow', ['commit_id', 'column', 'lanes', 'edges'])
+
+class BiGraphLayout(object):
+	""" BIGRAPH Layout
+
+		The rows are LayoutRow tuples. The column is the lane of the commit,
+		lanes are the other lanes that pass the commit and edges is the list of
+		(from_column, to_column) that join this row to the next. The edges from
+		the commit's column go to its parents, in the order of the parents.
+	"""
+	CHECKPOINT_INTERVAL = 256
+
+	def __init__(self, graph, commit_list = None):
+		self.graph = graph
+
+		if commit_list is None:
+			self.order = self.__topologicalOrder(range(len(graph.commit_ids)))
+		else:
+			self.order = self.__topologicalOrder([graph.ids[commit_id] for commit_id in graph.reachable(commit_list)])
+
+		# node -> row, -1 if the node is not in the layout.
+		self.rows = array.array('i', [-1]) * len(graph.commit_ids)
+
+		for (row, node) in enumerate(self.order):
+			self.rows[node] = row
+
+		# the state of the lanes before the row, every CHECKPOINT_INTERVAL rows.
+		self.checkpoints = [([], {}, [])]
+
+	def __len__(self):
+		return len(self.order)
+
+	def __topologicalOrder(self, nodes):
+		""" [PRIVATE] order the nodes newest first.
+
+			This is a counting sort by generation, so the children are always
+			before their parents.
+		"""
+		generations = self.graph.getGenerations()
+		buckets = collections.defaultdict(list)
+
+		for node in nodes:
+			buckets[generations[node]].append(node)
+
+		result = array.array('i')
+
+		for generation in sorted(buckets, reverse=True):
+			result.extend(sorted(buckets[generation], reverse=True))
+
+		return result
+
+	def __layoutRow(self, row, lanes, expected, free, make_row):
+		""" [PRIVATE] move the lane state past the row.
+
+			The lanes, expected and free are changed. If make_row is set then the
+			LayoutRow is returned.
+		"""
+		graph = self.graph
+		rows = self.rows
+		node = self.order[row]
+
+		column = expected.pop(node, None)
+
+		if column is None:
+			if len(free) > 0:
+				column = heapq.heappop(free)
+			else:
+				column = len(lanes)
+				lanes.append(-1)
+
+		lanes[column] = -1
+		edges = []
+		moved = {}
+
+		if make_row:
+			passing = tuple([lane for lane in range(len(lanes)) if lanes[lane] != -1])
+
+		for parent in graph.parent_ids[graph.parent_offsets[node]:graph.parent_offsets[node + 1]]:
+			if rows[parent] == -1:
+				continue
+
+			parent_column = expected.get(parent)
+
+			if parent_column is None:
+				if lanes[column] == -1:
+					parent_column = column
+				elif len(free) > 0:
+					parent_column = heapq.heappop(free)
+				else:
+					parent_column = len(lanes)
+					lanes.append(-1)
+
+				lanes[parent_column] = parent
+				expected[parent] = parent_column
+
+			elif parent_column > column and lanes[column] == -1:
+				# move the parent's lane left into the commit's lane.
+				lanes[parent_column] = -1
+				moved[parent_column] = column
+
+				lanes[column] = parent
+				expected[parent] = column
+				parent_column = column
+
+			edges.append((column, parent_column))
+
+		# the moved lanes are freed after the parents, so they are not reused in this row.
+		for lane in moved:
+			heapq.heappush(free, lane)
+
+		if lanes[column] == -1:
+			heapq.heappush(free, column)
+
+		# remove the free lanes from the right.
+		while len(lanes) > 0 and lanes[-1] == -1:
+			lanes.pop()
+			free.remove(len(lanes))
+			heapq.heapify(free)
+
+		if make_row:
+			edges.extend([(lane, moved.get(lane, lane)) for lane in passing])
+			return LayoutRow(graph.commit_ids[node], column, passing, edges)
+
+	def __restore(self, row):
+		""" [PRIVATE] returns a copy of the lane state before the nearest checkpoint to row """
+		checkpoint = min(row // BiGraphLayout.CHECKPOINT_INTERVAL, len(self.checkpoints) - 1)
+		(lanes, expected, free) = self.checkpoints[checkpoint]
+
+		return (checkpoint * BiGraphLayout.CHECKPOINT_INTERVAL, list(lanes), dict(expected), list(free))
+
+	def getRows(self, start = 0, count = None):
+		""" Get Rows
+
+			Returns the LayoutRows for the rows start to start + count. Only the
+			rows from the checkpoint before start are laid out.
+		"""
+		if count is None:
+			end = len(self.order)
+		else:
+			end = min(start + count, len(self.order))
+
+		(row, lanes, expected, free) = self.__restore(start)
+		result = []
+
+		while row < end:
+			if row % BiGraphLayout.CHECKPOINT_INTERVAL == 0 and row // BiGraphLayout.CHECKPOINT_INTERVAL == len(self.checkpoints):
+				self.checkpoints.append((list(lanes), dict(expected), list(free)))
+
+			layout_row = self.__layoutRow(row, lanes, expected, free, row >= start)
+
+			if layout_row is not None:
+				result.append(layout_row)
+
+			row += 1
+
+		return result
+
+	def getRow(self, commit_id):
+		""" Get Row
+
+			Returns the row of the commit, or -1 if it is not in the layout.
+		"""
+		node = self.graph.ids.get(commit_id)
+
+		if node is None:
+			return -1
+		else:
+			return self.rows[node]
+
+	def render(self, start = 0, count = None):
+		""" Render
+
+			This function renders the rows as text, each lane is two characters
+			wide. Each row gives the commit line, and if lanes join or split the
+			line of the edges to the next row.
+
+			i.e.
+			   o    id_1
+			   |\\
+			   | o  id_2
+			   o |  id_3
+			   |/
+			   o  id_4
+		"""
+		result = []
+
+		for layout_row in self.getRows(start, count):
+			width = max([layout_row.column] + list(layout_row.lanes) + [max(edge) for edge in layout_row.edges]) + 1
+			line = [' '] * (width * 2)
+
+			for lane in layout_row.lanes:
+				line[lane * 2] = '|'
+
+			line[layout_row.column * 2] = 'o'
+			result.append(''.join(line) + ' ' + layout_row.commit_id)
+
+			line = [' '] * (width * 2)
+
+			for (from_column, to_column) in layout_row.edges:
+				if from_column == to_column:
+					line[from_column * 2] = '|'
+
+			for (from_column, to_column) in layout_row.edges:
+				if from_column < to_column:
+					for position in range(from_column * 2 + 2, to_column * 2 - 1):
+						if line[position] == ' ':
+							line[position] = '-'
+
+					line[to_column * 2 - 1] = '\\'
+
+				elif from_column > to_column:
+					for position in range(to_column * 2 + 2, from_column * 2 - 1):
+						if line[position] == ' ':
+							line[position] = '-'
+
+					line[to_column * 2 + 1] = '/'
+
+			# the straight lines are only needed when lanes join or split.
+			if len([edge for edge in layout_row.edges if edge[0] != edge[1]]) > 0:
+				result.append(''.join(line).rstrip())
+
+		return result
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
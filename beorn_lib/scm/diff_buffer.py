@@ -0,0 +1,440 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: diff_buffer
+#    desc: Unified diff parser that works on the raw output of the scm.
+#
+#          parseUnifiedDiff() needs the whole diff decoded and split into lines
+#          before it starts. The parser here works on the bytes (or a
+#          memoryview of them) that are read from the scm process. It only
+#          looks at the "diff" and "@@" lines, the hunks are kept as offsets
+#          into the buffer and the lines are only split and decoded when they
+#          are used.
+#
+#          The lines are split on '\n' (a trailing '\r' is removed), so a
+#          diff with other line breaks in the content will not give exactly
+#          the same lines as str.splitlines().
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import re
+import itertools
+from .scm import Change, ChangeItem, createChangeHunk
+
+# the lines that the parser has to stop at.
+DIFF_MARKER = re.compile(rb'\n(?:diff|@@)')
+LINE_END = re.compile(rb'\n')
+HUNK_HEADER = re.compile(rb'@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+#---------------------------------------------------------------------------------
+# Local Classes
+#---------------------------------------------------------------------------------
+class DiffLines(object):
+	""" Diff Lines
+
+		A read only list of the lines of a part of a buffer. Nothing is copied
+		or decoded until the lines are used. It compares equal to a list with
+		the same lines, and it is pickled as a list.
+	"""
+	__slots__ = ('buffer', 'start', 'end', 'starts', 'count')
+
+	def __init__(self, buffer, start, end):
+		self.buffer = buffer
+		self.start = start
+		self.end = end
+		self.starts = None
+		self.count = None
+
+	def __findLines(self):
+		""" [PRIVATE] find the start of each of the lines. """
+		if self.starts is None:
+			pieces = self.toBytes().split(b'\n')
+
+			if pieces[-1] == b'':
+				pieces.pop()
+
+			self.starts = list(itertools.accumulate([len(piece) + 1 for piece in pieces], initial=self.start))
+			self.count = len(pieces)
+
+		return self.starts
+
+	def __line(self, index):
+		""" [PRIVATE] decode a single line. """
+		starts = self.__findLines()
+		line = bytes(self.buffer[starts[index]:min(starts[index + 1] - 1, self.end)])
+
+		if line[-1:] == b'\r':
+			line = line[:-1]
+
+		return line.decode(errors='replace')
+
+	def __lines(self):
+		""" [PRIVATE] decode all the lines. """
+		text = self.toBytes().decode(errors='replace')
+		result = text.split('\n')
+
+		if result[-1] == '':
+			result.pop()
+
+		if '\r' in text:
+			result = [line[:-1] if line[-1:] == '\r' else line for line in result]
+
+		self.count = len(result)
+
+		return result
+
+	def __len__(self):
+		if self.count is None:
+			data = self.toBytes()
+			self.count = data.count(b'\n')
+
+			if data[-1:] not in (b'', b'\n'):
+				self.count += 1
+
+		return self.count
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return self.__lines()[index]
+
+		length = len(self)
+
+		if index < 0:
+			index += length
+
+		if index < 0 or index >= length:
+			raise IndexError('DiffLines index out of range')
+
+		return self.__line(index)
+
+	def __iter__(self):
+		return iter(self.__lines())
+
+	def __eq__(self, other):
+		if isinstance(other, (list, DiffLines)):
+			return self.__lines() == list(other)
+		else:
+			return NotImplemented
+
+	def __ne__(self, other):
+		result = self.__eq__(other)
+
+		if result is NotImplemented:
+			return result
+		else:
+			return not result
+
+	__hash__ = None
+
+	def __reduce__(self):
+		return (list, (self.__lines(),))
+
+	def __repr__(self):
+		return repr(self.__lines())
+
+	def toBytes(self):
+		""" To Bytes
+
+			Returns the raw bytes of all the lines.
+		"""
+		return bytes(self.buffer[self.start:self.end])
+
+class DiffChanges(object):
+	""" Diff Changes
+
+		A read only list of the Change hunks of a file. Only the positions of
+		the hunks are kept, the Change is made when it is read and the lines
+		of the Change are a DiffLines.
+	"""
+	__slots__ = ('buffer', 'hunks')
+
+	def __init__(self, buffer):
+		self.buffer = buffer
+		self.hunks = []
+
+	def addHunk(self, header_start, header_end, end):
+		""" Add Hunk
+
+			Add the hunk with the "@@" line at header_start and the lines of
+			the hunk from the line after until end.
+		"""
+		self.hunks.append((header_start, header_end, end))
+
+	def __change(self, index):
+		""" [PRIVATE] make the Change for the hunk. """
+		(header_start, header_end, end) = self.hunks[index]
+
+		lines = DiffLines(self.buffer, min(header_end + 1, end), end)
+		match = HUNK_HEADER.match(self.buffer, header_start, header_end)
+
+		if match is None:
+			# not a simple two way hunk (i.e. a combined diff), use the old decoder.
+			header = bytes(self.buffer[header_start:header_end]).decode(errors='replace')
+			return createChangeHunk(header, lines)
+
+		(original_line, original_length, new_line, new_length) = match.groups()
+
+		return Change(	int(original_line),
+						1 if original_length is None else int(original_length),
+						int(new_line),
+						1 if new_length is None else int(new_length),
+						lines)
+
+	def __len__(self):
+		return len(self.hunks)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self.__change(item) for item in range(*index.indices(len(self.hunks)))]
+
+		if index < 0:
+			index += len(self.hunks)
+
+		if index < 0 or index >= len(self.hunks):
+			raise IndexError('DiffChanges index out of range')
+
+		return self.__change(index)
+
+	def __iter__(self):
+		for index in range(len(self.hunks)):
+			yield self.__change(index)
+
+	def __eq__(self, other):
+		if isinstance(other, (list, DiffChanges)):
+			return list(self) == list(other)
+		else:
+			return NotImplemented
+
+	def __ne__(self, other):
+		result = self.__eq__(other)
+
+		if result is NotImplemented:
+			return result
+		else:
+			return not result
+
+	__hash__ = None
+
+	def __reduce__(self):
+		return (list, (list(self),))
+
+	def __repr__(self):
+		return repr(list(self))
+
+class UnifiedDiffParser(object):
+	""" Unified Diff Parser
+
+		A push parser for a diff that arrives in chunks. The chunks are given to
+		feed() and it returns the ChangeItems for the files that have been
+		finished, a file is finished when the next "diff" line is seen. close()
+		returns the last file. The lines before the first "diff" line are kept
+		in preamble (i.e. the commit message of "git show").
+	"""
+	def __init__(self, version, parent_version):
+		self.version = version
+		self.parent_version = parent_version
+		self.pending = bytearray()
+		self.preamble = bytearray()
+		self.started = False
+		self.scanned = 0
+
+	def __findStart(self):
+		""" [PRIVATE] move the lines before the first diff into the preamble. """
+		if self.pending[0:4] == b'diff':
+			self.started = True
+		else:
+			found = self.pending.find(b'\ndiff', max(0, self.scanned - 4))
+
+			if found == -1:
+				self.scanned = len(self.pending)
+			else:
+				self.preamble += self.pending[:found + 1]
+				del self.pending[:found + 1]
+				self.started = True
+
+		if self.started:
+			self.scanned = 1
+
+	def feed(self, data):
+		""" Feed
+
+			Add the chunk of the diff and return the ChangeItems that have been
+			finished.
+		"""
+		result = []
+		self.pending += data
+
+		if not self.started:
+			self.__findStart()
+
+		if self.started:
+			found = self.pending.find(b'\ndiff', max(1, self.scanned - 4))
+
+			while found != -1:
+				result.extend(parseUnifiedDiffBuffer(self.version, self.parent_version, bytes(self.pending[:found + 1])))
+				del self.pending[:found + 1]
+				found = self.pending.find(b'\ndiff', 1)
+
+			self.scanned = len(self.pending)
+
+		return result
+
+	def close(self):
+		""" Close
+
+			The diff has finished, return the ChangeItem for the last file.
+		"""
+		result = []
+
+		if self.started:
+			result = parseUnifiedDiffBuffer(self.version, self.parent_version, bytes(self.pending))
+		else:
+			self.preamble += self.pending
+
+		self.pending = bytearray()
+		self.started = False
+		self.scanned = 0
+
+		return result
+
+#---------------------------------------------------------------------------------
+# Module functions.
+#---------------------------------------------------------------------------------
+def parseUnifiedDiffStream(version, parent_version, chunks, parser=None):
+	""" Parse Unified Diff Stream
+
+		This generator parses the diff from an iterable of bytes chunks (i.e.
+		as read from the scm process) and yields each ChangeItem as soon as
+		it is finished. If the preamble is wanted then pass in the parser.
+	"""
+	if parser is None:
+		parser = UnifiedDiffParser(version, parent_version)
+
+	for chunk in chunks:
+		for item in parser.feed(chunk):
+			yield item
+
+	for item in parser.close():
+		yield item
+
+def decodeFileHeader(header):
+	""" Decode File Header
+
+		This function decodes the lines between the "diff" line and the first
+		hunk and returns the (original_file, new_file) tuple. The names are
+		None if that side of the diff is /dev/null.
+	"""
+	original_file = None
+	new_file = None
+
+	for line in header.split(b'\n')[1:]:
+		line = line.rstrip(b'\r')
+
+		if line[0:3] == b'---':
+			# found the original file
+			if line[4:] != b'/dev/null':
+				original_file = line[6:].decode(errors='replace')
+
+		elif line[0:3] == b'+++':
+			# found the new file
+			if line[4:] != b'/dev/null':
+				new_file = line[6:].decode(errors='replace')
+
+		elif line[0:12] == b'Binary files':
+			# Ok, one side of the diff is a binary file, let's get the names
+			parts = line[13:-7].split(b' and ')
+
+			if parts[0] != b'/dev/null':
+				original_file = parts[0].decode(errors='replace')
+
+			if len(parts) > 1 and parts[1] != b'/dev/null':
+				new_file = parts[1].decode(errors='replace')
+
+	return (original_file, new_file)
+
+def parseUnifiedDiffBuffer(version, parent_version, buffer):
+	""" Parse Unified Diff Buffer
+
+		This function does the same as parseUnifiedDiff() but takes the bytes of
+		the diff (bytes, bytearray or memoryview) rather than a list of lines.
+		The change_list of each of the ChangeItems is a DiffChanges, so the
+		hunks are only decoded when they are read. The buffer must not be
+		changed while the result is in use.
+	"""
+	result = []
+	end = len(buffer)
+
+	# Only the "diff" and "@@" lines change the state of the parser.
+	markers = [match.start() + 1 for match in DIFF_MARKER.finditer(buffer)]
+	markers.append(end)
+
+	if buffer[0:4] == b'diff' or buffer[0:2] == b'@@':
+		markers.insert(0, 0)
+
+	file_start = None
+	header_end = None
+	changes = None
+
+	for index in range(len(markers) - 1):
+		start = markers[index]
+
+		if buffer[start:start+1] == b'd':
+			if file_start is not None:
+				result.append(makeChangeItem(version, parent_version, buffer[file_start:header_end or start], changes))
+
+			file_start = start
+			header_end = None
+			changes = DiffChanges(buffer)
+
+		elif file_start is not None:
+			# a hunk, the lines run until the next marker.
+			match = LINE_END.search(buffer, start, markers[index + 1])
+
+			if match is None:
+				line_end = markers[index + 1]
+			else:
+				line_end = match.start()
+
+			if header_end is None:
+				header_end = start
+
+			changes.addHunk(start, line_end, markers[index + 1])
+
+	# catch the last diff
+	if file_start is not None:
+		result.append(makeChangeItem(version, parent_version, buffer[file_start:header_end or end], changes))
+
+	return result
+
+def makeChangeItem(version, parent_version, header, changes):
+	""" Make Change Item
+
+		Make the ChangeItem from the file header and the changes.
+	"""
+	(original_file, new_file) = decodeFileHeader(bytes(header))
+
+	if original_file is not None and new_file is not None:
+		change_type = 'M'
+
+	elif original_file is None:
+		change_type = 'A'
+
+	else:
+		change_type = 'D'
+
+	return ChangeItem(version, parent_version, change_type, original_file, new_file, changes)
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
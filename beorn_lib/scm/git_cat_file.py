@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#    file: git_cat_file
+#    desc: This class wraps a long running "git cat-file --batch" process.
+#
+#          Forking git for every blob that is read from the repository is slow
+#          when a lot of blobs are needed (opening a review for example). This
+#          class keeps a cat-file process running and talks to it over its
+#          pipes so a read becomes a pipe round-trip and not a fork+exec.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import sys
+import threading
+import subprocess
+
+CREATE_NO_WINDOW = 0x08000000
+
+#---------------------------------------------------------------------------------
+# Module functions.
+#---------------------------------------------------------------------------------
+def readBatchObject(stream, with_contents=True):
+	""" Read Batch Object
+
+		This function will read a single response from a cat-file --batch or
+		--batch-check stream. It returns a tuple of (object_type, contents)
+		where the contents will be None for --batch-check streams. If the
+		object does not exist then the type will be None.
+
+		If the stream has ended then it will return None.
+	"""
+	header = stream.readline()
+
+	if header == b'':
+		return None
+
+	header = header.rstrip(b'\n')
+
+	# "<name> missing" or "<name> ambiguous", the name can have spaces in it.
+	if header.endswith(b' missing') or header.endswith(b' ambiguous'):
+		return (None, None)
+
+	parts = header.rsplit(b' ', 2)
+
+	if len(parts) != 3 or not parts[2].isdigit():
+		return (None, None)
+
+	contents = None
+
+	if with_contents:
+		size = int(parts[2])
+		contents = stream.read(size)
+
+		# remove the trailing LF that terminates the object.
+		stream.read(1)
+
+		if len(contents) != size:
+			return None
+
+	return (parts[1].decode(), contents)
+
+#---------------------------------------------------------------------------------
+# Local Classes
+#---------------------------------------------------------------------------------
+class GitCatFile(object):
+	""" Git Cat File
+
+		This class will lazily start a "git cat-file --batch" (or --batch-check)
+		process for the given git command and will send object requests to it.
+		If the process dies it will be restarted on the next request.
+	"""
+	def __init__(self, command_list, check_only=False):
+		self.command_list = command_list
+		self.check_only = check_only
+		self.process = None
+		self.lock = threading.Lock()
+
+	def __del__(self):
+		self.close()
+
+	def __start(self):
+		""" [PRIVATE] start the cat-file process if it is not running. """
+		if self.process is None or self.process.poll() is not None:
+			if self.check_only:
+				command = self.command_list + ['cat-file', '--batch-check']
+			else:
+				command = self.command_list + ['cat-file', '--batch']
+
+			try:
+				if sys.platform == 'win32':
+					self.process = subprocess.Popen(command,
+													stdin=subprocess.PIPE,
+													stdout=subprocess.PIPE,
+													stderr=subprocess.DEVNULL,
+													creationflags=CREATE_NO_WINDOW)
+				else:
+					self.process = subprocess.Popen(command,
+													stdin=subprocess.PIPE,
+													stdout=subprocess.PIPE,
+													stderr=subprocess.DEVNULL)
+			except OSError:
+				self.process = None
+
+		return self.process is not None
+
+	def __request(self, object_name):
+		""" [PRIVATE] send a single request and read the response. """
+		result = None
+
+		if self.__start():
+			try:
+				self.process.stdin.write(object_name.encode() + b'\n')
+				self.process.stdin.flush()
+				result = readBatchObject(self.process.stdout, not self.check_only)
+
+			except (OSError, ValueError):
+				result = None
+
+			if result is None:
+				# the process has gone away, kill it so it will be restarted.
+				self.close()
+
+		return result
+
+	def readObject(self, object_name):
+		""" Read Object
+
+			This function will return a tuple of (object_type, contents) for the
+			given object name. If the object does not exist the object_type will
+			be None. If the cat-file process cannot be used (even after it has
+			been restarted) then the function will return None.
+		"""
+		result = None
+
+		# names with newlines in cannot be sent down the pipe.
+		if '\n' not in object_name:
+			with self.lock:
+				result = self.__request(object_name)
+
+				if result is None:
+					# try once more with a new process.
+					result = self.__request(object_name)
+
+		return result
+
+	def __writeRequests(self, request):
+		""" [PRIVATE] write the requests to the process.
+
+			This is run on its own thread so that the requests can be streamed
+			to git while the responses are being read, without the pipes filling
+			up and blocking both sides.
+		"""
+		try:
+			self.process.stdin.write(request)
+			self.process.stdin.flush()
+
+		except (OSError, ValueError):
+			pass
+
+	def readObjects(self, object_names):
+		""" Read Objects
+
+			This function will stream all the object requests to the cat-file
+			process and return a list of the results, in the same order as the
+			names. Each entry is the same as returned by readObject() and will be
+			None if the object could not be read via the process.
+		"""
+		result = [None] * len(object_names)
+		wanted = []
+
+		for index, object_name in enumerate(object_names):
+			if '\n' not in object_name:
+				wanted.append(index)
+
+		if len(wanted) > 0:
+			with self.lock:
+				if self.__start():
+					request = b''.join([object_names[index].encode() + b'\n' for index in wanted])
+
+					writer = threading.Thread(target=self.__writeRequests, args=(request,))
+					writer.start()
+
+					try:
+						for index in wanted:
+							response = readBatchObject(self.process.stdout, not self.check_only)
+
+							if response is None:
+								break
+							else:
+								result[index] = response
+
+					except (OSError, ValueError):
+						response = None
+						self.process.kill()
+
+					writer.join()
+
+					if response is None:
+						self.close()
+
+		return result
+
+	def close(self):
+		""" Close
+
+			This function will shut down the cat-file process. Closing stdin will
+			cause git to exit cleanly.
+		"""
+		if self.process is not None:
+			try:
+				self.process.stdin.close()
+				self.process.wait(5)
+
+			except (OSError, ValueError, subprocess.TimeoutExpired):
+				self.process.kill()
+				self.process.wait()
+
+			finally:
+				self.process.stdout.close()
+
+			self.process = None
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
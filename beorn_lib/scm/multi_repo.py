@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: multi_repo
+#    desc: Runs the SCM queries across all the repositories in a tree.
+#
+#          A workspace can have a lot of repositories and submodules in it.
+#          MultiRepo finds them (with findRepositories()) and keeps a SCM
+#          object for each. The queries are run on a pool of threads, as the
+#          time is spent waiting for the scm processes, and the results are
+#          returned as each repository finishes.
+#
+#  author: Peter Antoine
+#    date: 18/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import os
+import concurrent.futures
+from collections import namedtuple, OrderedDict
+from . import scm
+
+MultiRepoResult = namedtuple('MultiRepoResult', ['directory', 'result', 'error'])
+
+class MultiRepo(object):
+	""" Multi Repo
+
+		The results are MultiRepoResult tuples, the error is the exception that
+		the query raised (and the result is None) or None if it worked.
+	"""
+	def __init__(self, path='.', workers=8, wanted=None):
+		self.path = os.path.abspath(path)
+		self.workers = workers
+		self.wanted = wanted
+		self.repositories = OrderedDict()		# directory -> scm object
+
+	def discover(self):
+		""" Discover
+
+			This function finds the repositories and submodules in the tree, the
+			directory filter of the SourceTree is used for the search. The SCM
+			objects of the repositories that were found before are kept. Returns
+			the list of the directories.
+		"""
+		repositories = OrderedDict()
+
+		for found in scm.findRepositories(self.wanted, self.path, self.workers):
+			for directory in found.primary + found.sub:
+				if directory not in repositories:
+					scm_object = self.repositories.get(directory)
+
+					if scm_object is None:
+						scm_object = scm.create(found.type, working_dir=directory)
+
+					repositories[directory] = scm_object
+
+		for (directory, scm_object) in self.repositories.items():
+			if directory not in repositories:
+				scm_object.close()
+
+		self.repositories = repositories
+
+		return list(repositories)
+
+	def getRepositories(self):
+		""" Get Repositories
+
+			Returns a list of (directory, scm object) for the repositories.
+		"""
+		if len(self.repositories) == 0:
+			self.discover()
+
+		return list(self.repositories.items())
+
+	@staticmethod
+	def __query(scm_object, query, arguments):
+		""" [PRIVATE] run the query on the scm object and return (result, error) """
+		try:
+			if callable(query):
+				return (query(scm_object, *arguments), None)
+			else:
+				return (getattr(scm_object, query)(*arguments), None)
+
+		except Exception as error:
+			return (None, error)
+
+	def run(self, query, *arguments):
+		""" Run
+
+			This function runs the query on all the repositories, on at most
+			workers threads, and yields a MultiRepoResult as each one finishes.
+			The query is the name of a SCM function or a function that is called
+			with the scm object, the arguments are passed to it. If the
+			generator is closed then the queries that have not started are
+			cancelled.
+		"""
+		pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+		running = {}
+
+		try:
+			for (directory, scm_object) in self.getRepositories():
+				running[pool.submit(MultiRepo.__query, scm_object, query, arguments)] = directory
+
+			for future in concurrent.futures.as_completed(running):
+				(result, error) = future.result()
+				yield MultiRepoResult(running[future], result, error)
+
+		finally:
+			for future in running:
+				future.cancel()
+
+			pool.shutdown(wait=True)
+
+	def runAll(self, query, *arguments):
+		""" Run All
+
+			This function runs the query on all the repositories and returns a
+			dictionary of directory to MultiRepoResult, in the order that the
+			repositories were found.
+		"""
+		results = dict([(item.directory, item) for item in self.run(query, *arguments)])
+
+		return OrderedDict([(directory, results[directory]) for directory in self.repositories])
+
+	def getStatusSnapshots(self):
+		""" Get Status Snapshots
+
+			Yields the status snapshot of each repository as it finishes.
+		"""
+		return self.run('getStatusSnapshot')
+
+	def close(self):
+		for scm_object in self.repositories.values():
+			scm_object.close()
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
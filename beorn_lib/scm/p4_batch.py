@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: p4_batch
+#    desc: This class batches p4 commands with "p4 -G -x -".
+#
+#          Each p4 process has to connect to the server, so a command for each
+#          file or change is slow. The "-x -" option makes p4 read the
+#          arguments from stdin and run the command for each of them, so the
+#          requests that use the same command are sent with one process and
+#          the records are split back to the requests.
+#
+#          p4 returns a 'stat' (or an 'error') record for each argument, and
+#          the 'text' or 'binary' records that follow it belong to the same
+#          argument, that is how the records are split. The commands that
+#          return more than one 'stat' for an argument (i.e. "files dir/*")
+#          can only be batched on their own.
+#
+#          All the processes are started before any of them are sent their
+#          arguments, and each one is fed and read on its own thread, so the
+#          different commands do not wait for each other.
+#
+#  author: Peter Antoine
+#    date: 18/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import sys
+import subprocess
+import concurrent.futures
+from collections import OrderedDict
+from .p4_stream import readRecords
+
+CREATE_NO_WINDOW = 0x08000000
+
+def splitRecords(records, count):
+	""" Split Records
+
+		This function splits the records of a batched command into the records
+		for each of the count arguments. If there is one argument then all the
+		records are for it. Returns None if the records do not match the
+		arguments.
+	"""
+	if count == 1:
+		return [records]
+
+	result = []
+
+	for record in records:
+		if record.get('code') in ('stat', 'error'):
+			result.append([record])
+
+		elif len(result) > 0:
+			result[-1].append(record)
+
+		else:
+			return None
+
+	if len(result) != count:
+		return None
+
+	return result
+
+class P4Batch(object):
+	""" P4 Batch
+
+		The requests are added with add() and sent with run(). The requests with
+		the same command are sent with one process, and the processes for the
+		different commands are run at the same time, each one is written to and
+		read from on its own thread.
+	"""
+	def __init__(self, command_list, environ=None):
+		""" Init
+
+			command_list is the p4 command and the global options, it must have
+			the "-G" option. environ is the environment for p4.
+		"""
+		self.command_list = command_list
+		self.environ = environ
+		self.requests = []
+
+	def __len__(self):
+		return len(self.requests)
+
+	def add(self, command_list, argument, callback=None):
+		""" Add
+
+			Add a request to the batch. The command_list is the p4 command and
+			its options, and the argument is the file or change that it is run
+			for. If the callback is given it is called with the argument and
+			the records when the batch is run.
+		"""
+		self.requests.append((tuple(command_list), argument, callback))
+
+	def __start(self, command_list):
+		""" [PRIVATE] start the p4 process that reads the arguments from stdin """
+		try:
+			if sys.platform == 'win32':
+				return subprocess.Popen(self.command_list + ['-x', '-'] + list(command_list),
+										stdin=subprocess.PIPE,
+										stdout=subprocess.PIPE,
+										stderr=subprocess.DEVNULL,
+										env=self.environ,
+										creationflags=CREATE_NO_WINDOW)
+			else:
+				return subprocess.Popen(self.command_list + ['-x', '-'] + list(command_list),
+										stdin=subprocess.PIPE,
+										stdout=subprocess.PIPE,
+										stderr=subprocess.DEVNULL,
+										env=self.environ)
+		except (TypeError, OSError):
+			# P4 is not installed
+			return None
+
+	@staticmethod
+	def __communicate(proc, arguments):
+		""" [PRIVATE] send the arguments to the process and return its output """
+		if proc is None:
+			return None
+
+		(output, _) = proc.communicate(arguments.encode())
+
+		return output
+
+	def run(self):
+		""" Run
+
+			This function sends the requests and returns the list of the records
+			for each request, in the order that they were added. The records for
+			a request are None if p4 failed or the records could not be split.
+			The batch is empty afterwards.
+		"""
+		requests = self.requests
+		self.requests = []
+
+		groups = OrderedDict()		# command -> list of request indexes
+
+		for (index, (command_list, argument, callback)) in enumerate(requests):
+			groups.setdefault(command_list, []).append(index)
+
+		processes = [(command_list, self.__start(command_list)) for command_list in groups]
+		result = [None] * len(requests)
+		running = []
+
+		with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(processes))) as pool:
+			for (command_list, proc) in processes:
+				arguments = ''.join([requests[index][1] + '\n' for index in groups[command_list]])
+				running.append((command_list, pool.submit(P4Batch.__communicate, proc, arguments)))
+
+		for (command_list, future) in running:
+			indexes = groups[command_list]
+			output = future.result()
+			split = None
+
+			if output is not None:
+				split = splitRecords(readRecords(output), len(indexes))
+
+			if split is not None:
+				for (index, records) in zip(indexes, split):
+					result[index] = records
+
+		for (index, (command_list, argument, callback)) in enumerate(requests):
+			if callback is not None:
+				callback(argument, result[index])
+
+		return result
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
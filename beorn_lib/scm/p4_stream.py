@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: p4_stream
+#    desc: This decodes the output of "p4 -G" as it arrives.
+#
+#          The records are marshalled python dictionaries, but some commands
+#          (i.e. "diff -du") put plain text between them. marshal.load() does
+#          not say how much it has read, so the decoder walks the marshal data
+#          to find where each dictionary ends and only decodes it when all of
+#          it has been read. Anything that is not a dictionary is returned as
+#          a RAW_CODE record.
+#
+#          A '{' in the text can look like the start of a dictionary, so the
+#          first key of a dictionary must be a short string, that is enough to
+#          stop text from being taken as a record.
+#
+#  author: Peter Antoine
+#    date: 18/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import marshal
+
+CHUNK_SIZE = 64 * 1024
+MAX_KEY_LENGTH = 256
+
+# the code of the records that hold the text between the dictionaries.
+RAW_CODE = 'raw'
+
+FLAG_REF = 0x80
+DICT_START = ord('{')
+DICT_END = ord('0')
+
+# the marshal types, by the size of the data that follows the type.
+FIXED_TYPES = {ord('N'): 0, ord('F'): 0, ord('T'): 0, ord('i'): 4, ord('r'): 4, ord('I'): 8, ord('g'): 8}
+STRING_TYPES = set([ord('s'), ord('t'), ord('u'), ord('a'), ord('A')])
+SHORT_STRING_TYPES = set([ord('z'), ord('Z')])
+LONG_TYPE = ord('l')
+
+def objectEnd(data, position):
+	""" Object End
+
+		This function returns the end of the marshalled dictionary that starts
+		at position. It returns None if the data does not hold all of it yet,
+		or -1 if it is not a marshalled dictionary.
+	"""
+	end = len(data)
+
+	if position >= end:
+		return None
+
+	if data[position] & ~FLAG_REF != DICT_START:
+		return -1
+
+	position += 1
+	depth = 1
+	key_next = True
+
+	while depth > 0:
+		if position >= end:
+			return None
+
+		code = data[position] & ~FLAG_REF
+		position += 1
+
+		if key_next and code != DICT_END and code not in STRING_TYPES and code not in SHORT_STRING_TYPES:
+			return -1
+
+		if code == DICT_END:
+			depth -= 1
+
+		elif code == DICT_START:
+			depth += 1
+			key_next = True
+			continue
+
+		elif code in FIXED_TYPES:
+			position += FIXED_TYPES[code]
+
+		elif code in STRING_TYPES:
+			if position + 4 > end:
+				return None
+
+			length = int.from_bytes(data[position:position + 4], 'little', signed=True)
+
+			if length < 0 or (key_next and length > MAX_KEY_LENGTH):
+				return -1
+
+			position += 4 + length
+
+		elif code in SHORT_STRING_TYPES:
+			if position >= end:
+				return None
+
+			position += 1 + data[position]
+
+		elif code == LONG_TYPE:
+			if position + 4 > end:
+				return None
+
+			position += 4 + abs(int.from_bytes(data[position:position + 4], 'little', signed=True)) * 2
+
+		else:
+			return -1
+
+		key_next = False
+
+	if position > end:
+		return None
+
+	return position
+
+class MarshalDecoder(object):
+	""" Marshal Decoder
+
+		The data is given to feed() as it is read, and feed() returns the
+		records that have been completed. The part of a record that has not
+		been completed is kept for the next feed(). close() returns what is
+		left as a RAW_CODE record.
+	"""
+	def __init__(self):
+		self.buffer = bytearray()
+
+	def __rawRecord(self, start, end):
+		""" [PRIVATE] returns the RAW_CODE record for the text in the buffer """
+		return {'code': RAW_CODE, 'data': bytes(self.buffer[start:end])}
+
+	def feed(self, data):
+		""" Feed
+
+			Add the data to the buffer and return the list of the records that
+			it completes.
+		"""
+		self.buffer += data
+		result = []
+		position = 0
+		text_start = 0
+
+		while position < len(self.buffer):
+			start = self.buffer.find(b'{', position)
+
+			if start == -1:
+				# all text, but the next feed() might start a record.
+				position = len(self.buffer)
+				break
+
+			end = objectEnd(self.buffer, start)
+
+			if end is None:
+				position = start
+				break
+
+			elif end == -1:
+				position = start + 1
+
+			else:
+				if start > text_start:
+					result.append(self.__rawRecord(text_start, start))
+
+				obj = marshal.loads(self.buffer[start:end])
+
+				if type(obj) == dict:
+					result.append(obj)
+
+				position = end
+				text_start = end
+
+		if position > text_start:
+			result.append(self.__rawRecord(text_start, position))
+
+		del self.buffer[:position]
+
+		return result
+
+	def close(self):
+		""" Close
+
+			Returns the records that are left, once all the data has been fed.
+		"""
+		result = []
+
+		if len(self.buffer) > 0:
+			# the start of a record that was never finished is text.
+			result.append(self.__rawRecord(0, len(self.buffer)))
+			self.buffer = bytearray()
+
+		return result
+
+def readRecords(data):
+	""" Read Records
+
+		This function decodes the output of a "p4 -G" command that has been read
+		as a whole and returns all the records, including the errors and the
+		RAW_CODE records.
+	"""
+	decoder = MarshalDecoder()
+
+	return decoder.feed(data) + decoder.close()
+
+def readRecordStream(stream, chunk_size=CHUNK_SIZE):
+	""" Read Record Stream
+
+		This generator reads the stream in chunks of up to chunk_size into one
+		buffer and yields the records as they are completed. It only waits for
+		more data when it has no complete record to return, so the caller can
+		stop reading (and kill the p4 process) as soon as it has what it needs.
+	"""
+	decoder = MarshalDecoder()
+	chunk = bytearray(chunk_size)
+	view = memoryview(chunk)
+
+	if hasattr(stream, 'readinto1'):
+		read_function = stream.readinto1
+	else:
+		read_function = stream.readinto
+
+	while True:
+		count = read_function(view)
+
+		if not count:
+			break
+
+		for record in decoder.feed(view[:count]):
+			yield record
+
+	for record in decoder.close():
+		yield record
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
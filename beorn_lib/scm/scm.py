@@ -21,6 +21,7 @@ from collections import namedtuple as namedtuple
 Commit		= namedtuple('Commit', ['commit_id', 'parents', 'description'])
 Branch		= namedtuple('Branch', ['commit_id', 'name', 'parents', 'remote'])
 Tag			= namedtuple('Tag', ['commit_id', 'name'])
+Ref			= namedtuple('Ref', ['commit_id', 'name', 'ref_type', 'object_id', 'remote'])
 Details		= namedtuple('Details', ['version', 'summary', 'timestamp', 'author'])
 Change		= namedtuple('Change', ['original_line', 'original_length', 'new_line', 'new_length', 'lines'])
 HistoryItem	= namedtuple('HistoryItem', ['version', 'summary', 'timestamp', 'parents', 'children'])
@@ -28,6 +29,8 @@ ChangeList	= namedtuple('ChangeList', ['commit_id', 'timestamp', 'author', 'desc
 ChangeItem	= namedtuple('ChangeItem', ['version', 'parent', 'change_type', 'original_file', 'new_file', 'change_list'])
 SCMItem		= namedtuple('SCMItem', ['type', 'name'])
 SCMStatus	= namedtuple('SCMStatus', ['status', 'path'])
+StatusEntry	= namedtuple('StatusEntry', ['status', 'path', 'original_path'])
+StatusSnapshot = namedtuple('StatusSnapshot', ['commit_id', 'branch', 'upstream', 'ahead', 'behind', 'staged', 'unstaged', 'untracked', 'conflicted'])
 SCMFound	= namedtuple('SCMFound', ['type', 'primary', 'sub'])
 SupportedSCM = namedtuple('SupportedSCM', ['type', 'check_function', 'cls'])
 
@@ -42,6 +45,20 @@ SOURCE_STATUS_ADDED		= 1
 SOURCE_STATUS_MODIFIED	= 2
 SOURCE_STATUS_DELETED	= 3
 
+# the files and directories that mark the root of a repository, the entries in
+# the discovery cache are checked against them.
+DISCOVERY_MARKERS = ['.git', '.hg']
+
+#---------------------------------------------------------------------------------
+# Discovery Cache.
+#
+# findRepositoryRoot() remembers the repository of each directory that it has
+# searched, and the state of the markers in the directories that it passed
+# through. Each entry keeps the stamps it was found with, and is used while the
+# markers have not changed.
+#---------------------------------------------------------------------------------
+discovery_cache = {}		# directory -> (repo_type, root, [(directory, markerStamp())])
+
 #---------------------------------------------------------------------------------
 # Supported SCM List.
 #
@@ -62,24 +79,32 @@ def new(repository, remote_url=None):
 	"""
 	result = None
 
-	repo_type = isRepository(repository)
-	repo_url = repository
-
-	if repo_type is None:
+	if os.path.exists(repository):
+		# local paths use the discovery cache.
 		(repo_type, repo_url) = findRepositoryRoot(repository)
+	else:
+		repo_type = isRepository(repository)
+		repo_url = repository
+
+		if repo_type is None:
+			(repo_type, repo_url) = findRepositoryRoot(repository)
 
 	if repo_type is not None:
 		result = create(repo_type, remote_url, repo_url)
 
 	return result
 
-def findRepositories(wanted=None):
-	""" Find all the repositories in the sub tree """
+def findRepositories(wanted=None, path='.', workers=None):
+	""" Find all the repositories in the sub tree
+
+		If workers is greater than one, then the tree is searched by that many
+		threads.
+	"""
 	result = []
 
 	for scm in supported_scms:
 		if wanted is None or scm.type in wanted:
-			(main, sub) = scm.cls.findAllReposInTree('.')
+			(main, sub) = scm.cls.findAllReposInTree(path, workers)
 			result.append(SCMFound(scm.type, main, sub))
 
 	return result
@@ -140,11 +165,59 @@ def isRepository(repository_url):
 
 	return result
 
-def findRepositoryRoot(repository = None):
+def markerStamp(directory):
+	""" Marker Stamp
+
+		Returns the state of the repository markers in the directory, the
+		modified time of each or None if it does not exist.
+	"""
+	result = []
+
+	for marker in DISCOVERY_MARKERS:
+		try:
+			result.append(os.stat(os.path.join(directory, marker)).st_mtime_ns)
+		except OSError:
+			result.append(None)
+
+	return tuple(result)
+
+def clearDiscoveryCache():
+	""" Clear Discovery Cache
+
+		Forget all the repositories that findRepositoryRoot() has found.
+	"""
+	discovery_cache.clear()
+
+def findCachedRepositoryRoot(repository):
+	""" Find Cached Repository Root
+
+		Returns the (repo_type, root) from the discovery cache, or None if the
+		directory is not in the cache or the markers between the directory and
+		the root have changed.
+	"""
+	result = None
+	entry = discovery_cache.get(repository)
+
+	if entry is not None:
+		(repo_type, root, stamps) = entry
+
+		for (directory, stamp) in stamps:
+			if markerStamp(directory) != stamp:
+				break
+		else:
+			result = (repo_type, root)
+
+	return result
+
+def findRepositoryRoot(repository = None, use_cache = True):
 	""" Find Repository Root
 
 		This function will search from the current directory, to the root until
 		the root is reached.
+
+		The result for each of the directories that are searched is kept in the
+		discovery cache, and is used until a ".git" or ".hg" between the
+		directory and the root is added, removed or changed.
 	"""
 	# use the current directory if none is given
 	if repository is None:
@@ -152,10 +225,20 @@ def findRepositoryRoot(repository = None):
 	else:
 		repository = os.path.abspath(repository)
 
+	if use_cache:
+		result = findCachedRepositoryRoot(repository)
+
+		if result is not None:
+			return result
+
 	old_path = ''
 	repo_type = None
+	searched = []
 
 	while old_path != repository:
+		# the stamp is taken first, so a change during the check is seen.
+		searched.append((repository, markerStamp(repository)))
+
 		# new check all the supported scms
 		repo_type = isRepository(repository)
 		if repo_type is not None:
@@ -167,6 +250,11 @@ def findRepositoryRoot(repository = None):
 		# did not find the repository
 		repository = None
 
+	if use_cache:
+		# each directory depends on the markers from it up to the root.
+		for index in range(len(searched)):
+			discovery_cache[searched[index][0]] = (repo_type, repository, searched[index:])
+
 	return (repo_type, repository)
 
 def createChangeHunk(change, lines = None):
@@ -202,11 +290,19 @@ def parseUnifiedDiff(version, parent_version, diff_array):
 		This function will take a list of the contents of the diff and then
 		generate a list of ChangeItems with the original and new file.
 	"""
+	return list(parseUnifiedDiffGenerator(version, parent_version, diff_array))
+
+def parseUnifiedDiffGenerator(version, parent_version, diff_array):
+	""" Parse Unified Diff Generator
+
+		This is the generator version of parseUnifiedDiff(), diff_array can be
+		any iterable of lines and each ChangeItem is yielded as soon as the
+		next file (or the end of the diff) is seen.
+	"""
 	in_diff = False
 	found = False
 	looking_for_first_diff = False
 	in_diff = False
-	result = []
 	lines = None
 	start_line = None
 	original_file = None
@@ -216,7 +312,8 @@ def parseUnifiedDiff(version, parent_version, diff_array):
 	for change in diff_array:
 		if change[0:4] == 'diff':
 			if found:
-				change_list.append(createChangeHunk(start_line, lines))
+				if in_diff:
+					change_list.append(createChangeHunk(start_line, lines))
 
 				if original_file is not None and new_file is not None:
 					change_type = 'M'
@@ -227,7 +324,7 @@ def parseUnifiedDiff(version, parent_version, diff_array):
 				else:
 					change_type = 'D'
 
-				result.append(ChangeItem(version, parent_version, change_type, original_file, new_file, change_list))
+				yield ChangeItem(version, parent_version, change_type, original_file, new_file, change_list)
 
 			new_file = None
 			original_file = None
@@ -294,8 +391,6 @@ def parseUnifiedDiff(version, parent_version, diff_array):
 		else:
 			change_type = 'D'
 
-		result.append(ChangeItem(version, parent_version, change_type, original_file, new_file, change_list))
-
-	return result
+		yield ChangeItem(version, parent_version, change_type, original_file, new_file, change_list)
 
 # vim: ts=4 sw=4 noexpandtab nocin ai
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: scm_cache
+#    desc: A cache for the SCM results that cannot change.
+#
+#          A file at a commit hash (or a submitted P4 changelist), the details
+#          of a commit and the diff between two commits never change. The
+#          CachedSCM wraps a SCM object and keeps these results in a SCMCache,
+#          the versions are resolved to their immutable ids (so "HEAD" or a
+#          branch name is resolved to the commit hash) before the cache is
+#          used. If the version cannot be resolved then the SCM is called.
+#          A version that resolved to itself (a full hash or a submitted
+#          changelist) can never change, so it is not resolved again.
+#
+#          The SCMCache has two tiers, a LRU in memory and (if a directory is
+#          given) a sqlite database on disk. Both are limited by size, the
+#          least recently used entries are removed first.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+#---------------------------------------------------------------------------------
+# Local Classes
+#---------------------------------------------------------------------------------
+class SCMCache(object):
+	""" SCM Cache
+
+		The values are pickled before they are stored, so the caller gets a new
+		copy each time and can change it without changing the cache.
+	"""
+	DATABASE_NAME = 'scm_cache.sqlite'
+
+	def __init__(self, directory=None, memory_size=16 * 1024 * 1024, disk_size=256 * 1024 * 1024):
+		self.lock = threading.RLock()
+		self.memory = OrderedDict()
+		self.memory_used = 0
+		self.memory_size = memory_size
+		self.disk_size = disk_size
+		self.disk_used = 0
+		self.database = None
+
+		self.counters = {	'memory_hits': 0,
+							'disk_hits': 0,
+							'misses': 0,
+							'stores': 0,
+							'evictions': 0,
+							'uncacheable': 0}
+
+		if directory is not None:
+			if not os.path.isdir(directory):
+				os.makedirs(directory)
+
+			self.database = sqlite3.connect(os.path.join(directory, SCMCache.DATABASE_NAME), check_same_thread=False)
+			self.database.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, size INTEGER, used REAL)')
+			self.database.execute('CREATE INDEX IF NOT EXISTS cache_used ON cache (used)')
+			self.database.commit()
+
+			(used,) = self.database.execute('SELECT TOTAL(size) FROM cache').fetchone()
+			self.disk_used = int(used)
+
+			if self.disk_used > self.disk_size:
+				self.__evictFromDisk()
+				self.database.commit()
+
+	def __del__(self):
+		self.close()
+
+	@staticmethod
+	def makeKey(*parts):
+		""" Make Key
+
+			Returns the content address for the parts of the key.
+		"""
+		return hashlib.sha1(repr(parts).encode(errors='surrogateescape')).hexdigest()
+
+	def getCounters(self):
+		""" Get Counters
+
+			Returns a copy of the hit/miss counters.
+		"""
+		with self.lock:
+			return dict(self.counters)
+
+	def countUncacheable(self):
+		with self.lock:
+			self.counters['uncacheable'] += 1
+
+	def __addToMemory(self, key, data):
+		""" [PRIVATE] add the value to the memory tier. """
+		if key in self.memory:
+			self.memory_used -= len(self.memory.pop(key))
+
+		if len(data) <= self.memory_size:
+			self.memory[key] = data
+			self.memory_used += len(data)
+
+			while self.memory_used > self.memory_size:
+				(_, old) = self.memory.popitem(last=False)
+				self.memory_used -= len(old)
+				self.counters['evictions'] += 1
+
+	def __evictFromDisk(self):
+		""" [PRIVATE] remove the least recently used entries, to 90% of the size. """
+		limit = self.disk_size * 9 // 10
+
+		while self.disk_used > limit:
+			rows = self.database.execute('SELECT key, size FROM cache ORDER BY used LIMIT 64').fetchall()
+
+			if len(rows) == 0:
+				self.disk_used = 0
+				break
+
+			for (key, size) in rows:
+				self.database.execute('DELETE FROM cache WHERE key = ?', (key,))
+				self.disk_used -= size
+				self.counters['evictions'] += 1
+
+				if self.disk_used <= limit:
+					break
+
+	def get(self, key):
+		""" Get
+
+			Returns a tuple of (found, value).
+		"""
+		with self.lock:
+			data = self.memory.get(key)
+
+			if data is not None:
+				self.memory.move_to_end(key)
+				self.counters['memory_hits'] += 1
+
+			elif self.database is not None:
+				row = self.database.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+
+				if row is not None:
+					data = bytes(row[0])
+					self.database.execute('UPDATE cache SET used = ? WHERE key = ?', (time.time(), key))
+					self.database.commit()
+					self.__addToMemory(key, data)
+					self.counters['disk_hits'] += 1
+
+			if data is None:
+				self.counters['misses'] += 1
+				return (False, None)
+
+		return (True, pickle.loads(data))
+
+	def put(self, key, value):
+		""" Put
+
+			Store the value for the key.
+		"""
+		data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+		with self.lock:
+			self.__addToMemory(key, data)
+			self.counters['stores'] += 1
+
+			if self.database is not None and len(data) <= self.disk_size:
+				row = self.database.execute('SELECT size FROM cache WHERE key = ?', (key,)).fetchone()
+
+				if row is not None:
+					self.disk_used -= row[0]
+
+				self.database.execute('INSERT OR REPLACE INTO cache (key, value, size, used) VALUES (?, ?, ?, ?)', (key, data, len(data), time.time()))
+				self.disk_used += len(data)
+
+				self.__evictFromDisk()
+				self.database.commit()
+
+	def clear(self):
+		""" Clear
+
+			Remove everything from the cache.
+		"""
+		with self.lock:
+			self.memory = OrderedDict()
+			self.memory_used = 0
+
+			if self.database is not None:
+				self.database.execute('DELETE FROM cache')
+				self.database.commit()
+				self.disk_used = 0
+
+	def close(self):
+		with self.lock:
+			if self.database is not None:
+				self.database.close()
+				self.database = None
+
+class CachedSCM(object):
+	""" Cached SCM
+
+		This wraps a SCM object, the functions that return immutable results
+		use the cache and all the other functions are passed to the SCM.
+	"""
+	def __init__(self, scm_object, cache=None):
+		self.scm = scm_object
+		self.immutable = set()		# the versions that name themselves
+
+		if cache is None:
+			self.cache = SCMCache()
+		else:
+			self.cache = cache
+
+	def __getattr__(self, name):
+		return getattr(self.scm, name)
+
+	def getSCM(self):
+		return self.scm
+
+	def getCounters(self):
+		return self.cache.getCounters()
+
+	def __resolve(self, version):
+		""" [PRIVATE] resolve the version to its immutable id.
+
+			Only the symbolic names (HEAD, branches and partial ids) need the
+			SCM to resolve them, a version that resolved to itself is kept.
+		"""
+		if version is not None and version.lstrip('@').lower() in self.immutable:
+			return version.lstrip('@').lower()
+
+		result = self.scm.resolveImmutableVersion(version)
+
+		if result is not None and version is not None and result.lower() == version.lstrip('@').lower():
+			self.immutable.add(result.lower())
+
+		return result
+
+	def __call(self, function_name, arguments, positions):
+		""" [PRIVATE] call the function if the result is not in the cache.
+
+			The arguments at the positions are the versions, they must all
+			resolve else the cache is not used. The function is called with the
+			resolved ids, so a ref that moves after it was resolved does not put
+			the newer result under the old id.
+		"""
+		function = getattr(self.scm, function_name)
+		resolved = []
+		fetch_arguments = list(arguments)
+
+		for position in positions:
+			immutable = self.__resolve(arguments[position])
+
+			if immutable is None:
+				self.cache.countUncacheable()
+				return function(*arguments)
+
+			resolved.append(immutable)
+			fetch_arguments[position] = immutable
+
+		key = SCMCache.makeKey(self.scm.getType(), self.scm.getRoot(), function_name, tuple(resolved), tuple(arguments))
+		(found, result) = self.cache.get(key)
+
+		if not found:
+			result = function(*fetch_arguments)
+
+			# a failure (or an empty result) may not be permanent, so don't keep it.
+			if result is not None and result != []:
+				self.cache.put(key, result)
+
+		return result
+
+	def getFile(self, file_name, specific_commit = None):
+		return self.__call('getFile', (file_name, specific_commit), [1])
+
+	def getChangeList(self, specific_commit):
+		return self.__call('getChangeList', (specific_commit,), [0])
+
+	def getCommitDetails(self, commit_id):
+		return self.__call('getCommitDetails', (commit_id,), [0])
+
+	def getPatch(self, specific_commit = None):
+		return self.__call('getPatch', (specific_commit,), [0])
+
+	def getDiffDetails(self, from_version = None, to_version = None, path = None):
+		if from_version is None or to_version is None:
+			# one side is the working tree, that can change.
+			self.cache.countUncacheable()
+			return self.scm.getDiffDetails(from_version, to_version, path)
+		else:
+			return self.__call('getDiffDetails', (from_version, to_version, path), [0, 1])
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
@@ -42,6 +42,9 @@ class SCM_BASE(object):
 
 		self.password_function = None
 
+		# the time that the phases of the (slow) functions took.
+		self.timings = {}
+
 	MERGE_WORKING	= 0
 	MERGE_THEIRS	= 1
 	MERGE_OURS		= 2
@@ -50,7 +53,7 @@ class SCM_BASE(object):
 	# Functions that query the state of the repository
 	#---------------------------------------------------------------------------------
 	@staticmethod
-	def findAllReposInTree(path):
+	def findAllReposInTree(path, workers=None):
 		""" Find all repos in tree.
 
 			This function will return two lists, one of the repos that are found in
@@ -103,6 +106,30 @@ class SCM_BASE(object):
 	def getRoot(self):
 		return self.working_dir
 
+	def getCacheDirectory(self):
+		return None
+
+	def getTimings(self, function_name=None):
+		""" Get Timings
+
+			Some functions record how long each phase of the function took, this
+			returns the timings for the last call of the function, or all of the
+			timings if the function is not given.
+		"""
+		if function_name is None:
+			return self.timings
+		else:
+			return self.timings.get(function_name)
+
+	def close(self):
+		""" Close
+
+			This function will release any resources (processes, connections) that
+			the SCM object holds. The object can still be used after it has been
+			closed.
+		"""
+		pass
+
 	def setPasswordFunction(self, password_func):
 		self.password_function = password_func
 
@@ -145,6 +172,15 @@ class SCM_BASE(object):
 	def hasVersion(self,version):
 		return False
 
+	def resolveImmutableVersion(self, version=None):
+		""" Resolve Immutable Version
+
+			Returns the id of the version that will never change (i.e. a commit
+			hash) or None if the version cannot be resolved to one. If version
+			is None then the current version is resolved.
+		"""
+		return None
+
 	def setVersion(self,version):
 		return False
 
@@ -154,6 +190,20 @@ class SCM_BASE(object):
 	def getFile(self, file_name, specific_commit = None):
 		return []
 
+	def getFiles(self, file_names, specific_commit = None):
+		""" Get Files
+
+			This function will return a dictionary of the file name to the list
+			of lines in the file, for all the files given. SCMs that can fetch
+			more than one file at a time should override this.
+		"""
+		result = OrderedDict()
+
+		for file_name in file_names:
+			result[file_name] = self.getFile(file_name, specific_commit)
+
+		return result
+
 	def getChangeList(self, specific_commit):
 		""" This function will return a change list for the specified change """
 		return None
@@ -167,16 +217,14 @@ class SCM_BASE(object):
 	def getDirectoryListing(self,directory_name):
 		return []
 
-	def getSourceTree(self, version: str = None) -> SourceTree:
+	def getSourceTree(self, version: str = None, compact: bool = False) -> SourceTree:
 		""" This function will return the SCM contents as a SourceTree.  """
 		return SourceTree(self.getName())
 
-	def getTreeListingGenerator(self):
+	def getTreeListingGenerator(self, version=None):
 		""" This function will return the directory listing for the given commit.  """
-		if False:
-			yield None
-		else:
-			raise StopIteration
+		return
+		yield
 
 	def getBranch(self):
 		return ''
@@ -190,17 +238,24 @@ class SCM_BASE(object):
 	def getCommitDetails(self, commit_id):
 		return None
 
-	def getCommitList(self):
+	def getCommitList(self, exclude=None):
 		return []
 
+	def getHistoryGenerator(self, filename=None, version=None, max_entries=None):
+		for item in self.getHistory(filename, version, max_entries) or []:
+			yield item
+
+	def getCommitListGenerator(self, exclude=None):
+		for item in self.getCommitList(exclude) or []:
+			yield item
+
 	def getTreeChanges(self, from_version = None, to_version = None, path = None, check_server=False):
 		return []
 
-	def getTreeChangesGenerator(self):
-		if False:
-			yield None
-		else:
-			raise StopIteration
+	def getTreeChangesGenerator(self, from_version = None, to_version = None, path = None, check_server=False):
+		""" The default generators use the list function, the SCMs that can stream override these. """
+		for item in self.getTreeChanges(from_version, to_version, path, check_server) or []:
+			yield item
 
 	def getDiffDetails(self, from_version = None, to_version = None, path = None):
 		return []
@@ -214,12 +269,37 @@ class SCM_BASE(object):
 	def getBranches(self):
 		return (None, [])
 
+	def getRefs(self):
+		""" Get Refs
+
+			This function returns a list of Ref tuples for all the branches, the
+			remote branches and the tags of the repository. The commit_id of a
+			tag is the commit that it points to and object_id is the tag.
+		"""
+		result = []
+
+		(_, branch_list) = self.getBranches()
+		for branch in branch_list:
+			if branch.remote is None:
+				result.append(scm.Ref(branch.commit_id, branch.name, 'branch', branch.commit_id, None))
+			else:
+				result.append(scm.Ref(branch.commit_id, branch.name, 'remote', branch.commit_id, branch.remote))
+
+		(_, tag_list) = self.getTags()
+		for tag in tag_list:
+			result.append(scm.Ref(tag[0], tag[1], 'tag', tag[0], None))
+
+		return result
+
 	def searchCommits(self, search_string, selected_commits = []):
 		return []
 
 	def checkObjectExists(self, object_name, specific_commit = None):
 		return False
 
+	def getStatusSnapshot(self, path = None):
+		return None
+
 	def isRepositoryClean(self):
 		return False
 
@@ -21,10 +21,17 @@ import string
 from . import scmbase
 import getpass
 import subprocess
+import concurrent.futures
 from collections import OrderedDict
 from beorn_lib.source_tree import SourceTree
+from beorn_lib.compact_tree import CompactTree, CompactTreeNode
+from .git_cat_file import GitCatFile
+from .diff_buffer import parseUnifiedDiffBuffer, parseUnifiedDiffStream, UnifiedDiffParser
 from typing import Union
 
+# marks the start of each commit in the "git log -p" output of getTreeChangeDetails()
+COMMIT_SENTINEL = '%x00%x00'
+COMMIT_SENTINEL_BYTES = b'\0\0'
 
 def checkForType(repository):
 	""" Check For Type
@@ -58,6 +65,427 @@ def checkForType(repository):
 	return result
 
 
+def scanForRepositories(path):
+	""" Scan For Repositories
+
+		This function reads a directory for findAllReposInTree(). It returns a
+		tuple of the type of the '.git' entry ('dir', 'file' or None) and the
+		(path, is_link) of the sub-directories to search. The '.git' directory
+		and the directories in the SourceTree directory filter are not searched.
+
+		It is safe to call it from any thread.
+	"""
+	git_type = None
+	sub_directories = []
+	directory_filter = SourceTree.getDirectoryFilter()
+
+	try:
+		with os.scandir(path) as entries:
+			for entry in entries:
+				try:
+					if entry.name == '.git':
+						git_type = 'dir' if entry.is_dir() else 'file'
+
+					elif entry.is_dir() and entry.name not in directory_filter:
+						sub_directories.append((entry.path, entry.is_symlink()))
+
+				except OSError:
+					pass
+
+	except OSError:
+		pass
+
+	return (git_type, sub_directories)
+
+def addScannedDirectory(directory, scan, git_repos, sub_modules, seen_links):
+	""" Add Scanned Directory
+
+		This function adds the directory to the git_repos or the sub_modules
+		from the scanForRepositories() result, and returns the sub-directories
+		that should be searched. A linked directory is only searched if the
+		target has not been seen before and is not above the directory.
+	"""
+	(git_type, sub_directories) = scan
+
+	if git_type == 'file':
+		sub_modules.append(directory)
+	elif git_type == 'dir':
+		git_repos.append(directory)
+
+	result = []
+
+	for (sub_directory, is_link) in sub_directories:
+		if is_link:
+			real_path = os.path.realpath(sub_directory)
+
+			if real_path in seen_links or (os.path.realpath(directory) + os.sep).startswith(real_path + os.sep):
+				continue
+
+			seen_links.add(real_path)
+
+		result.append(sub_directory)
+
+	return result
+
+def decodeNameStatus(output):
+	""" Decode Name Status
+
+		This function will decode the output of "git diff --name-status -z" and
+		returns a list of (flag, path) tuples. For renames and copies the flag
+		(with the score) is returned against the original path.
+	"""
+	result = []
+	records = output.split(b'\0')
+	index = 0
+
+	while index < len(records) - 1:
+		flag = records[index].decode()
+		result.append((flag, records[index + 1].decode(errors='surrogateescape')))
+
+		if flag[0:1] == 'R' or flag[0:1] == 'C':
+			index += 3
+		else:
+			index += 2
+
+	return result
+
+def decodeStatusFlags(output):
+	""" Decode Status Flags
+
+		This function will decode the output of "git status --porcelain=v2 -z"
+		and will return a list of (flag, path) tuples of the changes between HEAD
+		and the working tree. Untracked files are returned as added and renames
+		are returned against the original path, as "git diff" does.
+	"""
+	result = []
+	records = output.split(b'\0')
+	index = 0
+
+	while index < len(records):
+		record = records[index]
+		kind = record[0:1]
+
+		if kind == b'1':
+			fields = record.split(b' ', 8)
+			path = fields[8].decode(errors='surrogateescape')
+			(staged, unstaged) = (fields[1][0:1], fields[1][1:2])
+
+			if unstaged == b'D' or (staged == b'D' and unstaged == b'.'):
+				result.append(('D', path))
+			elif staged == b'A':
+				result.append(('A', path))
+			else:
+				result.append(('M', path))
+
+		elif kind == b'2':
+			fields = record.split(b' ', 9)
+
+			index += 1
+			result.append((fields[8].decode(), records[index].decode(errors='surrogateescape')))
+
+		elif kind == b'u':
+			fields = record.split(b' ', 10)
+			result.append(('U', fields[10].decode(errors='surrogateescape')))
+
+		elif kind == b'?':
+			result.append(('A', record[2:].decode(errors='surrogateescape')))
+
+		index += 1
+
+	return result
+
+def decodeStatusSnapshot(output):
+	""" Decode Status Snapshot
+
+		This function will decode the output of "git status --porcelain=v2 -z
+		--branch" and return a StatusSnapshot. The staged and unstaged changes
+		are StatusEntry tuples with the change letter of that side, the
+		conflicts have the two letter code and the untracked files are paths.
+	"""
+	commit_id = None
+	branch = None
+	upstream = None
+	ahead = 0
+	behind = 0
+	staged = []
+	unstaged = []
+	untracked = []
+	conflicted = []
+
+	records = output.split(b'\0')
+	index = 0
+
+	while index < len(records):
+		record = records[index]
+		kind = record[0:1]
+
+		if kind == b'#':
+			parts = record.decode(errors='surrogateescape').split(' ')
+
+			if parts[1] == 'branch.oid' and parts[2] != '(initial)':
+				commit_id = parts[2]
+			elif parts[1] == 'branch.head' and parts[2] != '(detached)':
+				branch = parts[2]
+			elif parts[1] == 'branch.upstream':
+				upstream = parts[2]
+			elif parts[1] == 'branch.ab' and parts[2] != '+?':
+				# "+? -?" is given when the counts are not asked for.
+				ahead = int(parts[2])
+				behind = -int(parts[3])
+
+		elif kind == b'1' or kind == b'2':
+			if kind == b'1':
+				fields = record.split(b' ', 8)
+				path = fields[8].decode(errors='surrogateescape')
+				original_path = None
+			else:
+				fields = record.split(b' ', 9)
+				path = fields[9].decode(errors='surrogateescape')
+				index += 1
+				original_path = records[index].decode(errors='surrogateescape')
+
+			(staged_flag, unstaged_flag) = (fields[1][0:1].decode(), fields[1][1:2].decode())
+
+			if staged_flag != '.':
+				staged.append(scm.StatusEntry(staged_flag, path, original_path if staged_flag in 'RC' else None))
+
+			if unstaged_flag != '.':
+				unstaged.append(scm.StatusEntry(unstaged_flag, path, original_path if unstaged_flag in 'RC' else None))
+
+		elif kind == b'u':
+			fields = record.split(b' ', 10)
+			conflicted.append(scm.StatusEntry(fields[1].decode(), fields[10].decode(errors='surrogateescape'), None))
+
+		elif kind == b'?':
+			untracked.append(record[2:].decode(errors='surrogateescape'))
+
+		index += 1
+
+	return scm.StatusSnapshot(commit_id, branch, upstream, ahead, behind, staged, unstaged, untracked, conflicted)
+
+def statusTreeChanges(snapshot):
+	""" Status Tree Changes
+
+		This function returns the changes between HEAD and the working tree
+		from a StatusSnapshot, as the SCMStatus list that getTreeChanges()
+		returns. A rename is returned as the original path deleted and the new
+		path added, the conflicts are modified and the untracked files added.
+	"""
+	changes = {}
+
+	for entry in snapshot.staged:
+		changes[entry.path] = [entry.status, '.']
+
+		if entry.status == 'R':
+			changes[entry.original_path] = ['D', '.']
+
+	for entry in snapshot.unstaged:
+		changes.setdefault(entry.path, ['.', '.'])[1] = entry.status
+
+	for entry in snapshot.conflicted:
+		changes[entry.path] = ['M', '.']
+
+	result = []
+
+	for path in sorted(changes):
+		(staged_flag, unstaged_flag) = changes[path]
+
+		if unstaged_flag == 'D' or (staged_flag == 'D' and unstaged_flag == '.'):
+			result.append(scm.SCMStatus('D', path))
+		elif staged_flag in 'ARC':
+			result.append(scm.SCMStatus('A', path))
+		else:
+			result.append(scm.SCMStatus('M', path))
+
+	for path in snapshot.untracked:
+		result.append(scm.SCMStatus('A', path))
+
+	return result
+
+def parseCommitDiff(commit):
+	""" Parse Commit Diff
+
+		This function takes a (commit, parent, lines) tuple as produced from the
+		"git log -p" output and returns the ChangeItems for the commit. The lines
+		are bytes.
+	"""
+	(version, parent, lines) = commit
+
+	# the blank line before the next commit is not part of the diff.
+	while len(lines) > 0 and lines[-1] == b'':
+		lines = lines[:-1]
+
+	return parseUnifiedDiffBuffer(version, parent, b'\n'.join(lines))
+
+def decodeHistoryLine(line):
+	""" Decode History Line
+
+		This function will decode a line from "git rev-list --timestamp --oneline"
+		and return a HistoryItem, or None if the line cannot be decoded.
+	"""
+	parts = line.split(' ', 2)
+
+	if len(parts) == 3:
+		return scm.HistoryItem(parts[1], parts[2], parts[0], None, None)
+	else:
+		return None
+
+def decodeCommitLine(line):
+	""" Decode Commit Line
+
+		This function will decode a line from "git log --pretty=%h:%p#%s" and
+		return a Commit, or None if the line cannot be decoded.
+	"""
+	parts = line.split('#', 1)
+
+	if len(parts) == 2:
+		# the abbreviated ids are longer than 7 characters on large repositories.
+		(commit_id, _, parents) = parts[0].partition(':')
+		return scm.Commit(commit_id, parents.split(), parts[1])
+	else:
+		return None
+
+def decodeTreeChangeLine(line):
+	""" Decode Tree Change Line
+
+		This function will decode a line from "git status --porcelain" or
+		"git diff --name-status" and return a SCMStatus, or None if the line is
+		not a change.
+	"""
+	result = None
+	bits = line.lstrip().split()
+
+	if len(bits) >= 2:
+		# what sort of change are you?
+		if bits[0] == 'M' or bits[0] == 'C':
+			result = scm.SCMStatus('M', bits[1])
+
+		elif bits[0] == 'A' or bits[0][0] == '?':
+			result = scm.SCMStatus('A', bits[1])
+
+		elif bits[0] == 'D' or bits[0] == 'R':
+			result = scm.SCMStatus('D', bits[1])
+
+	return result
+
+def decodeListingRecord(record):
+	""" Decode Listing Record
+
+		This function will decode a record from "git ls-tree -z" and return a
+		SCMItem with the path of the item, or None if the record is not valid.
+	"""
+	tab = record.find(b'\t')
+
+	if tab == -1:
+		return None
+
+	parts = record[:tab].split()
+
+	# decode the file type
+	if parts[1] == b'blob':
+		item_type = 'file'
+	elif parts[1] == b'tree':
+		item_type = 'dir'
+	elif parts[1] == b'commit':
+		item_type = 'module'
+	else:
+		item_type = 'unknown'
+
+	return scm.SCMItem(item_type, record[tab+1:].decode(errors='surrogateescape'))
+
+def decodeTags(output):
+	""" Decode Tags
+
+		This function will decode the output of "git show-ref --tags -d --abbrev"
+		and return the (current, tags) tuple that getTags() returns.
+	"""
+	current = -1
+	result = []
+
+	for line in output.splitlines():
+		parts = line.split()
+
+		if parts[1][-3:] == "^{}":
+			# we have the object reference - we can add that
+			# also need to remove "refs/tags/" from the front of the reference
+			current = len(result)
+			result.append((parts[0], parts[1][10:-3]))
+
+	return (current, result)
+
+def decodeRefs(output):
+	""" Decode Refs
+
+		This function will decode the output of "git show-ref -d --abbrev" and
+		return the list of Ref tuples that getRefs() returns. An annotated tag
+		is followed by a "^{}" line with the commit that it points to. The
+		remote HEAD refs are not returned.
+	"""
+	result = []
+	tags = {}
+
+	for line in output.splitlines():
+		parts = line.split(' ', 1)
+
+		if len(parts) == 2:
+			(object_id, ref_name) = parts
+
+			if ref_name.startswith('refs/heads/'):
+				result.append(scm.Ref(object_id, ref_name[11:], 'branch', object_id, None))
+
+			elif ref_name.startswith('refs/remotes/'):
+				(remote, _, name) = ref_name[13:].partition('/')
+
+				if name != 'HEAD':
+					result.append(scm.Ref(object_id, name, 'remote', object_id, remote))
+
+			elif ref_name.startswith('refs/tags/'):
+				if ref_name[-3:] == '^{}':
+					# the peeled tag, use the commit.
+					index = tags.get(ref_name[10:-3])
+
+					if index is not None:
+						result[index] = result[index]._replace(commit_id=object_id)
+				else:
+					tags[ref_name[10:]] = len(result)
+					result.append(scm.Ref(object_id, ref_name[10:], 'tag', object_id, None))
+
+	return result
+
+def decodeBranches(output):
+	""" Decode Branches
+
+		This function will decode the output of "git branch -v" and return the
+		(current, branches) tuple that getBranches() returns.
+	"""
+	current = -1
+	result = []
+
+	for line in output.splitlines():
+		parts = line.split()
+		remote = None
+
+		# add the branch_name, commit, branch_description to the tuple.
+		if parts[0] == '*':
+			current = len(result)
+			branch_name = parts[1]
+			commit		= parts[2]
+			comment		= ' '.join(parts[3:])
+		else:
+			branch_name = parts[0]
+			commit		= parts[1]
+			comment		= ' '.join(parts[2:])
+
+		if branch_name[0:7] == 'remotes':
+			# we have a remote, decode the name
+			[remote, branch_name] = branch_name[8:].split('/', 1)
+
+		# add the new branch item to the list
+		result.append(scm.Branch(commit, branch_name, comment, remote))
+
+	return (current, result)
+
+
 class SCM_GIT(scmbase.SCM_BASE):
 	""" SCM_GIT class.
 
@@ -72,10 +500,49 @@ class SCM_GIT(scmbase.SCM_BASE):
 	# unlovable hack to redirect stderr to the bin
 	__nul_f = open(os.devnull, 'w')
 
+	# the command that getCommitList() uses, decoded with decodeCommitLine().
+	commit_list_command = ['log', '--pretty=%h:%p#%s', '--all', '--reverse']
+
+	# default for new objects, use long running cat-file processes to read objects.
+	batch_mode = False
+
+	# default for new objects, how many seconds a status snapshot can be reused for.
+	status_cache_time = 0.0
+
 	def __init__(self, repo_url, working_dir=None, user_name=None, password=None, server_url=None):
 		self.version = 'HEAD'
+		self.batch_mode = SCM_GIT.batch_mode
+		self.batch_reader = None
+		self.batch_checker = None
+		self.cache_directory = None
+		self.status_cache_time = SCM_GIT.status_cache_time
+		self.status_snapshot = None
 		super(SCM_GIT, self).__init__(repo_url, working_dir, user_name, password, server_url)
 
+	def __del__(self):
+		self.close()
+
+	def buildCommand(self, command, git_dir = True):
+		""" Build Command
+
+			This function will return the full command list that is needed to run
+			the git sub-command against this repository.
+		"""
+		if (not git_dir) or (self.working_dir is None):
+			command_list = SCM_GIT.__git_root_command + command
+		else:
+			command_list = SCM_GIT.__git_root_command[:]
+
+			if self.repo_dir is not None:
+				command_list.append("--git-dir=" + os.path.join(self.repo_dir, '.git'))
+
+			if self.working_dir is not None:
+				command_list += ["-C", self.working_dir]
+
+			command_list += command
+
+		return command_list
+
 	def __callGit(self, command, git_dir = True):
 		""" [PRIVATE] calls the git function and returns a tuple as the result.
 			The First part of the tuple is the status of the function. Did it work
@@ -86,31 +553,15 @@ class SCM_GIT(scmbase.SCM_BASE):
 			  (status,result) = self.__callGit([... git sub-command ...])
 		"""
 		try:
-			if (not git_dir) or (self.working_dir is None):
-				if sys.platform == 'win32':
-					CREATE_NO_WINDOW = 0x08000000
-					output = subprocess.check_output(SCM_GIT.__git_root_command + command, stderr=SCM_GIT.__nul_f, creationflags=CREATE_NO_WINDOW).decode()
-				else:
-					output = subprocess.check_output(SCM_GIT.__git_root_command + command, stderr=SCM_GIT.__nul_f).decode()
+			command_list = self.buildCommand(command, git_dir)
 
-				result = True
+			if sys.platform == 'win32':
+				CREATE_NO_WINDOW = 0x08000000
+				output = subprocess.check_output(command_list, stderr=SCM_GIT.__nul_f, creationflags=CREATE_NO_WINDOW).decode()
 			else:
-				command_list = SCM_GIT.__git_root_command[:]
-
-				if self.repo_dir is not None:
-					command_list.append("--git-dir=" + os.path.join(self.repo_dir, '.git'))
-
-				if self.working_dir is not None:
-					command_list += ["-C", self.working_dir]
-
-				command_list += command
+				output = subprocess.check_output(command_list, stderr=SCM_GIT.__nul_f).decode()
 
-				if sys.platform == 'win32':
-					CREATE_NO_WINDOW = 0x08000000
-					output = subprocess.check_output(command_list, stderr=SCM_GIT.__nul_f, creationflags=CREATE_NO_WINDOW).decode()
-				else:
-					output = subprocess.check_output(command_list, stderr=SCM_GIT.__nul_f).decode()
-				result = True
+			result = True
 
 		except subprocess.CalledProcessError:
 			output = ''
@@ -118,11 +569,147 @@ class SCM_GIT(scmbase.SCM_BASE):
 
 		return (result, output)
 
+	def __startGit(self, command):
+		""" [PRIVATE] start a git command and return the process.
+
+			This allows for more than one git command to be run at the same time,
+			the output should be read with __finishGit(). If the command could
+			not be started then None is returned.
+		"""
+		try:
+			if sys.platform == 'win32':
+				CREATE_NO_WINDOW = 0x08000000
+				result = subprocess.Popen(self.buildCommand(command), stdout=subprocess.PIPE, stderr=SCM_GIT.__nul_f, creationflags=CREATE_NO_WINDOW)
+			else:
+				result = subprocess.Popen(self.buildCommand(command), stdout=subprocess.PIPE, stderr=SCM_GIT.__nul_f)
+
+		except OSError:
+			result = None
+
+		return result
+
+	def __finishGit(self, process):
+		""" [PRIVATE] wait for a git command started by __startGit().
+
+			Returns the same tuple as __callGit(), but the output is the raw bytes
+			as this is used for commands that have -z output.
+		"""
+		if process is None:
+			return (False, b'')
+
+		(output, _) = process.communicate()
+
+		if process.returncode == 0:
+			return (True, output)
+		else:
+			return (False, b'')
+
+	def __streamGit(self, command, separator=b'\n'):
+		""" [PRIVATE] run a git command and yield its output as it arrives.
+
+			The output is split on the separator and each record is yielded as
+			bytes without the separator. If the separator is None then the chunks
+			are yielded as they are read. Only one chunk of the output is held at
+			a time. If the generator is not run to the end (or is closed) then
+			the git process is killed.
+		"""
+		process = self.__startGit(command)
+
+		if process is not None:
+			try:
+				remains = b''
+
+				while True:
+					chunk = process.stdout.read1(65536)
+
+					if chunk == b'':
+						break
+
+					if separator is None:
+						yield chunk
+						continue
+
+					records = (remains + chunk).split(separator)
+					remains = records.pop()
+
+					for record in records:
+						yield record
+
+				if remains != b'':
+					yield remains
+
+			finally:
+				if process.poll() is None:
+					process.kill()
+
+				process.stdout.close()
+				process.wait()
+
+	def __readObject(self, object_name, check_only=False):
+		""" [PRIVATE] read an object via the batch cat-file processes.
+
+			The processes are started the first time that they are needed. It will
+			return None if batch mode is not enabled or the batch process failed,
+			else the tuple (object_type, contents) from the cat-file process.
+		"""
+		result = None
+
+		if self.batch_mode:
+			if check_only:
+				if self.batch_checker is None:
+					self.batch_checker = GitCatFile(self.buildCommand([]), True)
+
+				result = self.batch_checker.readObject(object_name)
+			else:
+				if self.batch_reader is None:
+					self.batch_reader = GitCatFile(self.buildCommand([]))
+
+				result = self.batch_reader.readObject(object_name)
+
+		return result
+
+	def setBatchMode(self, enabled):
+		""" Set Batch Mode
+
+			If batch mode is enabled then getFile() and checkObjectExists() will use
+			long running "git cat-file --batch" processes instead of starting a new
+			git process for each call. Disabling batch mode will stop the processes.
+		"""
+		self.batch_mode = enabled
+
+		if not enabled:
+			self.close()
+
+	def setStatusCacheTime(self, seconds):
+		""" Set Status Cache Time
+
+			The status snapshot is reused for the given number of seconds, as long
+			as the index file has not changed. Changes to the working tree that do
+			not change the index will not be seen until the time has passed, so
+			this should be short. Zero turns off the cache.
+		"""
+		self.status_cache_time = seconds
+		self.status_snapshot = None
+
+	def close(self):
+		""" Close
+
+			This function will shut down any long running git processes that this
+			object owns. They will be restarted if they are needed again.
+		"""
+		if getattr(self, 'batch_reader', None) is not None:
+			self.batch_reader.close()
+			self.batch_reader = None
+
+		if getattr(self, 'batch_checker', None) is not None:
+			self.batch_checker.close()
+			self.batch_checker = None
+
 	#---------------------------------------------------------------------------------
 	# Functions that query the state of the repository
 	#---------------------------------------------------------------------------------
 	@staticmethod
-	def findAllReposInTree(path):
+	def findAllReposInTree(path, workers=None):
 		""" Find All Repos in Tree
 
 			This function will walk the directory tree and find all the
@@ -132,23 +719,47 @@ class SCM_GIT(scmbase.SCM_BASE):
 			that are files as these are submodules and directories are
 			full repos.
 
+			The walk does not go into the ".git" directories or the
+			directories in the SourceTree directory filter. Linked directories
+			are followed, but not if the link has been seen before or points
+			back up the tree. If workers is greater than one, then the
+			directories are read by a pool of that many threads.
+
 			This code is ignoring 'bare' repos - dirs that normally end
 			in *.git as that is only convention and cant be relied on.
 		"""
 		sub_modules = []
 		git_repos = []
+		seen_links = set()
 
 		# search children for repos
-		for root, dirs, files in os.walk(path, followlinks=True):
-			if '.git' in files:
-				sub_modules.append(os.path.abspath(root))
+		root = os.path.abspath(path)
+
+		if workers is not None and workers > 1:
+			with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+				running = {pool.submit(scanForRepositories, root): root}
+
+				while len(running) > 0:
+					(done, _) = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+
+					for future in done:
+						directory = running.pop(future)
+
+						for sub_directory in addScannedDirectory(directory, future.result(), git_repos, sub_modules, seen_links):
+							running[pool.submit(scanForRepositories, sub_directory)] = sub_directory
+		else:
+			pending = [root]
 
-			if '.git' in dirs:
-				# want any links to be relative the main repo.
-				git_repos.append(os.path.abspath(root))
+			while len(pending) > 0:
+				directory = pending.pop()
+				pending.extend(addScannedDirectory(directory, scanForRepositories(directory), git_repos, sub_modules, seen_links))
+
+		# the threads find them in any order.
+		git_repos.sort()
+		sub_modules.sort()
 
 		# Now need to search for parent trees.
-		(working_path, _) = os.path.split(os.path.abspath(path))
+		(working_path, _) = os.path.split(root)
 		while working_path != '':
 			if '.git' in os.listdir(working_path):
 				git_path = os.path.join(working_path, '.git')
@@ -199,6 +810,20 @@ class SCM_GIT(scmbase.SCM_BASE):
 	def getRoot(self):
 		return self.working_dir
 
+	def getCacheDirectory(self):
+		""" Get Cache Directory
+
+			Returns the git directory of the repository, the caches of the
+			repository are kept in there. It returns None if it cannot be found.
+		"""
+		if self.cache_directory is None:
+			(status, output) = self.__callGit(["rev-parse", "--absolute-git-dir"])
+
+			if status and output.strip() != '':
+				self.cache_directory = output.strip()
+
+		return self.cache_directory
+
 	def generateRelativeReference(self, name, distance):
 		""" Generate Relative Reference
 
@@ -232,6 +857,24 @@ class SCM_GIT(scmbase.SCM_BASE):
 		else:
 			return True
 
+	def resolveImmutableVersion(self, version=None):
+		""" Resolve Immutable Version
+
+			This function returns the full commit hash of the version (a branch,
+			tag, HEAD or a partial hash), or None if it is not a commit. If the
+			version is None then the version the class is set to is used.
+		"""
+		if version is None:
+			version = self.getVersion()
+
+		(status, output) = self.__callGit(["rev-parse", "--quiet", "--verify", version + "^{commit}"])
+		output = output.strip()
+
+		if status and len(output) == 40:
+			return output
+		else:
+			return None
+
 	def setVersion(self, version):
 		""" This function will set the version.
 
@@ -297,17 +940,76 @@ class SCM_GIT(scmbase.SCM_BASE):
 			else:
 				commit = 'HEAD'
 
-		(_, output) = self.__callGit(["cat-file", "blob",  commit + ':' + self.normaliseFilename(file_name)])
+		object_name = commit + ':' + self.normaliseFilename(file_name)
+		batch_result = self.__readObject(object_name)
+
+		if batch_result is None:
+			(_, output) = self.__callGit(["cat-file", "blob", object_name])
+
+		elif batch_result[0] == 'blob':
+			output = batch_result[1].decode()
+
+		else:
+			output = ''
 
 		return output.splitlines()
 
+	def getFiles(self, file_names, specific_commit=None):
+		""" Get Files
+
+			This function will return a dictionary of file name to the list of
+			lines in the file. All the files are read with a single cat-file
+			process, if batch mode is enabled then the long running one is used.
+
+			As with getFile() a file that cannot be read will return an empty
+			list.
+		"""
+		if specific_commit is not None:
+			commit = specific_commit
+		else:
+			if self.version != '':
+				commit = self.version
+			else:
+				commit = 'HEAD'
+
+		object_names = []
+		for file_name in file_names:
+			object_names.append(commit + ':' + self.normaliseFilename(file_name))
+
+		if self.batch_mode:
+			if self.batch_reader is None:
+				self.batch_reader = GitCatFile(self.buildCommand([]))
+
+			objects = self.batch_reader.readObjects(object_names)
+		else:
+			reader = GitCatFile(self.buildCommand([]))
+			objects = reader.readObjects(object_names)
+			reader.close()
+
+		result = OrderedDict()
+
+		for index, file_name in enumerate(file_names):
+			if objects[index] is None:
+				# could not be read via the batch, do it the slow way.
+				result[file_name] = self.getFile(file_name, commit)
+
+			elif objects[index][0] == 'blob':
+				result[file_name] = objects[index][1].decode().splitlines()
+
+			else:
+				result[file_name] = []
+
+		return result
+
 	def getChangeList(self, specific_commit):
 		""" This function will return a change list for the specified change """
+		parser = UnifiedDiffParser(specific_commit, None)
+
 		#(result, output) = self.__callGit(["show", '-p', '--expand-tabs=0', specific_commit])
-		(result, output) = self.__callGit(["show", '-p', specific_commit])
+		changes = list(parseUnifiedDiffStream(specific_commit, None, self.__streamGit(["show", '-p', specific_commit], None), parser))
 
-		if result:
-			contents = output.splitlines()
+		if len(parser.preamble) > 0:
+			contents = parser.preamble.decode(errors='replace').splitlines()
 
 			author = contents[1][8:]
 			timestamp = int(time.mktime(time.strptime(contents[2][8:-6], "%a %b %d %H:%M:%S %Y")))
@@ -324,7 +1026,7 @@ class SCM_GIT(scmbase.SCM_BASE):
 			if comment[0] == '':
 				comment = comment[1:]
 
-			return scm.ChangeList(contents[0][7:], timestamp, author, comment, scm.parseUnifiedDiff(specific_commit, None, contents))
+			return scm.ChangeList(contents[0][7:], timestamp, author, comment, changes)
 		return None
 
 	def getPatch(self, specific_commit = None):
@@ -395,7 +1097,13 @@ class SCM_GIT(scmbase.SCM_BASE):
 			else:
 				commit = 'HEAD'
 
-		(result, _) = self.__callGit(["cat-file", "blob",  commit + ':' + file_name])
+		object_name = commit + ':' + file_name
+		batch_result = self.__readObject(object_name, True)
+
+		if batch_result is None:
+			(result, _) = self.__callGit(["cat-file", "blob", object_name])
+		else:
+			result = batch_result[0] == 'blob'
 
 		return result
 
@@ -432,8 +1140,25 @@ class SCM_GIT(scmbase.SCM_BASE):
 
 		return result
 
-	def getSourceTree(self, version: str = None) -> SourceTree:
-		""" This function will return the SCM contents as a SourceTree.  """
+	def getSourceTree(self, version: str = None, compact: bool = False) -> Union[SourceTree, CompactTreeNode]:
+		""" Get Source Tree
+
+			This function will return the SCM contents as a SourceTree, with the
+			items that have been changed in the working tree flagged.
+
+			The git commands are all started at the same time so that they run
+			concurrently and the -z output is used so that paths with spaces in
+			them are handled. If the version is HEAD then the changes and the
+			untracked files are taken from a single "git status". The tree is
+			then built in one pass over the sorted paths.
+
+			The time for each phase is saved and can be read with getTimings().
+
+			If compact is True the tree is built as a CompactTree, which uses a lot
+			less memory for large repositories, and the root view is returned.
+		"""
+		timings = OrderedDict()
+		start_time = time.time()
 
 		commit = 'HEAD'
 		if version is not None:
@@ -441,46 +1166,71 @@ class SCM_GIT(scmbase.SCM_BASE):
 		elif self.version != '':
 			commit = self.version
 
-		result = SourceTree(self.getName() + ":" + commit, self.working_dir)
+		if compact:
+			tree = CompactTree(self.getName() + ":" + commit, self.working_dir)
+			result = tree.getRoot()
+		else:
+			tree = SourceTree(self.getName() + ":" + commit, self.working_dir)
+			result = tree
 
-		(status, output) = self.__callGit(["ls-tree", commit, self.working_dir + os.sep, "-r", "--abbrev", "--full-tree"])
+		listing = self.__startGit(["ls-tree", "-r", "-z", "--full-tree", commit, self.working_dir + os.sep])
 
-		if status:
-			lines = output.splitlines()
+		if commit == 'HEAD':
+			changes = self.__startGit(["status", "--porcelain=v2", "-z", "--untracked-files=all"])
+			untracked = None
+		else:
+			changes = self.__startGit(["diff", "--name-status", "-r", "-z", commit])
+			untracked = self.__startGit(["ls-files", "--others", "--exclude-standard", "-z", "--full-name"])
 
-			for line in lines:
-				parts = line.split()
+		(status, output) = self.__finishGit(listing)
+		timings['listing'] = time.time() - start_time
 
-				# add the new element to the result
-				result.addTreeNodeByPath(parts[3])
+		# path -> [flag, is_link, on_filesystem]
+		items = {}
+
+		if status:
+			for record in output.split(b'\0'):
+				tab = record.find(b'\t')
 
-			# add the untracked files a well.
-			(status, output) = self.__callGit(["ls-files", "--others", "--exclude-standard"])
+				if tab != -1:
+					items[record[tab+1:].decode(errors='surrogateescape')] = [None, record[0:6] == b'120000', True]
+
+			(status, output) = self.__finishGit(changes)
 
 			if status:
-				lines = output.splitlines()
+				if untracked is None:
+					flags = decodeStatusFlags(output)
+				else:
+					flags = decodeNameStatus(output)
+					(status, output) = self.__finishGit(untracked)
 
-				for line in lines:
-					entry = result.addTreeNodeByPath(line)
-					entry.setFlag('A')
+					for record in output.split(b'\0'):
+						if record != b'':
+							flags.append(('A', record.decode(errors='surrogateescape')))
 
-				# update the changed files from the version to now.
-				(status, output) = self.__callGit(['diff', '--name-status', '-r', commit])
+				for (flag, path) in flags:
+					if path in items:
+						items[path][0] = flag
+					else:
+						items[path] = [flag, False, True]
 
-				if status:
-					lines = output.splitlines()
+					if flag == 'D' or flag[0] == 'R':
+						items[path][2] = False
+
+			timings['changes'] = time.time() - start_time - timings['listing']
+
+			paths = sorted(items, key=lambda path: path.split('/'))
+			tree.addSortedPaths([(path, items[path][0], items[path][1], items[path][2]) for path in paths])
+		else:
+			self.__finishGit(changes)
 
-					for line in lines:
-						bits = line.lstrip().split()
-						if len(bits) >= 2:
-							entry = result.findItemNode(bits[1])
+			if untracked is not None:
+				self.__finishGit(untracked)
 
-							if entry is None:
-								# add new status (inc. new item if it did not exist before)
-								entry = result.addTreeNodeByPath(bits[1])
+		timings['build'] = time.time() - start_time - sum(timings.values())
+		timings['total'] = time.time() - start_time
+		self.timings['getSourceTree'] = timings
 
-							if entry is not None:
-								entry.setFlag(bits[0])
 		return result
 
 	def getBranch(self):
@@ -526,7 +1276,27 @@ class SCM_GIT(scmbase.SCM_BASE):
 			will just be the history for the current file. Else it will give the history for the full current
 			branch.
 		"""
+		return list(self.getHistoryGenerator(filename, version, max_entries))
+
+	def getHistoryGenerator(self, filename=None, version=None, max_entries=None):
+		""" Get History Generator
+
+			This is the generator version of getHistory(), the HistoryItems are
+			yielded as git outputs them so the first items are returned before
+			the whole history has been walked.
+		"""
+		for line in self.__streamGit(self.historyCommand(filename, version, max_entries)):
+			item = decodeHistoryLine(line.decode(errors='replace'))
+
+			if item is not None:
+				yield item
 
+	def historyCommand(self, filename=None, version=None, max_entries=None):
+		""" History Command
+
+			Returns the git command that getHistory() uses, the output is decoded
+			with decodeHistoryLine().
+		"""
 		if version != None:
 			commit = version
 		elif self.version != '':
@@ -534,25 +1304,13 @@ class SCM_GIT(scmbase.SCM_BASE):
 		else:
 			commit = 'HEAD'
 
-		result = []
-
-		command = ["rev-list", "--timestamp", "--oneline", commit]
+		result = ["rev-list", "--timestamp", "--oneline", commit]
 
 		if max_entries is not None:
-			command.append('--max-count=' + str(max_entries))
+			result.append('--max-count=' + str(max_entries))
 
 		if filename is not None:
-			command += ["--", filename]
-
-		(status, output) = self.__callGit(command)
-
-		if status:
-			lines = output.splitlines()
-
-			# build a tuple List of (version,description) - where version == commit hash
-			for line in lines:
-				parts = line.split(' ',2)
-				result.append(scm.HistoryItem(parts[1], parts[2], parts[0], None, None))
+			result += ["--", filename]
 
 		return result
 
@@ -578,27 +1336,36 @@ class SCM_GIT(scmbase.SCM_BASE):
 
 		return result
 
-	def getCommitList(self):
+	def getCommitList(self, exclude=None):
 		""" Get Commit List
 
 			This function gets the WHOLE history of the repository in chronological order. It also will
 			return all the parents of the given commits. This will allow for the commits to be collected
 			together as a graph and the repository graph can be searched.
 
+			If exclude is given then the commits that can be reached from the exclude
+			commits are not returned, commits that no longer exist are ignored.
+
 			This function returns a list of Commit() named tuples.
 		"""
-		result = []
+		return list(self.getCommitListGenerator(exclude))
 
-		(status, output) = self.__callGit(['log', '--pretty=%h:%p#%s', '--all', '--reverse'])
+	def getCommitListGenerator(self, exclude=None):
+		""" Get Commit List Generator
 
-		if status:
-			lines = output.splitlines()
+			This is the generator version of getCommitList(), the Commits are
+			yielded as git outputs them.
+		"""
+		command = SCM_GIT.commit_list_command
 
-			for line in lines:
-				parts = line.split('#')
-				result.append(scm.Commit(parts[0][0:7], parts[0][8:].split(), parts[1]))
+		if exclude:
+			command = command + ['--ignore-missing'] + ['^' + commit for commit in exclude]
 
-		return result
+		for line in self.__streamGit(command):
+			item = decodeCommitLine(line.decode(errors='replace'))
+
+			if item is not None:
+				yield item
 
 	def getTreeChanges(self, from_version = None, to_version = None, path = None, check_server=False):
 		""" Get Tree Changes
@@ -625,7 +1392,55 @@ class SCM_GIT(scmbase.SCM_BASE):
 
 		"""
 
-		new_files = []
+		result = list(self.getTreeChangesGenerator(from_version, to_version, path))
+
+		if check_server is True:
+			# TODO: work out what I actually want to do here. Should it show all
+			#       differences against the upstream (including locally saved commits)
+			#       or only 3-party commits and there change - the divergences.
+			# result += self._checkServerForChanges(from_version, to_version)
+			pass
+
+		return result
+
+	def getTreeChangesGenerator(self, from_version = None, to_version = None, path = None, check_server=False):
+		""" Get Tree Changes Generator
+
+			This is the generator version of getTreeChanges(), the SCMStatus items
+			are yielded as git outputs them. The changes to the working tree are
+			taken from the status snapshot.
+		"""
+		if from_version is None and to_version is None:
+			snapshot = self.getStatusSnapshot(path)
+
+			if snapshot is not None:
+				for item in statusTreeChanges(snapshot):
+					yield item
+
+			return
+
+		(git_command, new_files) = self.treeChangesCommands(from_version, to_version, path)
+
+		for line in self.__streamGit(git_command):
+			item = decodeTreeChangeLine(line.decode(errors='surrogateescape'))
+
+			if item is not None:
+				yield item
+
+		if new_files is not None:
+			for line in self.__streamGit(new_files):
+				yield scm.SCMStatus('A', line.decode(errors='surrogateescape'))
+
+	def treeChangesCommands(self, from_version = None, to_version = None, path = None):
+		""" Tree Changes Commands
+
+			Returns the (changes, new_files) git commands that getTreeChanges()
+			uses when it is given a version. The changes output is decoded with
+			decodeTreeChangeLine() and each line of the new_files output is an
+			added file. new_files is None if the untracked files are not
+			required. Without versions the changes come from statusCommand().
+		"""
+		new_files = None
 
 		if to_version is None and from_version is None:
 			# No versions, so simply use ls-files against the HEAD
@@ -637,8 +1452,7 @@ class SCM_GIT(scmbase.SCM_BASE):
 			git_command = ['diff', '--name-status', '-r', from_version, 'HEAD']
 
 			# will need the untracked files
-			(status, output) = self.__callGit(['ls-files', '-o', '--full-name'])
-			new_files = output.splitlines()
+			new_files = ['ls-files', '-o', '--full-name']
 		else:
 			# Ok, have both from and to so we ignore the index and
 			# the local file system.
@@ -648,37 +1462,27 @@ class SCM_GIT(scmbase.SCM_BASE):
 		if path is not None:
 			git_command.extend(['--', path])
 
-		(status, output) = self.__callGit(git_command)
+		return (git_command, new_files)
 
-		lines = output.splitlines()
+	def getTreeListingGenerator(self, version = None):
+		""" Get Tree Listing Generator
 
-		result = []
-
-		if status:
-			for line in lines:
-				bits = line.lstrip().split()
-				if len(bits) >= 2:
-					# what sort of change are you?
-					if bits[0] == 'M' or bits[0] == 'C':
-						result.append(scm.SCMStatus('M', bits[1]))
-
-					elif bits[0] == 'A' or bits[0][0] == '?':
-						result.append(scm.SCMStatus('A', bits[1]))
-
-					elif bits[0] == 'D' or bits[0] == 'R':
-						result.append(scm.SCMStatus('D', bits[1]))
-
-		for file_name in new_files:
-			result.append(scm.SCMStatus('A', file_name))
+			This function will yield a SCMItem for each of the files in the given
+			version (or the current version), the name of the item is the path
+			of the file in the repository.
+		"""
+		if version is not None:
+			commit = version
+		elif self.version != '':
+			commit = self.version
+		else:
+			commit = 'HEAD'
 
-		if check_server is True:
-			# TODO: work out what I actually want to do here. Should it show all
-			#       differences against the upstream (including locally saved commits)
-			#       or only 3-party commits and there change - the divergences.
-			# result += self._checkServerForChanges(from_version, to_version)
-			pass
+		for record in self.__streamGit(["ls-tree", "-r", "-z", "--full-tree", commit], b'\0'):
+			item = decodeListingRecord(record)
 
-		return result
+			if item is not None:
+				yield item
 
 	def getDiffDetails(self, from_version = None, to_version = None, path = None):
 		""" Get Diff Details
@@ -686,6 +1490,15 @@ class SCM_GIT(scmbase.SCM_BASE):
 			TODO: need to fill in this documentation.
 
 		"""
+		return list(self.getDiffDetailsGenerator(from_version, to_version, path))
+
+	def getDiffDetailsGenerator(self, from_version = None, to_version = None, path = None):
+		""" Get Diff Details Generator
+
+			This is the generator version of getDiffDetails(), the diff is parsed
+			as git outputs it and each ChangeItem is yielded when the file is
+			finished.
+		"""
 		git_command = ['diff', '--full-index', '-r', '--diff-filter=ADM', '--unified=0']
 
 		# ok, sort out the from version
@@ -704,13 +1517,9 @@ class SCM_GIT(scmbase.SCM_BASE):
 		if path is not None:
 			git_command.extend(['--', path])
 
-		(_, output) = self.__callGit(git_command)
-
-		lines = output.splitlines()
+		return parseUnifiedDiffStream(version, from_version, self.__streamGit(git_command, None))
 
-		return scm.parseUnifiedDiff(version, from_version, lines)
-
-	def getTreeChangeDetails(self, from_version = None, to_version = None, path = None):
+	def getTreeChangeDetails(self, from_version = None, to_version = None, path = None, workers = None):
 		""" Get Tree Changes
 
 			This function will return the changes between two versions, by commit.
@@ -733,10 +1542,12 @@ class SCM_GIT(scmbase.SCM_BASE):
 				D = file/directory deleted
 				M = file/directory modified
 
+			All the commits are read from one "git log -p" command. If workers
+			is given then the diffs are parsed by a pool of that many processes.
 		"""
 		result = []
 
-		git_command = ['log', '--pretty=%h %p']
+		git_command = ['log', '-p', '--cc', '--unified=0', '--full-diff', '--format=' + COMMIT_SENTINEL + '%h %p']
 
 		# ok, sort out the from version
 		if from_version is None:
@@ -756,31 +1567,46 @@ class SCM_GIT(scmbase.SCM_BASE):
 		if path is not None:
 			git_command.extend(['--', path])
 
-		# Get the list of commits between versions
-		(status, output) = self.__callGit(git_command)
+		commits = self.__logCommitDiffs(git_command)
 
-		if status:
-			commits = output.splitlines()
+		if workers is not None and workers > 1:
+			with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+				changes_list = list(pool.map(parseCommitDiff, commits, chunksize=64))
+		else:
+			changes_list = map(parseCommitDiff, commits)
 
-			# now get the changes for each commit
-			for commit_pair in commits:
+		for changes in changes_list:
+			# there were changes?
+			if len(changes) > 0:
+				result.append(changes)
 
-				# Ignoring items with multiple parents - one is enough for doing a diff
-				parts = commit_pair.split(' ', 3)
-				commit = parts[0]
-				parent = parts[1]
+		return result
 
-				(status, output) = self.__callGit(['show', '--unified=0', commit])
+	def __logCommitDiffs(self, git_command):
+		""" [PRIVATE] split the output of "git log -p" into commits.
 
-				lines = output.splitlines()
+			The git command must use COMMIT_SENTINEL at the start of its format.
+			This yields (commit, parent, lines) for each of the commits.
+		"""
+		commit = None
+		block = []
 
-				changes = scm.parseUnifiedDiff(commit, parent, lines)
+		for line in self.__streamGit(git_command):
+			if line[:len(COMMIT_SENTINEL_BYTES)] == COMMIT_SENTINEL_BYTES:
+				if commit is not None:
+					yield (commit, parent, block)
 
-				# there were changes?
-				if len(changes) > 0:
-					result.append(changes)
+				# Ignoring items with multiple parents - one is enough for doing a diff
+				parts = line[len(COMMIT_SENTINEL_BYTES):].decode().split(' ', 3)
+				commit = parts[0]
+				parent = parts[1]
+				block = []
 
-		return result
+			elif commit is not None:
+				block.append(line)
+
+		if commit is not None:
+			yield (commit, parent, block)
 
 	def getBlame(self, filename):
 		""" Get the blame history for a single file.
@@ -820,64 +1646,51 @@ class SCM_GIT(scmbase.SCM_BASE):
 
 			This function returns a simple tuple of the tag details.
 		"""
-		(status, output) = self.__callGit(["show-ref", "--tags", "-d", "--abbrev"])
-
-		current = -1
-		result = []
+		(status, output) = self.__callGit(self.tagsCommand())
 
 		if status:
-			lines = output.splitlines()
-
-			for line in lines:
-				parts = line.split()
-
-				if parts[1][-3:] == "^{}":
-					# we have the object reference - we can add that
-					# also need to remove "refs/tags/" from the front of the reference
-					current = len(result)
-					result.append((parts[0], parts[1][10:-3]))
+			return decodeTags(output)
+		else:
+			return (-1, [])
 
-		return (current, result)
+	def tagsCommand(self):
+		return ["show-ref", "--tags", "-d", "--abbrev"]
 
 	def getBranches(self, remotes=True):
 		""" The function will return the branches of the current repository.
 
 			This function returns a simple tuple of the branch details.
 		"""
-		if remotes:
-			(status, output) = self.__callGit(["branch", "-v"])
-		else:
-			(status, output) = self.__callGit(["branch", "-av"])
-
-		current = -1
-		result = []
+		(status, output) = self.__callGit(self.branchesCommand(remotes))
 
 		if status:
-			lines = output.splitlines()
+			return decodeBranches(output)
+		else:
+			return (-1, [])
 
-			for line in lines:
-				parts = line.split()
-				remote = None
+	def getRefs(self):
+		""" Get Refs
 
-				# add the branch_name, commit, branch_description to the tuple.
-				if parts[0] == '*':
-					current = len(result)
-					branch_name = parts[1]
-					commit		= parts[2]
-					comment		= ' '.join(parts[3:])
-				else:
-					branch_name = parts[0]
-					commit		= parts[1]
-					comment		= ' '.join(parts[2:])
+			This function returns the branches, remote branches and tags as a list
+			of Ref tuples. It is a single "show-ref" (which reads the peeled tags
+			from packed-refs) so it is much faster than getBranches() and getTags()
+			on repositories with a lot of refs.
+		"""
+		(status, output) = self.__callGit(self.refsCommand())
 
-				if branch_name[0:7] == 'remotes':
-					# we have a remote, decode the name
-					[remote, branch_name] = branch_name[8:].split('/', 1)
+		if status:
+			return decodeRefs(output)
+		else:
+			return []
 
-				# add the new branch item to the list
-				result.append(scm.Branch(commit, branch_name, comment, remote))
+	def refsCommand(self):
+		return ["show-ref", "-d", "--abbrev"]
 
-		return (current, result)
+	def branchesCommand(self, remotes=True):
+		if remotes:
+			return ["branch", "-v"]
+		else:
+			return ["branch", "-av"]
 
 	def searchCommits(self, search_string, selected_commits = None):
 		""" The function will return a list of files that have the strings in them.
@@ -912,25 +1725,103 @@ class SCM_GIT(scmbase.SCM_BASE):
 
 		return result
 
+	def statusCommand(self, path = None):
+		""" Status Command
+
+			Returns the git command that getStatusSnapshot() uses, the output is
+			decoded with decodeStatusSnapshot().
+		"""
+		result = ["status", "--porcelain=v2", "-z", "--branch", "--untracked-files=all"]
+
+		if path is not None:
+			result.extend(['--', path])
+
+		return result
+
+	def cleanCommand(self):
+		""" Clean Command
+
+			Returns the git command that isRepositoryClean() uses. It is a cheaper
+			status than statusCommand(), the untracked files are not searched for
+			and the ahead and behind counts are not worked out.
+		"""
+		return ["status", "--porcelain=v2", "-z", "--branch", "--no-ahead-behind", "--untracked-files=no"]
+
+	def __indexTime(self):
+		""" [PRIVATE] returns the modified time of the index file, or None. """
+		git_dir = self.getCacheDirectory()
+
+		if git_dir is not None:
+			try:
+				return os.stat(os.path.join(git_dir, 'index')).st_mtime_ns
+			except OSError:
+				pass
+
+		return None
+
+	def getStatusSnapshot(self, path = None):
+		""" Get Status Snapshot
+
+			This function returns the StatusSnapshot of the working tree, the
+			staged, unstaged, untracked and conflicted files and how far the
+			branch is ahead and behind its upstream. It returns None if the
+			status cannot be read.
+
+			It is taken from a single "git status". If the status cache time has
+			been set (see setStatusCacheTime()) the snapshot of the whole tree is
+			reused until the time has passed or the index file changes.
+		"""
+		result = None
+		use_cache = path is None and self.status_cache_time > 0
+
+		if use_cache:
+			index_time = self.__indexTime()
+
+			if self.status_snapshot is not None:
+				(fetch_time, snapshot_index_time, snapshot) = self.status_snapshot
+
+				if snapshot_index_time == index_time and time.time() - fetch_time < self.status_cache_time:
+					result = snapshot
+
+		if result is None:
+			fetch_time = time.time()
+			(status, output) = self.__finishGit(self.__startGit(self.statusCommand(path)))
+
+			if status:
+				result = decodeStatusSnapshot(output)
+
+				# status may have refreshed the index, so use the time after it.
+				if use_cache:
+					self.status_snapshot = (fetch_time, self.__indexTime(), result)
+
+		return result
+
 	def isRepositoryClean(self):
 		""" is Repository Clean
 
 			This function will check the repo is clean. All files have been committed
 			and there are no local changes and that the index is up to date with the
-			file system.
+			file system. The untracked files are ignored.
 
 			If the repo passes all the tests the function will return True, else False.
-		"""
-
-		(result, _) = self.__callGit(["diff-index", "--quiet", "--cached", "HEAD"])
 
-		if result:
-			(result, _) = self.__callGit(["diff-files", "--quiet"])
+			If the status cache is on then the cached snapshot is used, else a
+			status without the untracked files is run.
+		"""
+		if self.status_cache_time > 0:
+			snapshot = self.getStatusSnapshot()
+		else:
+			snapshot = None
+			(status, output) = self.__finishGit(self.__startGit(self.cleanCommand()))
 
-			if result:
-				(result, _) = self.__callGit(["diff-index", "--quiet", "HEAD"])
+			if status:
+				snapshot = decodeStatusSnapshot(output)
 
-		return result
+		return (snapshot is not None and
+				snapshot.commit_id is not None and
+				len(snapshot.staged) == 0 and
+				len(snapshot.unstaged) == 0 and
+				len(snapshot.conflicted) == 0)
 
 	#---------------------------------------------------------------------------------
 	# Functions that amend the state of the repository
@@ -1218,6 +2109,9 @@ class SCM_GIT(scmbase.SCM_BASE):
 		if deep_clean:
 			(_, _) = self.__callGit(['clean','-fdx'])
 
+		# clean does not change the index, so the snapshot cannot be trusted.
+		self.status_snapshot = None
+
 # Register this type with SCM.
 scm.supported_scms.append(scm.SupportedSCM('Git', checkForType, SCM_GIT))
 
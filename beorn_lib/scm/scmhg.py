@@ -123,10 +123,15 @@ class SCM_HG(scmbase.SCM_BASE):
 	def getCurrentVersion(self):
 		return ''
 
-	def getHistory(self, filename = None, version = None):
-		return []
+	def getHistory(self, filename = None, version = None, max_entries = None):
+		result = []
+
+		if max_entries is not None:
+			result = result[:max_entries]
+
+		return result
 
-	def getCommitList(self):
+	def getCommitList(self, exclude=None):
 		return []
 
 	def getTreeChanges(self, from_version = None, to_version = None, path = None, check_server=False):
@@ -33,12 +33,24 @@ import time
 import datetime
 import getpass
 from . import scmbase
-import marshal
 import subprocess
 import multiprocessing
 
 from beorn_lib.utilities import Utilities
 from collections import OrderedDict
+from .p4_batch import P4Batch
+from .p4_stream import readRecords, readRecordStream, RAW_CODE
+
+#---------------------------------------------------------------------------------
+# Module Data
+#---------------------------------------------------------------------------------
+# how many seconds checkForType() remembers that a path is not a workspace.
+NEGATIVE_CHECK_TIME = 300
+
+negative_checks = {}		# path -> time it was found not to be a workspace
+
+# how many seconds a good "p4 login -s" is trusted for.
+LOGIN_CHECK_TIME = 60
 
 #---------------------------------------------------------------------------------
 # Local Classes
@@ -73,9 +85,114 @@ class ClientDetails(object):
         self.view = []
         self.description = ''
 
+class PerforceDiffParser(object):
+	""" Perforce Diff Parser
+
+		A push parser for the output of "p4 describe -du". The lines are given
+		to feed() and it returns the ChangeItems for the files that have been
+		finished. close() returns the last file. The details of the change are
+		read from the first lines, see parsePerforceUnifiedDiff().
+	"""
+	def __init__(self, scm_p4, version):
+		self.scm_p4 = scm_p4
+		self.version = version
+		self.state = 0
+		self.roots = []
+		self.decode_state = DecodeState()
+		self.lines_read = 0
+		self.in_comment = False
+
+		self.author = None
+		self.client = ''
+		self.patch_time = None
+		self.comment = []
+
+	def __readHeader(self, line):
+		""" [PRIVATE] read the change details from the first line. """
+		parts = line.split()
+		sks = parts[3].split('@')
+		self.author = sks[0]
+
+		if len(sks) > 1:
+			self.client = sks[1]
+
+		if self.client not in self.scm_p4.clients:
+			# the client was not found, lets update and see what's happening.
+			self.scm_p4.updateClientList()
+
+		# do we know the client?
+		if self.client in self.scm_p4.clients:
+			self.decode_state.client = self.scm_p4.clients[self.client]
+
+			# We need the roots to normalise the reviews.
+			for item in self.scm_p4.getClientViews(self.client):
+				self.roots.append(item[0][:-3])
+
+		# Get the date time for the commit.
+		if len(parts) < 6:
+			# TODO: This needs fixing.
+			self.patch_time = 6
+		else:
+			# Get the date time for the commit.
+			date = datetime.datetime.strptime(parts[5] + "_" + parts[6], "%Y/%m/%d_%H:%M:%S")
+			self.patch_time = int(time.mktime(date.timetuple()))
+
+		self.in_comment = True
+
+	def __takeResult(self):
+		""" [PRIVATE] return the finished files. """
+		result = self.decode_state.result
+		self.decode_state.result = []
+		return result
+
+	def feed(self, lines):
+		""" Feed
+
+			Add the lines and return the ChangeItems that have been finished.
+		"""
+		for line in lines:
+			if self.lines_read == 0:
+				self.__readHeader(line)
+
+			elif self.in_comment:
+				# get the comment for the commit.
+				if len(line) >= 1 and (line[0] == '\t' or line[0] == '\r'):
+					self.comment.append(line[1:])
+				else:
+					self.in_comment = False
+
+			self.lines_read += 1
+
+			# TODO: handle file renames - "moved from"
+			if self.state == 0:
+				self.state = self.scm_p4.getFileList(self.roots, self.decode_state, line)
+			else:
+				self.scm_p4.getDifferences(self.decode_state, line)
+
+		return self.__takeResult()
+
+	def close(self):
+		""" Close
+
+			The diff has finished, return the ChangeItem for the last file.
+		"""
+		if self.state != 0:
+			# a "====" line finishes the last file, there is no file after it.
+			self.decode_state.files.append(None)
+			self.scm_p4.getDifferences(self.decode_state, "==== ")
+
+		return self.__takeResult()
+
 #---------------------------------------------------------------------------------
 # Global Functions
 #---------------------------------------------------------------------------------
+def clearCheckCache():
+	""" Clear Check Cache
+
+		Forget the paths that checkForType() found are not workspaces.
+	"""
+	negative_checks.clear()
+
 def checkForType(repository, password_function=None):
 	""" Check For Type
 
@@ -83,11 +200,20 @@ def checkForType(repository, password_function=None):
 		if it is a perforce directory (no .svn, .git, .CVS, etc...) you have to
 		talk to the P4 server get the list of "workspaces/clients" and then see
 		if the directory is one of those.
+
+		As this runs p4 (more than once) the paths that are not workspaces
+		are remembered for NEGATIVE_CHECK_TIME seconds, so they are not
+		checked again. This includes not being logged in or P4 not being
+		installed.
 	"""
 	result = False
 	logged_on = False
 
 	path = os.path.abspath(repository)
+	checked = negative_checks.get(path)
+
+	if checked is not None and time.time() - checked < NEGATIVE_CHECK_TIME:
+		return False
 
 	if os.path.exists(path):
 		if SCM_P4.p4IsLoggedIn():
@@ -110,8 +236,19 @@ def checkForType(repository, password_function=None):
 					result = True
 					break
 
+		if not result:
+			negative_checks[path] = time.time()
+
 	return result
 
+def decodeObjects(data):
+	""" Decode Objects
+
+		This function will decode the output of a "p4 -G" command that has been
+		read as a whole and return the list of the objects that are not errors.
+	"""
+	return [obj for obj in readRecords(data) if obj.get('code') not in ('error', RAW_CODE)]
+
 CREATE_NO_WINDOW = 0x08000000
 
 def serverProcess(local_source_path):
@@ -276,7 +413,7 @@ class SCM_P4(scmbase.SCM_BASE):
 		return result
 
 	@staticmethod
-	def findAllReposInTree(path):
+	def findAllReposInTree(path, workers=None):
 		""" Find All Repos in Tree
 
 			This is P4, so we are looking for workspaces in this case.
@@ -314,6 +451,7 @@ class SCM_P4(scmbase.SCM_BASE):
 		self.environ = os.environ.copy()
 		self.clients = {}
 		self.logged_in = True			# HACK: TODO: remove!!!!
+		self.login_time = 0.0
 		self.quick_updates = False		# "quick" and "p4" should not really be used.
 		self.current_client = None
 		self.current_branch = None
@@ -381,79 +519,63 @@ class SCM_P4(scmbase.SCM_BASE):
 	# Functions that query the state of the repository
 	#---------------------------------------------------------------------------------
 	def p4CommandDiff(self, command_list):
-		""" P4 how I hate you.
+		""" P4 Command Diff
 
-			It does not add the diff contents as manifest objects but dumps the
-			diff content raw in the output stream. Sooooo, I have to decode the
-			marshal object.
-
-			So need to get the whole output string (who gives a monkey about all
-			the memory that is used, meh!) then search for the NEXT string 's{'
-			as this is the start of the  marshal object, parse that, see if the
-			text item is followed by a "s{" or something else.
-
-			It does not help that the marshal code gives no information on how
-			far though the string it has got, or how much data it parsed so the
-			following stupidness will occur.
-
-			I apologise (for this stupidness and not the rest of the code base as
-			that is just how I roll. :))
-
-			I am old and the painters algorithm is a thing. But luckily processors
-			are faster than they used to be so we can throw away all those cycles
-			for reasons.
+			p4 does not put the diff in the marshalled objects, it writes the
+			diff text after the 'stat' object of each file. The stream decoder
+			returns that text as RAW_CODE records, so the text that follows a
+			'stat' is the diff for that file.
 		"""
-		try:
-			if sys.platform == 'win32':
-				return subprocess.check_output(['p4', '-d', self.working_dir, '-G'] + command_list, env=self.environ, creationflags=CREATE_NO_WINDOW)
-			else:
-				return subprocess.check_output(['p4', '-d', self.working_dir, '-G'] + command_list, env=self.environ)
-
-		except subprocess.CalledProcessError as e:
-			result = []
-
-			if e.output[0] == '{':
-				# Ok, we have an object.
-				start_pos = 1
+		result = []
+		current = None
+		data = []
 
-				while start_pos < len(e.output):
-					obj = marshal.loads(e.output[start_pos-1:])
+		for obj in self.__p4ObjectGenerator(command_list, include_raw=True):
+			if obj['code'] == RAW_CODE:
+				data.append(obj['data'])
+			else:
+				self.diffFunction(result, current, data)
+				current = obj
+				data = []
 
-					# Ok, we have a valid object lest find the next one so we
-					# can use it to cut out the text that is there for the diff
-					# content.
-					pos = e.output[start_pos:].find('{s')
+		self.diffFunction(result, current, data)
 
-					if obj['code'] == 'stat':
-						if e.output[start_pos:][pos-1] != '0':
-							# Ok, we have a dump following after the marshalled
-							# object. So lets read that data from the file.
-							start = e.output[start_pos:].find('text0')
-							diff_content = ['diff a b']
+		return result
 
-							for line in e.output[start_pos+start+5:start_pos+pos].splitlines():
-								diff_content.append(line)
+	def diffFunction(self, result, obj, data):
+		""" Diff Function
 
-							diff = scm.parseUnifiedDiff(obj['rev'], '',  diff_content)
+			Adds the diff of the text that followed the 'stat' object to the
+			result.
+		"""
+		if obj is not None and obj['code'] == 'stat' and len(data) > 0:
+			diff_content = ['diff a b'] + b''.join(data).decode(errors='replace').splitlines()
+			diff = scm.parseUnifiedDiff(obj['rev'], '', diff_content)
 
-							if diff is not None:
-								result.append(diff)
+			if diff is not None:
+				result.append(diff)
 
-					if pos == -1:
-						break
-					else:
-						start_pos = start_pos + pos + 1
+	def __p4Login(self):
+		""" [PRIVATE] check that p4 is logged in.
 
-			return result
+			The check is a p4 process of its own, so when it has worked it is
+			trusted for LOGIN_CHECK_TIME seconds.
+		"""
+		if time.time() - self.login_time < LOGIN_CHECK_TIME:
+			return True
 
-	def __p4Login(self):
 		result = SCM_P4.p4IsLoggedIn()
 
 		if not result:
 			if self.password is None or self.password == '':
 				self.password = self.getPassword(self.user_name)
 
-		return result or SCM_P4.p4Login(self.user_name, self.password) is not None
+		result = result or SCM_P4.p4Login(self.user_name, self.password) is not None
+
+		if result:
+			self.login_time = time.time()
+
+		return result
 
 	def getUserKey(self, user_name):
 		if self.password is None or self.password == '':
@@ -484,6 +606,17 @@ class SCM_P4(scmbase.SCM_BASE):
 
 		return result
 
+	def newBatch(self, use_client=True):
+		""" New Batch
+
+			Returns a P4Batch that runs the commands for this workspace, or None
+			if p4 is not logged in.
+		"""
+		if self.__p4Login():
+			return P4Batch(self.buildCommand(use_client, True), self.environ)
+		else:
+			return None
+
 	def __p4Command(self, command_list, use_client=True):
 		""" This is the CLS version that is needed outside the rest of the code
 			there is a similar version that is used in the class.
@@ -501,7 +634,7 @@ class SCM_P4(scmbase.SCM_BASE):
 			# TODO: Add logging - print "not logged in"
 			return None
 
-	def __p4ObjectCommand(self, command_list, callback, use_client=True):
+	def __p4ObjectCommand(self, command_list, callback, use_client=True, error_callback=None):
 		""" P4 is a bit of a pain.
 
 			Some objects are easier to decode if you use the scripting interface
@@ -510,51 +643,113 @@ class SCM_P4(scmbase.SCM_BASE):
 			by still with a be wait for end.
 
 			This commands manages these calls and converts the returned data into
-			readable python object.
+			readable python object. The error objects are given to the
+			error_callback and make the command fail.
 		"""
-		result = True
+		result = False
+		proc = self.__p4Start(command_list, use_client)
+
+		if proc is not None:
+			result = True
+
+			try:
+				for obj in readRecordStream(proc.stdout):
+					if obj.get('code') == 'error':
+						result = False
 
+						if error_callback is not None:
+							error_callback(obj)
+
+					elif obj.get('code') != RAW_CODE:
+						callback(obj)
+
+			finally:
+				self.__p4Stop(proc)
+
+		return result
+
+	def __p4Start(self, command_list, use_client=True):
+		""" [PRIVATE] start the marshalled p4 command, returns None if it could not be started. """
 		if self.__p4Login():
 			try:
 				if sys.platform == 'win32':
-					proc = subprocess.Popen(self.buildCommand(use_client, True) + command_list,
+					return subprocess.Popen(self.buildCommand(use_client, True) + command_list,
 											stdout=subprocess.PIPE,
 											env=self.environ,
 											creationflags=CREATE_NO_WINDOW)
 				else:
-					proc = subprocess.Popen(self.buildCommand(use_client, True) + command_list,
+					return subprocess.Popen(self.buildCommand(use_client, True) + command_list,
 											stdout=subprocess.PIPE,
 											env=self.environ)
+			except (TypeError, OSError):
+				# P4 is not installed
+				pass
+
+		return None
+
+	def __p4Stop(self, proc):
+		""" [PRIVATE] kill the p4 command if it has not finished, and wait for it. """
+		if proc.poll() is None:
+			proc.kill()
+
+		proc.stdout.close()
+		proc.wait()
+
+	def __p4ObjectGenerator(self, command_list, use_client=True, include_raw=False):
+		""" P4 Object Generator
 
-				i = 0
-				while True:
-					i = i + 1
-					try:
-						obj = marshal.load(proc.stdout)
-					except(subprocess.CalledProcessError, ValueError, TypeError) as e:
+			This is the generator version of __p4ObjectCommand(), each of the
+			objects is yielded as soon as all of it has been read. The error
+			objects are dropped, and so is the text between the objects unless
+			include_raw is set. If the generator is closed before the end then
+			the p4 process is killed.
+		"""
+		proc = self.__p4Start(command_list, use_client)
+
+		if proc is not None:
+			try:
+				for obj in readRecordStream(proc.stdout):
+					if obj.get('code') == 'error':
 						continue
 
-					if type(obj) == dict:
-						if obj['code'] == 'error':
-							result = False
-						else:
-							callback(obj)
+					if include_raw or obj.get('code') != RAW_CODE:
+						yield obj
 
-			except (subprocess.CalledProcessError, EOFError) as e:
-				# I really hate having to use exceptions as loop bounds!!
-				if type(e) == EOFError:
-					return result
+			finally:
+				self.__p4Stop(proc)
+
+	def __p4LineGenerator(self, command_list, use_client=True):
+		""" P4 Line Generator
+
+			This runs the (not marshalled) p4 command and yields each of the
+			lines of the output as p4 outputs them. If the generator is closed
+			before the end then the p4 process is killed.
+		"""
+		if self.__p4Login():
+			try:
+				if sys.platform == 'win32':
+					proc = subprocess.Popen(self.buildCommand(use_client) + command_list,
+											stdout=subprocess.PIPE,
+											stderr=subprocess.DEVNULL,
+											creationflags=CREATE_NO_WINDOW)
 				else:
-					return False
-			except TypeError as e:
-				# P4 is not installed
-				return False
-			except OSError:
+					proc = subprocess.Popen(self.buildCommand(use_client) + command_list,
+											stdout=subprocess.PIPE,
+											stderr=subprocess.DEVNULL)
+			except (TypeError, OSError):
 				# P4 is not installed
-				return False
+				return
 
-		else:
-			return False
+			try:
+				for line in proc.stdout:
+					yield line.decode(errors='replace').rstrip('\n')
+
+			finally:
+				if proc.poll() is None:
+					proc.kill()
+
+				proc.stdout.close()
+				proc.wait()
 
 	def __p4CommandWithInput(self, command_list, command_input, use_client=True):
 		""" P4 is a bit of a pain (again).
@@ -613,6 +808,9 @@ class SCM_P4(scmbase.SCM_BASE):
 		else:
 			self.__p4ObjectCommand(['clients', '-u', self.user_name], self.__addClient, use_client=True)
 
+	def updateClientList(self):
+		self.__getClientList()
+
 	def getClientViews(self, client):
 		result = []
 		got_object = []
@@ -694,6 +892,29 @@ class SCM_P4(scmbase.SCM_BASE):
 		else:
 			return contents.splitlines()[1:]
 
+	def getFiles(self, file_names, specific_commit = None):
+		""" Get Files
+
+			This function will get all the files with a single batched "p4 print"
+			and return a dictionary of the file name to the lines of the file.
+		"""
+		result = OrderedDict([(file_name, []) for file_name in file_names])
+		batch = self.newBatch()
+
+		if batch is not None and len(result) > 0:
+			for file_name in result:
+				if specific_commit is not None:
+					batch.add(['print'], self.makeP4RelativeName(file_name + '@' + specific_commit))
+				else:
+					batch.add(['print'], self.makeP4RelativeName(file_name))
+
+			for (file_name, records) in zip(result, batch.run()):
+				if records is not None and len(records) > 0 and records[0]['code'] == 'stat':
+					data = [record['data'] for record in records[1:] if record['code'] in ('text', 'binary')]
+					result[file_name] = ''.join(data).splitlines()
+
+		return result
+
 	def getPatch(self, specific_commit = None):
 		if specific_commit is not None:
 			commit = specific_commit
@@ -728,7 +949,7 @@ class SCM_P4(scmbase.SCM_BASE):
 		else:
 			use_path = path.replace('\\', '/')
 
-		if use_path[0]  == '/':
+		if use_path.startswith('/'):
 			use_path = use_path[1:]
 
 		if self.current_branch is not None:
@@ -737,15 +958,31 @@ class SCM_P4(scmbase.SCM_BASE):
 			return "//" + self.current_client.name + '/' + use_path
 
 	def getDirectoryListing(self, directory_name):
+		""" Get Directory Listing
+
+			The files and the directories are two p4 commands, they are sent as
+			one batch so the two processes run at the same time.
+		"""
 		result = []
+		batch = self.newBatch()
 
-		call_back = lambda obj : result.append(('file', obj['depotFile']))
-		self.__p4ObjectCommand(['files', os.path.join(self.makeP4RelativeName(directory_name), "*")], call_back)
+		if batch is not None:
+			path = os.path.join(self.makeP4RelativeName(directory_name), "*")
 
-		call_back = lambda obj : result.append(('dir', obj['dir']))
-		self.__p4ObjectCommand(['dirs', os.path.join(self.makeP4RelativeName(directory_name), "*")], call_back)
+			batch.add(['files'], path)
+			batch.add(['dirs'], path)
 
-		return []
+			(files, dirs) = batch.run()
+
+			for record in files or []:
+				if record['code'] == 'stat':
+					result.append(('file', record['depotFile']))
+
+			for record in dirs or []:
+				if record['code'] == 'stat':
+					result.append(('dir', record['dir']))
+
+		return result
 
 	def generateFileName(self, name, branch=None):
 		if branch is None and self.current_branch is None:
@@ -772,12 +1009,10 @@ class SCM_P4(scmbase.SCM_BASE):
 		else:
 			return 'default'
 
-	def getHistory(self, filename=None, version=None, max_entries=None):
-		result = []
+	def historyCommand(self, filename=None, version=None, max_entries=None):
+		""" build the p4 changes command for the history functions. """
 		changes = ['changes', '-l']
 
-		call_back = lambda obj : result.append(scm.HistoryItem(obj['change'], obj['desc'], obj['time'], None, None))
-
 		if filename is None:
 			changes.append(self.makeP4RelativeName('...'))
 		else:
@@ -789,38 +1024,126 @@ class SCM_P4(scmbase.SCM_BASE):
 		if max_entries is not None:
 			changes += ['-m', str(max_entries)]
 
-		if self.__p4ObjectCommand(changes, call_back):
+		return changes
+
+	def getHistory(self, filename=None, version=None, max_entries=None):
+		result = []
+
+		call_back = lambda obj : result.append(scm.HistoryItem(obj['change'], obj['desc'], obj['time'], None, None))
+
+		if self.__p4ObjectCommand(self.historyCommand(filename, version, max_entries), call_back):
 			return result
 		else:
 			return None
 
+	def getHistoryGenerator(self, filename=None, version=None, max_entries=None):
+		""" Get History Generator
+
+			This is the generator version of getHistory(), the HistoryItems are
+			yielded as p4 returns them.
+		"""
+		for obj in self.__p4ObjectGenerator(self.historyCommand(filename, version, max_entries)):
+			if 'change' in obj:
+				yield scm.HistoryItem(obj['change'], obj['desc'], obj['time'], None, None)
+
 	def setVersion(self, version):
 		return False
 
+	def resolveImmutableVersion(self, version=None):
+		""" Resolve Immutable Version
+
+			Only a submitted changelist does not change, so the changelist number
+			is returned if it has been submitted, else None.
+		"""
+		return self.resolveImmutableVersions([version])[0]
+
+	def resolveImmutableVersions(self, versions):
+		""" Resolve Immutable Versions
+
+			This is the batched version of resolveImmutableVersion(), all the
+			changes are described by one p4 process. Returns the list of the
+			results in the order of the versions.
+		"""
+		changes = []
+
+		for version in versions:
+			if version is not None and version.lstrip('@').isdigit():
+				changes.append(version.lstrip('@'))
+
+		submitted = set()
+
+		if len(changes) > 0:
+			batch = self.newBatch()
+
+			if batch is not None:
+				for change in changes:
+					batch.add(['describe', '-s'], change)
+
+				for (change, records) in zip(changes, batch.run()):
+					if records is not None and len(records) > 0 and records[0].get('status') == 'submitted':
+						submitted.add(change)
+
+		result = []
+
+		for version in versions:
+			if version is not None and version.lstrip('@') in submitted:
+				result.append(version.lstrip('@'))
+			else:
+				result.append(None)
+
+		return result
+
 	def getVersion(self):
 		return self.getCurrentVersion()
 
-	def getCommitList(self):
+	def getCommitList(self, exclude=None):
 		return self.getHistory()
 
+	def getCommitListGenerator(self, exclude=None):
+		return self.getHistoryGenerator()
+
 	status_lookup = {	'deleted':'D',
 						'updated':'U',
 						'add'	 :'A',
 						'edit'	 :'M'}
 
-	def treeChangeFunction(self, result, obj):
+	def treeChangeItem(self, obj):
+		result = None
+		length = len(self.working_dir) + 1
+
 		if 'action' in obj:
 			if obj['action'] in SCM_P4.status_lookup:
 				action = SCM_P4.status_lookup[obj['action']]
 			else:
 				action = '?'
 
-			length = len(self.working_dir) + 1
-			result.append(scm.SCMStatus(action, obj['clientFile'][length:]))
+			result = scm.SCMStatus(action, obj['clientFile'][length:])
 
 		elif 'clientFile' in obj:
-			length = len(self.working_dir) + 1
-			result.append(scm.SCMStatus('M', obj['clientFile'][length:]))
+			result = scm.SCMStatus('M', obj['clientFile'][length:])
+
+		return result
+
+	def treeChangeFunction(self, result, obj):
+		item = self.treeChangeItem(obj)
+
+		if item is not None:
+			result.append(item)
+
+	def treeChangeCommands(self):
+		""" the p4 commands that find the changes in the tree. """
+		# TODO: might be better to so, the following then do a reconcile add.
+		# p4 diff -f -sl
+		# follow this with a "status -a" to find the new files.
+		if self.quick_updates:
+			result = [['sync', '-n', '-m']]
+		else:
+			result = [['reconcile', '-n','-m']]
+
+		# and now the opened files - does P4 suck... Question left for the audience.
+		result.append(['diff', '-sa'])
+
+		return result
 
 	def getTreeChanges(self, from_version = None, to_version = None, path = None, check_server=False):
 		result = None
@@ -830,19 +1153,25 @@ class SCM_P4(scmbase.SCM_BASE):
 
 			call_back = lambda obj : self.treeChangeFunction(result, obj)
 
-			# TODO: might be better to so, the following then do a reconcile add.
-			# p4 diff -f -sl
-			# follow this with a "status -a" to find the new files.
-			if self.quick_updates:
-				self.__p4ObjectCommand(['sync', '-n', '-m'], call_back)
-			else:
-				self.__p4ObjectCommand(['reconcile', '-n','-m'], call_back)
-
-			# and now the opened files - does P4 suck... Question left for the audience.
-			self.__p4ObjectCommand(['diff', '-sa'], call_back)
+			for command in self.treeChangeCommands():
+				self.__p4ObjectCommand(command, call_back)
 
 		return result
 
+	def getTreeChangesGenerator(self, from_version = None, to_version = None, path = None, check_server=False):
+		""" Get Tree Changes Generator
+
+			This is the generator version of getTreeChanges(), the SCMStatus items
+			are yielded as p4 returns them.
+		"""
+		if check_server is True:
+			for command in self.treeChangeCommands():
+				for obj in self.__p4ObjectGenerator(command):
+					item = self.treeChangeItem(obj)
+
+					if item is not None:
+						yield item
+
 	def getDiffDetails(self, from_version = None, to_version = None, path = None):
 		if path is None:
 			file_path = self.makeP4RelativeName('...')
@@ -867,22 +1196,32 @@ class SCM_P4(scmbase.SCM_BASE):
 
 	def getChangeList(self, specific_commit):
 		""" This function will return a change list for the specified change """
-		contents = []
-		call_back = lambda obj: contents.append(obj)
-
-		# TODO: remove "-a" as it not longer works :(
-		contents = self.__p4Command(['describe', '-S', '-du', str(specific_commit)])
-		if contents is not None:
-			parts = contents.split("\n")
+		parser = PerforceDiffParser(self, specific_commit)
+		changes = list(self.getChangeItemGenerator(specific_commit, parser))
 
-			if len(parts) > 1:
-				(author, timestamp, comment, changes) = self.parsePerforceUnifiedDiff(specific_commit, contents.split('\n'))
-			else:
-				return None
+		if parser.lines_read > 1:
+			return scm.ChangeList(specific_commit, parser.patch_time, parser.author, parser.comment, changes)
 		else:
 			return None
 
-		return scm.ChangeList(specific_commit, timestamp, author, comment, changes)
+	def getChangeItemGenerator(self, specific_commit, parser=None):
+		""" Get Change Item Generator
+
+			This yields the ChangeItems of the change as "p4 describe" outputs
+			them, each file is yielded as soon as the next file starts. The
+			details of the change are in the parser once its first line has
+			been read.
+		"""
+		if parser is None:
+			parser = PerforceDiffParser(self, specific_commit)
+
+		# TODO: remove "-a" as it not longer works :(
+		for line in self.__p4LineGenerator(['describe', '-S', '-du', str(specific_commit)]):
+			for item in parser.feed([line]):
+				yield item
+
+		for item in parser.close():
+			yield item
 
 	def changeListFunction(self, result, obj):
 		if 'oldChange' not in obj:
@@ -923,7 +1262,7 @@ class SCM_P4(scmbase.SCM_BASE):
 		return result
 
 	def getTags(self):
-		return []
+		return (-1, [])
 
 	def getBranches(self):
 		branch_list = []
@@ -936,18 +1275,29 @@ class SCM_P4(scmbase.SCM_BASE):
 		return []
 
 	def checkObjectExists(self, object_name, specific_commit = None):
-		if specific_commit is not None:
-			path = object_name + '@' + specific_commit
-		else:
-			path = object_name
+		return self.checkObjectsExist([object_name], specific_commit)[0]
 
-		name = self.makeP4RelativeName(path)
+	def checkObjectsExist(self, object_names, specific_commit = None):
+		""" Check Objects Exist
 
-		branch_list = []
-		call_back = lambda obj: branch_list.append(obj)
-		result = self.__p4ObjectCommand(['files', name], call_back)
+			This is the batched version of checkObjectExists(), all the files are
+			checked by one "p4 files". Returns the list of the results in the
+			order of the names.
+		"""
+		result = [False] * len(object_names)
+		batch = self.newBatch()
+
+		if batch is not None and len(object_names) > 0:
+			for object_name in object_names:
+				if specific_commit is not None:
+					batch.add(['files'], self.makeP4RelativeName(object_name + '@' + specific_commit))
+				else:
+					batch.add(['files'], self.makeP4RelativeName(object_name))
 
-		return result and len(branch_list) > 0
+			for (index, records) in enumerate(batch.run()):
+				result[index] = records is not None and len([record for record in records if record['code'] == 'stat']) > 0
+
+		return result
 
 	def isRepositoryClean(self):
 		return False
@@ -1157,7 +1507,9 @@ class SCM_P4(scmbase.SCM_BASE):
 
 	def getDifferences(self, decode_state, line):
 		if line[0:5] == "==== ":
-			if len(decode_state.lines) > 0:
+			adding = decode_state.current_file is not None and decode_state.current_file[1] == 'add'
+
+			if len(decode_state.lines) > 0 and not adding:
 				decode_state.change_list.append(scm.Change(	decode_state.start_line,
 															decode_state.start_len,
 															decode_state.end_line,
@@ -1169,7 +1521,7 @@ class SCM_P4(scmbase.SCM_BASE):
 			if decode_state.current_file is not None:
 				# trusting P4 to not be stupid and list the files in the same order
 				# as the patches.
-				if decode_state.current_file[1] == 'add':
+				if adding:
 					change = [scm.Change(0, 0, 0, len(decode_state.lines), decode_state.lines)]
 					parts = decode_state.current_file[0].split('#')
 					decode_state.result.append(scm.ChangeItem(parts[1], None, decode_state.current_file[1], parts[0], parts[0], change))
@@ -1216,64 +1568,16 @@ class SCM_P4(scmbase.SCM_BASE):
 
 			Okedokie. P4's diff format starts with the files that have
 			changed and the type of change. Then followed by the diffrences.
-		"""
-		state = 0
-		roots = []
-		decode_state = DecodeState()
-
-		parts = diff_array[0].split()
-		sks = parts[3].split('@')
-		author = sks[0]
-
-		if len(sks) > 1:
-			client = sks[1]
-		else:
-			client = ''
-
-		if client not in self.clients:
-			# the client was not found, lets update and see what's happening.
-			self.__getClientList()
-
-		# do we know the client?
-		if client in self.clients:
-			decode_state.client = self.clients[client]
-
-			# We need the roots to normalise the reviews.
-			for item in self.getClientViews(client):
-				roots.append(item[0][:-3])
-
-		comment = []
-		# get the comment for the commit.
-		for line in diff_array[1:]:
-			if len(line) >= 1 and (line[0] == '\t' or line[0] == '\r'):
-				comment.append(line[1:])
-			else:
-				break
-
-		# Get the date time for the commit.
-		if len(parts) < 6:
-			# TODO: This needs fixing.
-			patch_time = 6
-		else:
-			# Get the date time for the commit.
-			date = datetime.datetime.strptime(parts[5] + "_" + parts[6], "%Y/%m/%d_%H:%M:%S")
-			patch_time = int(time.mktime(date.timetuple()))
 
-		for line in diff_array:
-			# TODO: handle file renames - "moved from"
-			if state == 0:
-				state = self.getFileList(roots, decode_state, line)
-			else:
-				self.getDifferences(decode_state, line)
+			diff_array can be any iterable of lines, see PerforceDiffParser for
+			getting the files as they are parsed.
+		"""
+		parser = PerforceDiffParser(self, version)
 
-		if len(decode_state.lines) > 0:
-			decode_state.change_list.append(scm.Change(	decode_state.start_line,
-														decode_state.start_len,
-														decode_state.end_line,
-														decode_state.end_len,
-														decode_state.lines))
+		result = parser.feed(diff_array)
+		result += parser.close()
 
-		return (author, patch_time, comment, decode_state.result)
+		return (parser.author, parser.patch_time, parser.comment, result)
 
 #	def fixConflict(self, item, how = MERGE_WORKING):
 #		return False
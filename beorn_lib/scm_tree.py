@@ -23,6 +23,8 @@ import os
 from beorn_lib.nested_tree import NestedTreeNode
 
 class SCMTree(NestedTreeNode):
+	__slots__ = ('name', 'scm', 'state', 'is_in_scm', 'is_modified', 'is_in_filesystem', 'modified')
+
 	SCM_STATE_UNKNOWN	= 0
 	SCM_STATE_UNCHANGED = 1
 	SCM_STATE_ADDED 	= 2
@@ -20,10 +20,44 @@
 #---------------------------------------------------------------------------------
 
 import os
+from bisect import bisect_right, insort
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from beorn_lib.utilities import Utilities
 from beorn_lib.nested_tree import NestedTreeNode
+from beorn_lib.source_tree_monitor import SourceTreeMonitor
+
+#---------------------------------------------------------------------------------
+# Module functions.
+#---------------------------------------------------------------------------------
+def scanDirectory(path):
+	""" Scan Directory
+
+		This function reads a directory and returns a dictionary of name to
+		(is_dir, is_link) for the entries. The types come from the directory
+		entries, so on most filesystems they do not need a stat of each file.
+		Symlinks are not followed. If the path cannot be read as a directory
+		then None is returned.
+
+		It does not touch the tree so it is safe to call it from any thread.
+	"""
+	result = {}
+
+	try:
+		with os.scandir(path) as entries:
+			for entry in entries:
+				try:
+					result[entry.name] = (entry.is_dir(follow_symlinks=False), entry.is_symlink())
+				except OSError:
+					result[entry.name] = (False, False)
+
+	except OSError:
+		result = None
+
+	return result
 
 class SourceTree(NestedTreeNode):
+	__slots__ = ('name', 'scm', 'on_filesystem', 'flag', 'submodule', 'is_dir', 'is_link', 'is_virtual', 'monitor', 'item_state', 'child_index', 'child_names', 'root')
+
 	# class properties
 	suffix_filter = []
 	directory_filter = []
@@ -60,9 +94,15 @@ class SourceTree(NestedTreeNode):
 		self.is_dir = False
 		self.is_link = False
 		self.is_virtual = False
+		self.monitor = None
+
+		# state of the item, created when the first state is added.
+		self.item_state = None
 
-		# state of the item.
-		self.item_state = {}
+		# index of the children by name, and the sorted names. These are
+		# created when the first child is added as most nodes are leaves.
+		self.child_index = None
+		self.child_names = None
 
 		super(SourceTree, self).__init__(name, None)
 
@@ -78,6 +118,8 @@ class SourceTree(NestedTreeNode):
 		self.submodule = new_node.submodule
 		self.item_state = new_node.item_state
 		self.is_virtual = new_node.is_virtual
+		self.child_index = new_node.child_index
+		self.child_names = new_node.child_names
 
 	def __lt__(self, other):
 		if type(other) is SourceTree:
@@ -96,11 +138,7 @@ class SourceTree(NestedTreeNode):
 		else:
 			return False
 
-		for child in self.getChildren():
-			if find_name == child.name:
-				return True
-		else:
-			return False
+		return self.child_index is not None and find_name in self.child_index
 
 	def getName(self):
 		return self.name
@@ -113,12 +151,82 @@ class SourceTree(NestedTreeNode):
 		else:
 			return None
 
-		for child in self.getChildren():
-			if find_name == child.name:
-				return child
-		else:
+		if self.child_index is None:
 			return None
 
+		return self.child_index.get(find_name)
+
+	def indexChild(self, child):
+		""" Index Child
+
+			This function will add the child to the name index of this node. If
+			there is already a child with the same name the first one is kept.
+		"""
+		if self.child_index is None:
+			self.child_index = {}
+			self.child_names = []
+
+		if isinstance(child, SourceTree) and child.name not in self.child_index:
+			self.child_index[child.name] = child
+			insort(self.child_names, child.name)
+
+	def unindexChild(self, child):
+		""" Unindex Child
+
+			This function will remove the child from the name index of this node.
+		"""
+		if isinstance(child, SourceTree) and self.child_index is not None and self.child_index.get(child.name) is child:
+			del self.child_index[child.name]
+			del self.child_names[bisect_right(self.child_names, child.name) - 1]
+
+	def addNodeAfter(self, new_node):
+		result = super(SourceTree, self).addNodeAfter(new_node)
+
+		if result and isinstance(self.parent_node, SourceTree):
+			self.parent_node.indexChild(new_node)
+
+		return result
+
+	def addNodeBefore(self, new_node):
+		result = super(SourceTree, self).addNodeBefore(new_node)
+
+		if result and isinstance(self.parent_node, SourceTree):
+			self.parent_node.indexChild(new_node)
+
+		return result
+
+	def addChildNode(self, child_node, mode=NestedTreeNode.INSERT_END):
+		""" Add Child Node
+
+			For the ascending insert the place in the children is found by a
+			binary search of the sorted child names, and not by walking the list
+			of children. This expects the children to be in ascending order.
+		"""
+		if child_node.parent_node is not None:
+			result = False
+
+		elif self.child_names is not None and self.last_child_node is not None and mode == NestedTreeNode.INSERT_ASCENDING and isinstance(child_node, SourceTree):
+			pos = bisect_right(self.child_names, child_node.name)
+
+			if pos < len(self.child_names):
+				result = self.child_index[self.child_names[pos]].addNodeBefore(child_node)
+			else:
+				result = self.last_child_node.addNodeAfter(child_node)
+
+		else:
+			result = super(SourceTree, self).addChildNode(child_node, mode)
+
+			if result:
+				self.indexChild(child_node)
+
+		return result
+
+	def deleteNode(self, recursive):
+		if isinstance(self.parent_node, SourceTree):
+			self.parent_node.unindexChild(self)
+
+		return super(SourceTree, self).deleteNode(recursive)
+
 	def isDir(self):
 		return self.is_dir
 
@@ -129,13 +237,16 @@ class SourceTree(NestedTreeNode):
 		return self.on_filesystem
 
 	def updateItemState(self, name, state):
+		if self.item_state is None:
+			self.item_state = {}
+
 		self.item_state[name] = state
 
 		# We have been changed, so all parents have to be modified.
 		self.setFlag('M')
 
 	def removeItemState(self, name):
-		if name in self.item_state:
+		if self.item_state is not None and name in self.item_state:
 			del self.item_state[name]
 
 			parent = self.getParent()
@@ -144,20 +255,23 @@ class SourceTree(NestedTreeNode):
 				self.clearFlag()
 
 	def hasState(self):
-		return self.item_state != {}
+		return self.item_state is not None and self.item_state != {}
 
 	def state(self):
-		for scm_type in self.item_state:
-			yield (scm_type, self.item_state[scm_type])
+		if self.item_state is not None:
+			for scm_type in self.item_state:
+				yield (scm_type, self.item_state[scm_type])
 
 	def getState(self, scm_name=None):
 		result = None
 
 		if scm_name is not None:
-			if scm_name in self.item_state:
+			if self.item_state is not None and scm_name in self.item_state:
 				result = self.item_state[scm_name]
-		else:
+		elif self.item_state is not None:
 			result = self.item_state
+		else:
+			result = {}
 
 		return result
 
@@ -287,14 +401,30 @@ class SourceTree(NestedTreeNode):
 		if self.prev_node is not None:
 			self.prev_node.next_node = new_node
 
+		if self.parent_node is not None:
+			if self.parent_node.child_node is self:
+				self.parent_node.child_node = new_node
+
+			if self.parent_node.last_child_node is self:
+				self.parent_node.last_child_node = new_node
+
+			if isinstance(self.parent_node, SourceTree):
+				self.parent_node.unindexChild(self)
+				self.parent_node.indexChild(new_node)
+
 		# Copy the values
 		new_node.next_node		= self.next_node
 		new_node.prev_node		= self.prev_node
 		new_node.parent_node	= self.parent_node
 		new_node.is_sub_node	= self.is_sub_node
 		new_node.child_node		= self.child_node
+		new_node.last_child_node= self.last_child_node
 		new_node.payload		= self.payload
 
+		if isinstance(new_node, SourceTree):
+			new_node.child_index = self.child_index
+			new_node.child_names = self.child_names
+
 		# Update the children to their new parent
 		current = self.child_node
 
@@ -377,23 +507,33 @@ class SourceTree(NestedTreeNode):
 
 		self.child_node = None
 		self.last_child_node = None
+		self.child_index = None
+		self.child_names = None
 
 		parts = self.splitPath(os.path.relpath(old_path, path))
 
+		if isinstance(self.parent_node, SourceTree):
+			self.parent_node.unindexChild(self)
+
 		self.name = os.path.basename(path)
+
+		if isinstance(self.parent_node, SourceTree):
+			self.parent_node.indexChild(self)
 		new_base = self.addPathBitToTree(parts, path, existing_node)
 
 		if len(old_children) > 0:
 			new_base.is_dir = True
 			path = new_base.getPath()
-			new_base.is_exist = os.path.exists(path)
+			new_base.on_filesystem = os.path.exists(path)
 
-			if new_base.is_exist:
+			if new_base.on_filesystem:
 				new_base.is_link = os.path.islink(path)
 
 		# append the hold children to the end.
 		for item in old_children:
 			item.parent_node = None
+			item.next_node = None
+			item.prev_node = None
 			new_base.addChildNode(item, mode=NestedTreeNode.INSERT_ASCENDING)
 
 	def addPathBitToTree(self, path_bits, path_root, existing_node):
@@ -469,6 +609,74 @@ class SourceTree(NestedTreeNode):
 
 		return result
 
+	def addSortedPaths(self, entries):
+		""" Add Sorted Paths
+
+			This function will add a list of paths to the tree in a single pass.
+			The entries are tuples of:
+
+				(path, flag, is_link, on_filesystem)
+
+			The path is relative to this node and uses '/' as the separator. The
+			entries should be sorted by path component, as then the nodes are
+			appended to the end of the children and the parents are not searched
+			for again for each path. Unsorted entries still work, just slower.
+		"""
+		stack = [self]
+		names = []
+
+		for (path, flag, is_link, on_filesystem) in entries:
+			if self.isSuffixFiltered(path):
+				continue
+
+			parts = path.split('/')
+
+			# reuse the part of the path that is the same as the last one.
+			common = 0
+			while common < len(names) and common < len(parts) and names[common] == parts[common]:
+				common += 1
+
+			del stack[common + 1:]
+			del names[common:]
+
+			for index in range(common, len(parts)):
+				part = parts[index]
+				parent = stack[-1]
+
+				if parent.last_child_node is not None and parent.last_child_node.name == part:
+					node = parent.last_child_node
+				else:
+					node = parent.findChild(part)
+
+				if node is None:
+					if self.isDirectoryFiltered(part):
+						break
+
+					node = SourceTree(part)
+					node.is_dir = index != len(parts) - 1
+
+					if parent.last_child_node is None or parent.last_child_node.name < part:
+						parent.addChildNode(node, mode=NestedTreeNode.INSERT_END)
+					else:
+						parent.addChildNode(node, mode=NestedTreeNode.INSERT_ASCENDING)
+
+				stack.append(node)
+				names.append(part)
+			else:
+				node = stack[-1]
+				node.is_link = is_link
+				node.on_filesystem = on_filesystem
+
+				if on_filesystem:
+					# the directories that hold the item must be on the filesystem.
+					for parent in reversed(stack[1:-1]):
+						if parent.on_filesystem:
+							break
+						parent.on_filesystem = True
+
+				if flag is not None:
+					node.setFlag(flag)
+
 	def findItemNode(self, path):
 		""" Find Item Node
 
@@ -524,48 +732,161 @@ class SourceTree(NestedTreeNode):
 
 		return result
 
-	def update(self, path='', recursive=True):
+	def __addEntries(self, entries):
+		""" [PRIVATE] add the entries that are not in the tree as children.
+
+			Returns the list of new children.
+		"""
+		result = []
+
+		for (name, (is_dir, is_link)) in entries.items():
+			if name not in self:
+				if (is_dir and not self.isDirectoryFiltered(name)) or (not is_dir and not self.isSuffixFiltered(name)):
+					new_item = SourceTree(name)
+					new_item.is_dir = is_dir
+					new_item.is_link = is_link
+					new_item.on_filesystem = True
+					self.addChildNode(new_item, mode=NestedTreeNode.INSERT_ASCENDING)
+					result.append(new_item)
+
+		return result
+
+	def __applyScan(self, path, entries, recursive):
+		""" [PRIVATE] update the children from the result of scanDirectory().
+
+			Returns (added, sub_directories) where the sub_directories is the list
+			of (node, path) that need to be scanned next.
+		"""
+		added = False
+		sub_directories = []
+
+		if entries is None:
+			entries = {}
+
+		elif self.is_dir or self.root is not None:
+			added = len(self.__addEntries(entries)) > 0
+
+		for child in self.getChilden():
+			entry = entries.get(child.name)
+			child.on_filesystem = entry is not None
+
+			# symlinks are not followed, so links to directories are leaves.
+			if recursive and entry is not None and (entry[0] or child.child_node is not None):
+				sub_directories.append((child, os.path.join(path, child.name)))
+
+		return (added, sub_directories)
+
+	def update(self, path='', recursive=True, workers=None):
 		""" Update
 
 			This function will refresh the directory files that are on
 			the filesystem. It will not actually remove any items from
 			the tree, that should be done by calling prune().
+
+			If workers is greater than one, then the directories are read
+			by a pool of that many threads. This helps when the filesystem
+			is slow (i.e. on the network) and the tree has not been read
+			before. The tree itself is only changed by the calling thread.
 		"""
 		result = False
 
 		if path == '':
 			path = self.getPath()
 
-		if (self.is_dir or self.root is not None) and os.path.isdir(path):
+		if workers is not None and workers > 1 and recursive:
+			with ThreadPoolExecutor(max_workers=workers) as pool:
+				running = {pool.submit(scanDirectory, path): (self, path)}
+
+				while len(running) > 0:
+					(done, _) = wait(running, return_when=FIRST_COMPLETED)
+
+					for future in done:
+						(node, node_path) = running.pop(future)
+						(added, sub_directories) = node.__applyScan(node_path, future.result(), recursive)
+						result = added or result
+
+						for (child, child_path) in sub_directories:
+							running[pool.submit(scanDirectory, child_path)] = (child, child_path)
+		else:
+			pending = [(self, path)]
+
+			while len(pending) > 0:
+				(node, node_path) = pending.pop()
+				(added, sub_directories) = node.__applyScan(node_path, scanDirectory(node_path), recursive)
+				result = added or result
+				pending.extend(sub_directories)
+
+		return result
+
+	def refreshDirectory(self, path=''):
+		""" Refresh Directory
 
-			# Ok, we are in a directory
-			dir_list = os.listdir(path)
+			This function will update the direct children of this node from the
+			filesystem. Unlike update() it does not walk down the tree, except for
+			the directories that are new to the tree. It returns the set of nodes
+			that have been added or have changed their on filesystem state.
+		"""
+		result = set()
+
+		if path == '':
+			path = self.getPath(True)
+
+		entries = scanDirectory(path)
 
-			# Ok, no children need to add some
-			for item in dir_list:
-				if item not in self:
-					child_path = os.path.join(path, item)
+		if entries is None:
+			entries = {}
 
-					is_dir = os.path.isdir(child_path)
-					is_link = os.path.islink(child_path)
+		for new_item in self.__addEntries(entries):
+			result.add(new_item)
 
-					if (is_dir and not self.isDirectoryFiltered(item)) or (not is_dir and not self.isSuffixFiltered(item)):
-						new_item = SourceTree(item)
-						new_item.is_dir = is_dir
-						new_item.is_link = is_link
-						new_item.on_filesystem = True
-						self.addChildNode(new_item, mode=NestedTreeNode.INSERT_ASCENDING)
-						result = True
+			if new_item.is_dir:
+				new_item.update(os.path.join(path, new_item.name))
+
+				new_items = list(new_item.getChilden())
+				while len(new_items) > 0:
+					item = new_items.pop()
+					result.add(item)
+					new_items.extend(item.getChilden())
 
-		# We need to walk down all the children
 		for child in self.getChilden():
-			child_path = os.path.join(path, child.getName())
+			on_filesystem = child.name in entries
+
+			if child.on_filesystem != on_filesystem:
+				child.on_filesystem = on_filesystem
+				result.add(child)
 
-			child.on_filesystem = os.path.exists(child_path)
+		return result
 
-			if recursive and child.on_filesystem:
-				result = child.update(child_path) or result
+	def refresh(self, use_inotify=True):
+		""" Refresh
+
+			This is the incremental version of update(). The first call will start
+			a SourceTreeMonitor on the tree and does a full update, the following
+			calls will only read the directories that have changed. It returns the
+			set of nodes that have changed, so only these need to be redrawn.
+		"""
+		if self.monitor is None:
+			self.update()
+			self.monitor = SourceTreeMonitor(self, use_inotify)
+			result = set()
+
+			items = list(self.getChilden())
+			while len(items) > 0:
+				item = items.pop()
+				result.add(item)
+				items.extend(item.getChilden())
+		else:
+			result = self.monitor.refresh()
 
 		return result
 
+	def stopRefresh(self):
+		""" Stop Refresh
+
+			This function will stop the monitor that is used by refresh().
+		"""
+		if self.monitor is not None:
+			self.monitor.close()
+			self.monitor = None
+
 # vim: ts=4 sw=4 noexpandtab nocin ai
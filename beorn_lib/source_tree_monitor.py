@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: source_tree_monitor
+#    desc: This class watches the directories of a SourceTree.
+#
+#          SourceTree.update() lists and stats every item in the tree. This
+#          class keeps track of which directories have changed since the last
+#          refresh so that only those directories need to be read again. On
+#          Linux it uses inotify, on the other platforms (or if inotify cannot
+#          be used) it keeps the mtime of each directory and compares them.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import os
+import sys
+import struct
+
+# inotify constants (from sys/inotify.h)
+IN_MOVED_FROM	= 0x00000040
+IN_MOVED_TO		= 0x00000080
+IN_CREATE		= 0x00000100
+IN_DELETE		= 0x00000200
+IN_DELETE_SELF	= 0x00000400
+IN_MOVE_SELF	= 0x00000800
+IN_Q_OVERFLOW	= 0x00004000
+IN_IGNORED		= 0x00008000
+IN_ONLYDIR		= 0x01000000
+
+WATCH_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+INOTIFY_EVENT = struct.Struct('iIII')
+
+#---------------------------------------------------------------------------------
+# Local Classes
+#---------------------------------------------------------------------------------
+class Inotify(object):
+	""" Inotify
+
+		A thin wrapper around the Linux inotify calls using ctypes. The file
+		descriptor is non-blocking so readEvents() only returns the events that
+		are waiting.
+	"""
+	def __init__(self, libc, fd):
+		self.libc = libc
+		self.fd = fd
+
+	@classmethod
+	def create(cls):
+		""" Create
+
+			Returns an Inotify object, or None if inotify is not available.
+		"""
+		result = None
+
+		if sys.platform.startswith('linux'):
+			try:
+				import ctypes
+				import ctypes.util
+
+				libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+				fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+
+				if fd >= 0:
+					result = cls(libc, fd)
+
+			except (ImportError, OSError, AttributeError):
+				result = None
+
+		return result
+
+	def addWatch(self, path):
+		""" Add Watch
+
+			Returns the watch descriptor for the directory, or -1 if the watch
+			could not be added.
+		"""
+		return self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+
+	def readEvents(self):
+		""" Read Events
+
+			Returns a list of (wd, mask, name) for the events that are waiting.
+		"""
+		result = []
+
+		while True:
+			try:
+				buffer = os.read(self.fd, 65536)
+			except (BlockingIOError, InterruptedError):
+				break
+
+			offset = 0
+
+			while offset + INOTIFY_EVENT.size <= len(buffer):
+				(wd, mask, _, length) = INOTIFY_EVENT.unpack_from(buffer, offset)
+				offset += INOTIFY_EVENT.size
+				name = buffer[offset:offset + length].rstrip(b'\0')
+				offset += length
+
+				result.append((wd, mask, os.fsdecode(name)))
+
+		return result
+
+	def close(self):
+		if self.fd is not None:
+			os.close(self.fd)
+			self.fd = None
+
+class SourceTreeMonitor(object):
+	""" Source Tree Monitor
+
+		This class tracks the directories of the tree that is given, the tree
+		should be up to date (i.e. update() has been called) when the monitor
+		is created as only the changes after that are seen.
+	"""
+	def __init__(self, source_tree, use_inotify=True):
+		self.source_tree = source_tree
+		self.directories = {}
+		self.snapshot = {}
+		self.watches = {}
+		self.pending = set()
+		self.lost = {}
+		self.inotify = None
+
+		if use_inotify:
+			self.inotify = Inotify.create()
+
+		self.__addDirectories(source_tree)
+
+	def __del__(self):
+		self.close()
+
+	def isUsingInotify(self):
+		return self.inotify is not None
+
+	def __addDirectory(self, path, node):
+		""" [PRIVATE] start watching a single directory. """
+		self.directories[path] = node
+
+		if self.inotify is not None:
+			wd = self.inotify.addWatch(path)
+
+			if wd >= 0:
+				self.watches[wd] = path
+			else:
+				# out of watches (or similar) use the snapshots for everything.
+				self.__stopInotify()
+
+		if self.inotify is None:
+			try:
+				self.snapshot[path] = os.stat(path).st_mtime_ns
+			except OSError:
+				self.snapshot[path] = None
+
+	def __addDirectories(self, node):
+		""" [PRIVATE] start watching the directory and its sub-directories. """
+		stack = [node]
+
+		while len(stack) > 0:
+			current = stack.pop()
+
+			if current is self.source_tree or (current.is_dir and current.on_filesystem):
+				path = current.getPath(True)
+
+				if path not in self.directories:
+					self.__addDirectory(path, current)
+
+				stack.extend(current.getChilden())
+
+	def __stopInotify(self):
+		""" [PRIVATE] switch over to using the snapshots. """
+		self.inotify.close()
+		self.inotify = None
+		self.watches = {}
+
+		for path in self.directories:
+			try:
+				self.snapshot[path] = os.stat(path).st_mtime_ns
+			except OSError:
+				self.snapshot[path] = None
+
+	def __findDirtyDirectories(self):
+		""" [PRIVATE] get the directories that have changed. """
+		result = set(self.pending)
+		self.pending = set()
+
+		if self.inotify is not None:
+			for (wd, mask, name) in self.inotify.readEvents():
+				if mask & IN_Q_OVERFLOW:
+					result.update(self.directories)
+
+				elif mask & IN_IGNORED:
+					# the watch has gone, the parent will see the change. If the
+					# directory has been made again refresh() watches it again.
+					if wd in self.watches:
+						path = self.watches.pop(wd)
+						self.lost[path] = self.directories.pop(path)
+
+				elif wd in self.watches:
+					result.add(self.watches[wd])
+		else:
+			for path in list(self.directories):
+				try:
+					mtime = os.stat(path).st_mtime_ns
+				except OSError:
+					mtime = None
+
+				if mtime is None:
+					del self.directories[path]
+					del self.snapshot[path]
+
+				elif mtime != self.snapshot[path]:
+					self.snapshot[path] = mtime
+					result.add(path)
+
+		return result
+
+	def refresh(self):
+		""" Refresh
+
+			This function will update the directories of the tree that have been
+			changed since the last refresh. It returns the set of nodes that have
+			been added to the tree or have changed their on filesystem state.
+		"""
+		result = set()
+
+		for path in self.__findDirtyDirectories():
+			if path in self.directories:
+				result.update(self.directories[path].refreshDirectory(path))
+
+		# a directory that was deleted and made again between the refreshes is
+		# still on the filesystem to its parent, so it has to be watched and
+		# read again here. The parents are sorted before their children.
+		for path in sorted(self.lost):
+			node = self.lost[path]
+
+			if node.on_filesystem and path not in self.directories and os.path.isdir(path):
+				self.__addDirectory(path, node)
+				result.update(node.refreshDirectory(path))
+
+		self.lost = {}
+
+		# watch the new directories, they are read again on the next refresh
+		# in case something was added before the watch was in place.
+		for node in result:
+			if node.is_dir and node.on_filesystem:
+				path = node.getPath(True)
+
+				if path not in self.directories:
+					self.__addDirectory(path, node)
+					self.pending.add(path)
+
+		return result
+
+	def close(self):
+		if self.inotify is not None:
+			self.inotify.close()
+			self.inotify = None
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
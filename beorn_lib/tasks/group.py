@@ -28,6 +28,8 @@ from .task import Task
 from beorn_lib.nested_tree import NestedTreeNode
 
 class Group(NestedTreeNode):
+	__slots__ = ('name',)
+
 	def __contains__(self, other):
 		""" Contains
 
@@ -24,6 +24,8 @@ import time
 from beorn_lib.nested_tree import NestedTreeNode
 
 class Task(NestedTreeNode):
+	__slots__ = ('name', 'status', 'filename', 'line_no', 'column', 'is_auto', 'notes')
+
 	TASK_STATUS_OPEN		= 0
 	TASK_STATUS_COMPLETE	= 1
 	TASK_STATUS_ABANDONED	= 2
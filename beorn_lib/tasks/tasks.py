@@ -30,6 +30,8 @@ from .group import Group
 from beorn_lib.nested_tree import NestedTreeNode
 
 class Tasks(NestedTreeNode):
+	__slots__ = ('current_user', 'current_machine', 'current_id', 'task_timer', 'next_timeout', 'callback', 'root', 'filename')
+
 	def __contains__(self, other):
 		""" Contains
 
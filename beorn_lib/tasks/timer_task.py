@@ -30,6 +30,8 @@ TASK_TIMER_EXPIRED	= 4
 TASK_TIMER_NON		= 5
 
 class TimerTask(NestedTreeNode):
+	__slots__ = ('name', 'status', 'expiry_date', 'period', 'timer_type', 'line_no', 'column', 'start_time', 'time_out', 'notes', 'due_date')
+
 	valid_timers = [TASK_TIMER_ONESHOT, TASK_TIMER_REPEAT, TASK_TIMER_UNTIL, TASK_TIMER_NON]
 
 	TASK_STATUS_OPEN		= 0
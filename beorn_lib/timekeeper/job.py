@@ -24,6 +24,8 @@ import time
 from beorn_lib.nested_tree import NestedTreeNode
 
 class Job(NestedTreeNode):
+	__slots__ = ('name', 'start_time', 'total_time', 'last_commit_time', 'status', 'note')
+
 	def __init__(self, name):
 		super(Job, self).__init__()
 
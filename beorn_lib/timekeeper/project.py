@@ -25,6 +25,8 @@ from .job import Job
 from beorn_lib.nested_tree import NestedTreeNode
 
 class Project(NestedTreeNode):
+	__slots__ = ('name',)
+
 	def __contains__(self, other):
 		""" Contains
 
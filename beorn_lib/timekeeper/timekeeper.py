@@ -29,6 +29,8 @@ from .project import Project
 from beorn_lib.nested_tree import NestedTreeNode
 
 class TimeKeeper(NestedTreeNode):
+	__slots__ = ('name', 'current_user', 'current_machine', 'current_id', 'root', 'filename')
+
 	def __contains__(self, other):
 		""" Contains
 
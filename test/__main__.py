@@ -37,6 +37,7 @@ sys.path.insert(1, os.path.join(SUB_ROOT_PATH, 'beorn_lib'))
 #import test.beorn_tests as beorn_tests
 import beorn_tests
 import scm_tests
+import benchmarks
 
 #SUPPORTED_SCMS = ['Git', 'P4']
 SUPPORTED_SCMS = ['Git']
@@ -51,6 +52,42 @@ def get_test_names(test_class, selected_group):
 
 	return tests
 
+def get_benchmark_names(test_class, selected_group):
+	tests = []
+
+	if type(test_class) == type and (selected_group is None or test_class.__name__ == selected_group):
+		if issubclass(test_class, unittest.TestCase):
+			loader = unittest.TestLoader()
+			loader.testMethodPrefix = 'bench'
+			tests = loader.getTestCaseNames(test_class)
+
+	return tests
+
+def load_benchmarks(selected_group = None, test_case = None):
+	""" Load Benchmarks
+
+		This function will load the benchmarks. These are not run with
+		the tests as they take a long time to run.
+	"""
+	suite = unittest.TestSuite()
+	found = False
+
+	temp_data = os.path.join(os.path.abspath('.'), 'temp_data')
+	test_data = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data')
+
+	for item_name in dir(benchmarks):
+		test_class = getattr(benchmarks, item_name)
+
+		for test in get_benchmark_names(test_class, selected_group):
+			if test_case is None or test == test_case:
+				suite.addTest(test_class(test, test_data, temp_data))
+				found = True
+
+	if not found:
+		return None
+	else:
+		return suite
+
 def return_test_names(selected_group, tests_only, scm_only, scm_name):
 	tests = []
 	scm_results = []
@@ -140,6 +177,7 @@ if __name__ == '__main__':
 	failed = False
 	scm_only = False
 	tests_only = False
+	run_benchmarks = False
 	scm_type =  None
 
 	print_help = False
@@ -156,6 +194,9 @@ if __name__ == '__main__':
 			elif item.startswith('-t'):
 				tests_only = True
 
+			elif item.startswith('-b'):
+				run_benchmarks = True
+
 			elif item.startswith('-h'):
 				print_help = True
 
@@ -176,6 +217,7 @@ if __name__ == '__main__':
 	if print_help:
 		print("Usage: -s	- only run the SCM tests")
 		print("Usage: -t	- only run the non-SCM tests")
+		print("Usage: -b	- run the benchmarks and not the tests")
 		print("Usage: -h	- print the help.")
 		print("Usage: -l	- print list of tests.")
 		print("\n i.e. python test [options] [TestGroup] [TestCase]\n")
@@ -209,7 +251,10 @@ if __name__ == '__main__':
 
 		os.mkdir(temp_data)
 
-		test_suite = load_tests(run_class, test_case, tests_only, scm_only, scm_type)
+		if run_benchmarks:
+			test_suite = load_benchmarks(run_class, test_case)
+		else:
+			test_suite = load_tests(run_class, test_case, tests_only, scm_only, scm_type)
 
 		shutil.rmtree(temp_data)
 
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: __init__
+#    desc: This is the init file for the benchmarks.
+#
+#          The benchmarks are not run with the tests, they are run with the
+#          -b option of the test runner.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+from .bench_source_tree import BenchSourceTree
+from .bench_tree_memory import BenchTreeMemory
+from .bench_diff import BenchDiff
+from .bench_bigraph import BenchBiGraph
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: bench_bigraph
+#    desc: BIGRAPH benchmarks.
+#
+#          These use a synthetic repository, so the time is the time of the
+#          graph and not of git.
+#
+#  author: Peter Antoine
+#    date: 18/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+import os
+import time
+import random
+import shutil
+import tempfile
+import unittest
+import subprocess
+from beorn_lib.scm import scm
+from beorn_lib.scm.bigraph import BIGRAPH
+
+#---------------------------------------------------------------------------------
+# Synthetic Repository
+#---------------------------------------------------------------------------------
+class SyntheticRepo(object):
+	""" Synthetic Repo
+
+		This has the functions of the SCM that the BIGRAPH uses. The history has
+		a number of branches that fork from and merge back into the main line.
+	"""
+	def __init__(self, number_commits, number_branches=64, merge_every=20, tag_every=1000, seed=1):
+		generator = random.Random(seed)
+		self.commits = []
+		self.branches = []
+		self.tags = []
+
+		tips = [None] * number_branches
+
+		for index in range(number_commits):
+			commit_id = '%012x' % index
+			lane = generator.randrange(number_branches)
+			parents = []
+
+			if tips[lane] is not None:
+				parents.append(tips[lane])
+
+			if index % merge_every == 0 and index > 0:
+				other = tips[generator.randrange(number_branches)]
+
+				if other is not None and other not in parents:
+					parents.append(other)
+
+			self.commits.append(scm.Commit(commit_id, parents, 'commit ' + str(index)))
+			tips[lane] = commit_id
+
+			if index % tag_every == 0:
+				self.tags.append(scm.Tag(commit_id, 'tag_' + str(index)))
+
+		for (lane, commit_id) in enumerate(tips):
+			if commit_id is not None:
+				self.branches.append(scm.Branch(commit_id, 'branch_' + str(lane), '', None))
+
+	def writeRepository(self, directory):
+		""" Write Repository
+
+			Write the history to a git repository with fast-import, so that git
+			can be timed on the same graph. Returns the dictionary of the commit
+			ids to the git commit hashes.
+		"""
+		marks = {}
+		lines = []
+
+		for (index, commit) in enumerate(self.commits):
+			marks[commit.commit_id] = ':' + str(index + 1)
+
+			if len(commit.parents) == 0:
+				# a new root, else the commit would follow the last one.
+				lines.append('reset refs/heads/import\n\n')
+
+			lines.append('commit refs/heads/import\nmark :%d\ncommitter A <a@b> %d +0000\ndata 0\n' % (index + 1, 1000000 + index))
+
+			for (position, parent) in enumerate(commit.parents):
+				lines.append(('from %s\n' if position == 0 else 'merge %s\n') % marks[parent])
+
+			lines.append('\n')
+
+		subprocess.check_output(['git', 'init', '-q', directory])
+		marks_file = os.path.join(directory, 'marks')
+
+		process = subprocess.Popen(['git', '-C', directory, 'fast-import', '--quiet', '--export-marks=' + marks_file], stdin=subprocess.PIPE)
+		process.communicate(''.join(lines).encode())
+
+		result = {}
+		names = dict([(mark, commit_id) for (commit_id, mark) in marks.items()])
+
+		with open(marks_file) as f:
+			for line in f:
+				(mark, commit_hash) = line.split()
+				result[names[mark]] = commit_hash
+
+		return result
+
+	def getCommitList(self):
+		return self.commits
+
+	def getCommitListGenerator(self):
+		return iter(self.commits)
+
+	def getBranches(self):
+		return (0, self.branches)
+
+	def getTags(self):
+		return (-1, self.tags)
+
+	def getRefs(self):
+		result = [scm.Ref(branch.commit_id, branch.name, 'branch', branch.commit_id, None) for branch in self.branches]
+		result.extend([scm.Ref(tag.commit_id, tag.name, 'tag', tag.commit_id, None) for tag in self.tags])
+
+		return result
+
+	def getCacheDirectory(self):
+		return None
+
+#---------------------------------------------------------------------------------
+# Benchmark Class
+#---------------------------------------------------------------------------------
+class BenchBiGraph(unittest.TestCase):
+	""" BIGRAPH Benchmarks """
+
+	NUMBER_COMMITS = 1000000
+	ANCESTOR_COMMITS = 500000
+
+	def __init__(self, testname='runTest', test_data=None, temp_data=None):
+		self.test_data = test_data
+		self.temp_data = temp_data
+
+		# initialise the test framework
+		super(BenchBiGraph, self).__init__(testname)
+
+	def report(self, name, count, start):
+		elapsed = time.time() - start
+		print("\n  %-32s %8d commits %8.3fs" % (name, count, elapsed))
+
+	def bench_BuildGraph(self):
+		""" Build the graph of a large repository, and walk it. """
+		start = time.time()
+		repo = SyntheticRepo(BenchBiGraph.NUMBER_COMMITS)
+		self.report('generate', BenchBiGraph.NUMBER_COMMITS, start)
+
+		start = time.time()
+		graph = BIGRAPH.buildGraph(repo)
+		self.report('buildGraph', len(graph.index), start)
+
+		start = time.time()
+		history = graph.retrieveBranch(repo.branches[0].commit_id)
+		self.report('retrieveBranch', len(history), start)
+
+		start = time.time()
+		streams = graph.searchByBranch(['branch_0', 'branch_1'])
+		self.report('searchByBranch', sum([len(stream) for stream in streams]), start)
+
+		start = time.time()
+		commits = graph.sinceForkPoint('branch_0', 'branch_1')
+		self.report('sinceForkPoint', len(commits), start)
+
+		for index in [-5000, 1000]:
+			start = time.time()
+			tags = graph.tagsContaining(repo.commits[index].commit_id)
+			self.report('tagsContaining', len(tags), start)
+
+		self.assertEqual(BenchBiGraph.NUMBER_COMMITS, len(graph.index))
+
+	def bench_Layout(self):
+		""" Lay out the history, and move a window over it. """
+		repo = SyntheticRepo(BenchBiGraph.NUMBER_COMMITS)
+		graph = BIGRAPH.buildGraph(repo)
+		graph.getGenerations()
+
+		start = time.time()
+		layout = graph.layout()
+		self.report('layout', len(layout), start)
+
+		start = time.time()
+		rows = layout.render(0, 50)
+		self.report('render first window', 50, start)
+
+		start = time.time()
+		rows = layout.getRows(len(layout) - 50, 50)
+		self.report('getRows last window', len(rows), start)
+
+		start = time.time()
+		for row in range(0, len(layout), len(layout) // 100):
+			layout.getRows(row, 50)
+		self.report('getRows 100 windows', 100 * 50, start)
+
+		start = time.time()
+		for row in range(0, len(layout), len(layout) // 100):
+			layout.getRows(row, 50)
+		self.report('getRows 100 windows again', 100 * 50, start)
+
+		self.assertEqual(50, len(rows))
+
+	def bench_CommonAncestors(self):
+		""" Find the common ancestors of the branches, and compare with git. """
+		repo = SyntheticRepo(BenchBiGraph.ANCESTOR_COMMITS)
+		graph = BIGRAPH.buildGraph(repo)
+		pairs = [(repo.branches[index].commit_id, repo.branches[index + 1].commit_id) for index in range(0, 16, 2)]
+
+		start = time.time()
+		graph.getGenerations()
+		self.report('getGenerations', len(graph.index), start)
+
+		start = time.time()
+		for (first, second) in pairs:
+			graph.searchTree([first, second])
+		self.report('searchTree x ' + str(len(pairs)), len(graph.index), start)
+
+		start = time.time()
+		expected = [graph.commonAncestors([first, second]) for (first, second) in pairs]
+		self.report('commonAncestors x ' + str(len(pairs)), len(graph.index), start)
+
+		start = time.time()
+		for (index, (first, second)) in enumerate(pairs):
+			for commit_id in expected[index]:
+				self.assertTrue(graph.isAncestor(commit_id, first))
+		self.report('isAncestor x ' + str(len(pairs)), len(graph.index), start)
+
+		directory = tempfile.mkdtemp()
+
+		try:
+			start = time.time()
+			hashes = repo.writeRepository(directory)
+			self.report('git fast-import', len(hashes), start)
+
+			names = dict([(commit_hash, commit_id) for (commit_id, commit_hash) in hashes.items()])
+
+			start = time.time()
+			for (index, (first, second)) in enumerate(pairs):
+				output = subprocess.check_output(['git', '-C', directory, 'merge-base', '--all', hashes[first], hashes[second]])
+				self.assertEqual(sorted(expected[index]), sorted([names[line] for line in output.decode().split()]))
+			self.report('git merge-base x ' + str(len(pairs)), len(hashes), start)
+
+		finally:
+			shutil.rmtree(directory)
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
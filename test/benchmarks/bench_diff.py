@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: bench_diff
+#    desc: Diff parser benchmarks.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+import time
+import unittest
+from beorn_lib.scm import scm
+from beorn_lib.scm.diff_buffer import parseUnifiedDiffBuffer
+
+#---------------------------------------------------------------------------------
+# Benchmark Class
+#---------------------------------------------------------------------------------
+class BenchDiff(unittest.TestCase):
+	""" Diff Parser Benchmarks """
+
+	# 50 generated files, each with 100 hunks of 400 lines.
+	NUMBER_FILES	= 50
+	HUNKS_PER_FILE	= 100
+	LINES_PER_HUNK	= 400
+
+	def __init__(self, testname='runTest', test_data=None, temp_data=None):
+		self.test_data = test_data
+		self.temp_data = temp_data
+
+		# initialise the test framework
+		super(BenchDiff, self).__init__(testname)
+
+	def buildDiff(self):
+		result = []
+
+		for file_index in range(BenchDiff.NUMBER_FILES):
+			name = 'generated/file_%04d.c' % file_index
+			result.append('diff --git a/%s b/%s\nindex 1111111..2222222 100644\n--- a/%s\n+++ b/%s\n' % (name, name, name, name))
+
+			for hunk in range(BenchDiff.HUNKS_PER_FILE):
+				line = hunk * BenchDiff.LINES_PER_HUNK + 1
+				result.append('@@ -%d,%d +%d,%d @@\n' % (line, BenchDiff.LINES_PER_HUNK // 2, line, BenchDiff.LINES_PER_HUNK // 2))
+
+				for index in range(BenchDiff.LINES_PER_HUNK // 2):
+					result.append('-\tvalue_%d = old_function(%d, %d);\n' % (index, hunk, index))
+					result.append('+\tvalue_%d = new_function(%d, %d);\n' % (index, hunk, index))
+
+		return ''.join(result).encode()
+
+	def report(self, name, lines, start):
+		elapsed = time.time() - start
+		print("\n  %-32s %8d lines %8.3fs" % (name, lines, elapsed))
+
+	def bench_ParseDiff(self):
+		""" Parse a large diff, with and without reading the lines. """
+		output = self.buildDiff()
+		lines = BenchDiff.NUMBER_FILES * BenchDiff.HUNKS_PER_FILE * BenchDiff.LINES_PER_HUNK
+
+		start = time.time()
+		expected = scm.parseUnifiedDiff('v2', 'v1', output.decode().splitlines())
+		self.report('parseUnifiedDiff', lines, start)
+
+		start = time.time()
+		result = parseUnifiedDiffBuffer('v2', 'v1', output)
+		self.report('parseUnifiedDiffBuffer', lines, start)
+
+		start = time.time()
+		read = sum([len(change.lines) for item in result for change in item.change_list])
+		self.report('count lines', read, start)
+
+		start = time.time()
+		read = sum([len(line) for item in result for change in item.change_list for line in change.lines])
+		self.report('read every line', lines, start)
+
+		self.assertEqual(expected, result)
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
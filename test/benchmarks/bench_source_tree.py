@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: bench_source_tree
+#    desc: Benchmarks for building the source tree.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+import time
+import random
+import unittest
+import tracemalloc
+from beorn_lib import SourceTree
+from beorn_lib import CompactTree
+
+#---------------------------------------------------------------------------------
+# Benchmark Class
+#---------------------------------------------------------------------------------
+class BenchSourceTree(unittest.TestCase):
+	""" Source Tree Benchmarks """
+
+	# 500 directories of 1000 files, and a flat directory of 20000 files.
+	NUMBER_DIRECTORIES	= 500
+	FILES_PER_DIRECTORY	= 1000
+	FLAT_FILES			= 20000
+
+	def __init__(self, testname='runTest', test_data=None, temp_data=None):
+		self.test_data = test_data
+		self.temp_data = temp_data
+
+		# initialise the test framework
+		super(BenchSourceTree, self).__init__(testname)
+
+	def buildPaths(self):
+		result = []
+
+		for directory in range(BenchSourceTree.NUMBER_DIRECTORIES):
+			for item in range(BenchSourceTree.FILES_PER_DIRECTORY):
+				result.append('dir_%04d/file_%05d.c' % (directory, item))
+
+		return result
+
+	def report(self, name, count, start):
+		elapsed = time.time() - start
+		print("\n  %-32s %8d paths %8.2fs" % (name, count, elapsed))
+
+	def reportMemory(self, name, tree_class):
+		""" build the tree and report the memory that is used per node """
+		paths = [(path, None, False, True) for path in self.buildPaths()]
+		nodes = len(paths) + BenchSourceTree.NUMBER_DIRECTORIES
+
+		tracemalloc.start()
+		start = tracemalloc.get_traced_memory()[0]
+		source_tree = tree_class('bench', '/beorn_bench_root')
+		source_tree.addSortedPaths(paths)
+		used = tracemalloc.get_traced_memory()[0] - start
+		tracemalloc.stop()
+
+		print("\n  %-32s %8d nodes %8d bytes/node" % (name, nodes, used // nodes))
+
+		return source_tree
+
+	#---------------------------------------------------------------------------------
+	# Benchmarks
+	#---------------------------------------------------------------------------------
+	def bench_SortedPaths(self):
+		""" Build a tree from sorted paths, as from ls-tree -r """
+		paths = self.buildPaths()
+		source_tree = SourceTree('bench', '/beorn_bench_root')
+
+		start = time.time()
+		source_tree.addSortedPaths([(path, None, False, True) for path in paths])
+		self.report('sorted paths', len(paths), start)
+
+		self.assertEqual(source_tree.getNumberChildren(), BenchSourceTree.NUMBER_DIRECTORIES)
+
+	def bench_UnsortedPaths(self):
+		""" Build a tree from paths in a random order, one at a time """
+		paths = self.buildPaths()
+		random.Random(1).shuffle(paths)
+		source_tree = SourceTree('bench', '/beorn_bench_root')
+
+		start = time.time()
+		for path in paths:
+			source_tree.addTreeNodeByPath(path)
+		self.report('unsorted paths', len(paths), start)
+
+		self.assertEqual(source_tree.getNumberChildren(), BenchSourceTree.NUMBER_DIRECTORIES)
+
+	def bench_Memory(self):
+		""" The memory used by the SourceTree and CompactTree nodes """
+		self.reportMemory('SourceTree memory', SourceTree)
+		self.reportMemory('CompactTree memory', CompactTree)
+
+	def bench_FlatDirectory(self):
+		""" Build a single directory with a lot of files in a random order """
+		paths = ['file_%05d.c' % item for item in range(BenchSourceTree.FLAT_FILES)]
+		random.Random(1).shuffle(paths)
+		source_tree = SourceTree('bench', '/beorn_bench_root')
+
+		start = time.time()
+		for path in paths:
+			source_tree.addChildNode(SourceTree(path), mode=SourceTree.INSERT_ASCENDING)
+		self.report('flat directory', len(paths), start)
+
+		start = time.time()
+		for path in paths:
+			source_tree.findChild(path)
+		self.report('flat directory lookup', len(paths), start)
+
+		self.assertEqual(source_tree.getNumberChildren(), BenchSourceTree.FLAT_FILES)
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: bench_tree_memory
+#    desc: Memory used by the nodes of each of the tree types.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+import unittest
+import tracemalloc
+from beorn_lib import SCMTree
+from beorn_lib import SourceTree
+from beorn_lib import NestedTreeNode
+from beorn_lib.message import Message
+from beorn_lib.notes.note import Note
+from beorn_lib.notes.subject import Subject
+from beorn_lib.tasks.task import Task
+from beorn_lib.tasks.timer_task import TimerTask
+from beorn_lib.timekeeper.job import Job
+from beorn_lib.code_review.hunk import Hunk, DummyHunk
+from beorn_lib.code_review.change import Change
+from beorn_lib.code_review.comment import Comment
+from beorn_lib.code_review.code_review import CodeReview
+
+#---------------------------------------------------------------------------------
+# Benchmark Class
+#---------------------------------------------------------------------------------
+class BenchTreeMemory(unittest.TestCase):
+	""" Tree Memory Benchmarks """
+
+	# 1000 parents with 99 children each, plus the root.
+	NUMBER_PARENTS	= 1000
+	CHILDREN		= 99
+
+	node_types = [
+			('NestedTreeNode',	lambda name: NestedTreeNode(name)),
+			('SourceTree',		lambda name: SourceTree(name)),
+			('SCMTree',			lambda name: SCMTree(name)),
+			('Message',			lambda name: Message(name=name, user='user')),
+			('Note',			lambda name: Note(name, 'message', 0, 0)),
+			('Subject',			lambda name: Subject(name)),
+			('Task',			lambda name: Task(name)),
+			('TimerTask',		lambda name: TimerTask(name)),
+			('Job',				lambda name: Job(name)),
+			('Hunk',			lambda name: Hunk(DummyHunk(1, 1, 1, 1, []), name)),
+			('Change',			lambda name: Change()),
+			('Comment',			lambda name: Comment('user', 0, 'text', 1)),
+			('CodeReview',		lambda name: CodeReview(author=name))]
+
+	def __init__(self, testname='runTest', test_data=None, temp_data=None):
+		self.test_data = test_data
+		self.temp_data = temp_data
+
+		# initialise the test framework
+		super(BenchTreeMemory, self).__init__(testname)
+
+	def buildTree(self, factory):
+		""" build the tree with the names made before the memory is traced """
+		names = ['node_%06d' % index for index in range(BenchTreeMemory.NUMBER_PARENTS * (BenchTreeMemory.CHILDREN + 1))]
+		nodes = 1
+
+		tracemalloc.start()
+		start = tracemalloc.get_traced_memory()[0]
+
+		root = factory('root')
+
+		for parent_index in range(BenchTreeMemory.NUMBER_PARENTS):
+			parent = factory(names[nodes - 1])
+			root.addChildNode(parent)
+			nodes += 1
+
+			for _ in range(BenchTreeMemory.CHILDREN):
+				parent.addChildNode(factory(names[nodes - 1]))
+				nodes += 1
+
+		used = tracemalloc.get_traced_memory()[0] - start
+		tracemalloc.stop()
+
+		return (root, nodes, used)
+
+	#---------------------------------------------------------------------------------
+	# Benchmarks
+	#---------------------------------------------------------------------------------
+	def bench_NodeMemory(self):
+		""" The bytes used per node for a 100k node tree of each type """
+		print()
+
+		for (name, factory) in BenchTreeMemory.node_types:
+			(root, nodes, used) = self.buildTree(factory)
+			print("  %-16s %8d nodes %8d bytes/node" % (name, nodes, used // nodes))
+
+			self.assertEqual(root.getNumberChildren(), BenchTreeMemory.NUMBER_PARENTS)
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
@@ -23,6 +23,8 @@
 from .notes_test import TestNotes
 from .project_test import TestProject
 from .test_source_tree import TestSourceTree
+from .test_compact_tree import TestCompactTree
+from .test_diff_buffer import TestDiffBuffer
 #from .project_plan_test import TestProjectPlan
 from .text_dialog_test import TestTextDialog
 from .html_dialog_test import TestHTMLDialog
@@ -32,5 +34,6 @@ from .nested_tree_test import TestNestedTree
 from .config_test import TestConfig
 from .test_timekeeper import TestTimeKeeper
 from .test_swarm_reviews import TestSwarmCodeReview
+from .test_p4_batch import TestP4Batch
 
 # vim: ts=4 sw=4 noexpandtab nocin ai
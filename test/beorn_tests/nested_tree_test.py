@@ -236,6 +236,23 @@ class TestNestedTree(unittest.TestCase):
 		node = NestedTreeNode(0)
 		self.assertTrue(True)
 
+	def test_nodeSlots(self):
+		""" Node Slots
+
+			The tree nodes use slots so they must not have an instance dict
+			and cannot have values added to them that are not declared.
+		"""
+		from beorn_lib import SourceTree, SCMTree
+		from beorn_lib.message import Message
+		from beorn_lib.notes.note import Note
+		from beorn_lib.tasks.task import Task
+
+		for node in [NestedTreeNode(0), SourceTree('a'), SCMTree('b'), Note('c'), Task('d'), Message(name='e', user='f')]:
+			self.assertFalse(hasattr(node, '__dict__'))
+
+			with self.assertRaises(AttributeError):
+				node.undeclared_value = 1
+
 	def test_addNodes(self):
 		""" Add Nodes.
 
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: test_compact_tree
+#    desc: This will test the compact tree against the source tree.
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+import os
+import unittest
+from beorn_lib import SourceTree
+from beorn_lib import CompactTree
+from beorn_lib import NestedTreeNode
+
+#---------------------------------------------------------------------------------
+# Test Class
+#---------------------------------------------------------------------------------
+class TestCompactTree(unittest.TestCase):
+	""" Compact Tree Tests """
+	def __init__(self, testname='runTest', test_data=None, temp_data=None):
+		self.test_data = test_data
+		self.temp_data = temp_data
+
+		# initialise the test framework
+		super(TestCompactTree, self).__init__(testname)
+
+	#---------------------------------------------------------------------------------
+	# Test Data
+	#---------------------------------------------------------------------------------
+	test_paths = [
+			('src/main.c', 'M', False, True),
+			('src/lib/list.c', None, False, True),
+			('src/lib/list.h', 'A', False, True),
+			('docs/readme', None, False, True),
+			('docs/link', None, True, True),
+			('old_file', 'D', False, False),
+			('src/lib/tree.c', None, False, True),
+			('build/out/a.o', None, False, True)]
+
+	#---------------------------------------------------------------------------------
+	# Helper Function
+	#---------------------------------------------------------------------------------
+	def all_nodes_function(self, last_visited_node, node, value, levels, direction, parameter):
+		""" collect the nodes and their state in walk order """
+		item = (node.getPath(), node.getFlag(), node.isDir(), node.isLink(), node.isOnFilesystem(), levels, direction)
+
+		if value is None:
+			value = [item]
+		else:
+			value.append(item)
+
+		return (node, value, False)
+
+	def sortedPaths(self):
+		return sorted(TestCompactTree.test_paths, key=lambda entry: entry[0].split('/'))
+
+	#---------------------------------------------------------------------------------
+	# Test Function
+	#---------------------------------------------------------------------------------
+	def test_MatchesSourceTree(self):
+		""" The compact tree should walk the same as the source tree """
+		source_tree = SourceTree('test', '/beorn_root')
+		source_tree.addSortedPaths(self.sortedPaths())
+
+		compact_tree = CompactTree('test', '/beorn_root')
+		compact_tree.addSortedPaths(self.sortedPaths())
+		root = compact_tree.getRoot()
+
+		self.assertEqual(root.walkTree(self.all_nodes_function), source_tree.walkTree(self.all_nodes_function))
+
+		for order in [NestedTreeNode.TREE_WALK_PARENTS_FIRST, NestedTreeNode.TREE_WALK_PARENTS_LAST]:
+			self.assertEqual(root.walkTree(self.all_nodes_function, order), source_tree.walkTree(self.all_nodes_function, order))
+
+		# unsorted paths are added in order.
+		compact_tree = CompactTree('test', '/beorn_root')
+		compact_tree.addSortedPaths(TestCompactTree.test_paths)
+		self.assertEqual(compact_tree.getRoot().walkTree(self.all_nodes_function), source_tree.walkTree(self.all_nodes_function))
+
+	def test_Views(self):
+		""" Test the views of the nodes """
+		compact_tree = CompactTree('test', '/beorn_root')
+		compact_tree.addSortedPaths(self.sortedPaths())
+		root = compact_tree.getRoot()
+
+		# views of the same node are equal.
+		found = root.findItemNode(os.path.join('src', 'lib', 'list.h'))
+		self.assertEqual(found, root.findChild('src').findChild('lib').findChild('list.h'))
+		self.assertEqual(len(set([found, root.findItemNode('/beorn_root/src/lib/list.h')])), 1)
+		self.assertTrue(found.isChildOf(root.findChild('src')))
+		self.assertEqual(found.getPath(True), '/beorn_root/src/lib/list.h')
+		self.assertEqual(found.getParent().getFlag(), 'A')
+		self.assertEqual(root.getFlag(), 'M')
+
+		self.assertIsNone(root.findItemNode('src/missing'))
+		self.assertTrue('docs' in root)
+		self.assertEqual([item.getName() for item in root.findChild('src').getChildren()], ['lib', 'main.c'])
+		self.assertEqual(root.getNumberChildren(), 4)
+
+		# the node state can be changed through the view.
+		found.setOpen(True)
+		found.colour = 7
+		self.assertTrue(found.isOpen())
+		self.assertEqual(root.findItemWithColour(7, walk_closed=True), found)
+
+		found.updateItemState('git', 'staged')
+		self.assertEqual(found.getState('git'), 'staged')
+		found.removeItemState('git')
+		self.assertFalse(found.hasState())
+
+		# the links cannot be changed through the view.
+		with self.assertRaises(AttributeError):
+			found.deleteNode(False)
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
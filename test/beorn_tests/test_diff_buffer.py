@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: test_diff_buffer
+#    desc: This will test the buffer diff parser against parseUnifiedDiff().
+#
+#  author: Peter Antoine
+#    date: 17/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+import pickle
+import unittest
+from beorn_lib.scm import scm
+from beorn_lib.scm.diff_buffer import parseUnifiedDiffBuffer, parseUnifiedDiffStream, UnifiedDiffParser, DiffLines, DiffChanges
+
+#---------------------------------------------------------------------------------
+# Test Class
+#---------------------------------------------------------------------------------
+class TestDiffBuffer(unittest.TestCase):
+	""" Diff Buffer Tests """
+	def __init__(self, testname='runTest', test_data=None, temp_data=None):
+		self.test_data = test_data
+		self.temp_data = temp_data
+
+		# initialise the test framework
+		super(TestDiffBuffer, self).__init__(testname)
+
+	#---------------------------------------------------------------------------------
+	# Test Data
+	#---------------------------------------------------------------------------------
+	test_diff = (	b'commit 1234567\n'
+					b'Author: someone\n'
+					b'\n'
+					b'    @@ not a hunk\n'
+					b'\n'
+					b'diff --git a/file_1 b/file_1\n'
+					b'index 1111111..2222222 100644\n'
+					b'--- a/file_1\n'
+					b'+++ b/file_1\n'
+					b'@@ -1 +1 @@\n'
+					b'-old line\n'
+					b'+new line\r\n'
+					b'@@ -10,2 +10,0 @@ def function():\n'
+					b'--- removed line that looks like a header\n'
+					b'-removed line\n'
+					b'diff --git a/image.png b/image.png\n'
+					b'index 3333333..4444444 100644\n'
+					b'Binary files a/image.png and b/image.png differ\n'
+					b'diff --git a/old_file b/old_file\n'
+					b'deleted file mode 100644\n'
+					b'--- a/old_file\n'
+					b'+++ /dev/null\n'
+					b'@@ -1,2 +0,0 @@\n'
+					b'-first\n'
+					b'-second\n'
+					b'diff --git a/new_file b/new_file\n'
+					b'new file mode 100644\n'
+					b'--- /dev/null\n'
+					b'+++ b/new_file\n'
+					b'@@ -0,0 +1 @@\n'
+					b'+caf\xc3\xa9\n'
+					b'\\ No newline at end of file')
+
+	def oldParse(self, data):
+		return scm.parseUnifiedDiff('v2', 'v1', data.decode().splitlines())
+
+	def test_MatchesParseUnifiedDiff(self):
+		""" Matches parseUnifiedDiff
+
+			The buffer parser should give the same changes as the line parser,
+			for bytes and a memoryview.
+		"""
+		expected = self.oldParse(TestDiffBuffer.test_diff)
+
+		self.assertEqual(['M', 'M', 'D', 'A'], [item.change_type for item in expected])
+		self.assertEqual(expected, parseUnifiedDiffBuffer('v2', 'v1', TestDiffBuffer.test_diff))
+		self.assertEqual(expected, parseUnifiedDiffBuffer('v2', 'v1', memoryview(TestDiffBuffer.test_diff)))
+
+		# binary files have no hunks.
+		self.assertEqual([], expected[1].change_list)
+
+		# nothing to find.
+		self.assertEqual([], parseUnifiedDiffBuffer('v2', 'v1', b''))
+		self.assertEqual([], parseUnifiedDiffBuffer('v2', 'v1', b'commit 1234567\n\n    message\n'))
+
+	def test_LazyViews(self):
+		""" Lazy Views
+
+			The change lists and lines are views of the buffer that behave as
+			lists.
+		"""
+		result = parseUnifiedDiffBuffer('v2', 'v1', TestDiffBuffer.test_diff)
+
+		change_list = result[0].change_list
+		self.assertTrue(isinstance(change_list, DiffChanges))
+		self.assertEqual(2, len(change_list))
+
+		hunk = change_list[-1]
+		self.assertEqual((10, 2, 10, 0), hunk[0:4])
+		self.assertTrue(isinstance(hunk.lines, DiffLines))
+		self.assertEqual(None, hunk.lines.starts)
+
+		self.assertEqual(2, len(hunk.lines))
+		self.assertEqual('--- removed line that looks like a header', hunk.lines[0])
+		self.assertEqual(['-removed line'], hunk.lines[1:])
+		self.assertEqual(b'--- removed line that looks like a header\n-removed line\n', hunk.lines.toBytes())
+
+		# the '\r' is removed and the text is decoded when it is read.
+		self.assertEqual(['-old line', '+new line'], change_list[0].lines)
+		self.assertEqual(['+caf\xe9', '\\ No newline at end of file'], list(result[3].change_list[0].lines))
+
+		with self.assertRaises(IndexError):
+			hunk.lines[2]
+
+		# pickle as lists.
+		copied = pickle.loads(pickle.dumps(result))
+		self.assertEqual(result, copied)
+		self.assertTrue(type(copied[0].change_list) is list)
+		self.assertTrue(type(copied[0].change_list[0].lines) is list)
+
+	def test_StreamParser(self):
+		""" Stream Parser
+
+			Feeding the diff in chunks should give the same result whatever the
+			size of the chunks, and each file should be returned as soon as the
+			next file starts.
+		"""
+		data = TestDiffBuffer.test_diff
+		expected = parseUnifiedDiffBuffer('v2', 'v1', data)
+		preamble = data[:data.find(b'\ndiff') + 1]
+
+		for size in [1, 2, 5, 64, len(data)]:
+			chunks = [data[start:start + size] for start in range(0, len(data), size)]
+			parser = UnifiedDiffParser('v2', 'v1')
+
+			self.assertEqual(expected, list(parseUnifiedDiffStream('v2', 'v1', chunks, parser)))
+			self.assertEqual(preamble, parser.preamble)
+
+		# the first file is returned when the second one starts.
+		parser = UnifiedDiffParser('v2', 'v1')
+		second = data.find(b'diff --git a/image.png')
+
+		self.assertEqual([], parser.feed(data[:second]))
+		self.assertEqual(expected[0:1], parser.feed(data[second:second + 4]))
+		self.assertEqual(expected[1:], parser.feed(data[second + 4:]) + parser.close())
+
+		# no diff at all.
+		parser = UnifiedDiffParser('v2', 'v1')
+		self.assertEqual([], parser.feed(b'commit 1234567\n'))
+		self.assertEqual([], parser.close())
+		self.assertEqual(b'commit 1234567\n', parser.preamble)
+
+	def test_ParseGenerator(self):
+		""" Parse Generator
+
+			The generator version of parseUnifiedDiff() should only read the
+			lines that it needs.
+		"""
+		lines = TestDiffBuffer.test_diff.decode().splitlines()
+		read = []
+
+		def reader():
+			for line in lines:
+				read.append(line)
+				yield line
+
+		generator = scm.parseUnifiedDiffGenerator('v2', 'v1', reader())
+		first = next(generator)
+
+		self.assertEqual(self.oldParse(TestDiffBuffer.test_diff)[0], first)
+		self.assertEqual('diff --git a/image.png b/image.png', read[-1])
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: test_p4_batch
+#    desc: Tests the batched p4 commands and the "p4 -G" stream decoder.
+#
+#          These use the fake p4 in test/utils, so there is no need for a p4
+#          server.
+#
+#  author: Peter Antoine
+#    date: 18/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import json
+import stat
+import shutil
+import asyncio
+import marshal
+import unittest
+from beorn_lib.scm import aio
+from beorn_lib.scm.scm_cache import CachedSCM
+from beorn_lib.scm.scmp4 import SCM_P4, PerforceDiffParser
+from beorn_lib.scm.p4_batch import P4Batch, splitRecords
+from beorn_lib.scm.p4_stream import MarshalDecoder, readRecords, readRecordStream, RAW_CODE
+
+TEST_DIFF = '--- a/test_1\n+++ b/test_1\n@@ -1,2 +1,2 @@\n line 1\n-line 2\n+line {s 2\n'
+
+TEST_DESCRIBE = '''Change 2 by fake@fake_client on 2026/01/02 10:00:00
+
+	second
+
+Affected files ...
+
+... //depot/test_1#2 edit
+... //depot/test_2#1 edit
+
+Differences ...
+
+==== //depot/test_1#2 (text) ====
+
+@@ -1,2 +1,2 @@
+ line 1
+-line 2
++line 3
+==== //depot/test_2#1 (text) ====
+
+@@ -1,1 +1,1 @@
+-old
++other
+'''
+
+FAKE_P4 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils', 'fake_p4.py')
+
+#---------------------------------------------------------------------------------
+# Test Class
+#---------------------------------------------------------------------------------
+class TestP4Batch(unittest.TestCase):
+	""" P4 Batch Tests """
+	def __init__(self, testname = 'runTest', test_data = None, temp_data = None):
+		self.test_data = test_data
+		self.temp_data = temp_data
+		self.p4_dir = os.path.join(temp_data, 'p4_batch')
+		self.workspace = os.path.join(self.p4_dir, 'workspace')
+		self.log_file = os.path.join(self.p4_dir, 'p4.log')
+
+		# initialise the test framework
+		super(TestP4Batch, self).__init__(testname)
+
+	def setUp(self):
+		if os.path.isdir(self.p4_dir):
+			shutil.rmtree(self.p4_dir)
+
+		os.makedirs(self.workspace)
+		os.makedirs(os.path.join(self.p4_dir, 'bin'))
+
+		# the fake p4 is called "p4" and put first on the path.
+		p4_file = os.path.join(self.p4_dir, 'bin', 'p4')
+
+		with open(p4_file, 'w') as f:
+			f.write('#!/bin/sh\nexec "' + sys.executable + '" "' + FAKE_P4 + '" "$@"\n')
+
+		os.chmod(p4_file, os.stat(p4_file).st_mode | stat.S_IEXEC)
+
+		depot = {	'clients': [{'client': 'fake_client', 'Root': self.workspace}],
+					'files': {	'test_1': {'change': '1', 'text': 'line 1\nline 2\n', 'diff': TEST_DIFF},
+								'test_2': {'change': '2', 'text': 'other\n'},
+								'dir/test_3': {'change': '3', 'text': 'in dir\n'}},
+					'changes': {	'1': {'status': 'submitted', 'desc': 'first'},
+									'2': {'status': 'submitted', 'desc': 'second', 'describe': TEST_DESCRIBE},
+									'3': {'status': 'pending', 'desc': 'third'}}}
+
+		with open(os.path.join(self.p4_dir, 'depot.json'), 'w') as f:
+			json.dump(depot, f)
+
+		self.saved_environ = os.environ.copy()
+
+		for name in ['P4CLIENT', 'P4USER', 'P4PORT']:
+			os.environ.pop(name, None)
+
+		os.environ['PATH'] = os.path.join(self.p4_dir, 'bin') + os.pathsep + os.environ.get('PATH', '')
+		os.environ['FAKE_P4_DEPOT'] = os.path.join(self.p4_dir, 'depot.json')
+		os.environ['FAKE_P4_LOG'] = self.log_file
+
+	def tearDown(self):
+		os.environ.clear()
+		os.environ.update(self.saved_environ)
+		shutil.rmtree(self.p4_dir)
+
+	def readLog(self):
+		""" returns the list of the commands that the fake p4 ran, and clears the log """
+		result = []
+
+		if os.path.isfile(self.log_file):
+			with open(self.log_file) as f:
+				result = [json.loads(line) for line in f]
+
+			os.remove(self.log_file)
+
+		return result
+
+	def test_SplitRecords(self):
+		""" Split Records Test
+
+			The records of each argument start at a 'stat' or an 'error'.
+		"""
+		records = [	{'code': 'stat', 'name': 'a'}, {'code': 'text', 'data': 'a'},
+					{'code': 'error', 'data': 'b'},
+					{'code': 'stat', 'name': 'c'}]
+
+		self.assertEqual([records[0:2], records[2:3], records[3:4]], splitRecords(records, 3))
+		self.assertEqual([records], splitRecords(records, 1))
+		self.assertEqual(None, splitRecords(records, 2))
+		self.assertEqual(None, splitRecords(records[1:], 3))
+
+	def test_P4Batch(self):
+		""" P4 Batch Test
+
+			The requests of the same command should be sent with one p4, and the
+			records should go back to the requests they are for.
+		"""
+		repo = SCM_P4(working_dir=self.workspace)
+		self.assertEqual('fake_client', repo.current_client.name)
+		self.readLog()
+
+		batch = repo.newBatch()
+		found = {}
+
+		batch.add(['describe', '-s'], '2', lambda argument, records: found.update({argument: records}))
+		batch.add(['files'], '//fake_client/test_1')
+		batch.add(['describe', '-s'], '99', lambda argument, records: found.update({argument: records}))
+		batch.add(['describe', '-s'], '1')
+
+		result = batch.run()
+		commands = self.readLog()
+
+		self.assertEqual(4, len(result))
+		self.assertEqual('second', result[0][0]['desc'])
+		self.assertEqual('//depot/test_1', result[1][0]['depotFile'])
+		self.assertEqual('error', result[2][0]['code'])
+		self.assertEqual('first', result[3][0]['desc'])
+		self.assertEqual(result[0], found['2'])
+		self.assertEqual(result[2], found['99'])
+		self.assertEqual(0, len(batch))
+
+		self.assertEqual(2, len(commands))
+		self.assertEqual(['2', '99', '1'], [command['input'] for command in commands if 'describe' in command['command']][0])
+
+		for command in commands:
+			self.assertIn('-G', command['command'])
+			self.assertIn('-x', command['command'])
+
+		# the processes of the different commands should not wait for each other.
+		environ = os.environ.copy()
+		environ['FAKE_P4_DELAY'] = '1'
+		batch = P4Batch(['p4', '-G'], environ)
+		batch.add(['describe', '-s'], '1')
+		batch.add(['files'], '//fake_client/test_1')
+
+		result = batch.run()
+		commands = self.readLog()
+
+		self.assertEqual('first', result[0][0]['desc'])
+		self.assertEqual('//depot/test_1', result[1][0]['depotFile'])
+		self.assertEqual(2, len(commands))
+		self.assertLess(abs(commands[0]['time'] - commands[1]['time']), 0.9)
+
+		# a command that gives more than one 'stat' for an argument can't be split.
+		batch.add(['files'], '//fake_client/...')
+		batch.add(['files'], '//fake_client/test_1')
+		self.assertEqual([None, None], batch.run())
+
+		# no p4, no records.
+		os.environ['PATH'] = ''
+		batch = P4Batch(['p4', '-G'], os.environ.copy())
+		batch.add(['files'], '//fake_client/test_1')
+		self.assertEqual([None], batch.run())
+
+	def test_P4BatchQueries(self):
+		""" P4 Batch Queries Test
+
+			The batched queries should give the same results as one at a time,
+			each of them with one p4 and the login should only be checked once.
+		"""
+		repo = SCM_P4(working_dir=self.workspace)
+		self.readLog()
+
+		self.assertEqual([True, False, True, False], repo.checkObjectsExist(['test_1', 'xxxxxxxxxxx', 'dir/test_3', 'dir/xxxxxxxx']))
+		self.assertEqual([True, False, False], repo.checkObjectsExist(['test_1', 'test_2', 'dir/test_3'], '1'))
+		self.assertTrue(repo.checkObjectExists('test_2'))
+		self.assertFalse(repo.checkObjectExists('xxxxxxxxxxx'))
+		self.assertEqual([], repo.checkObjectsExist([]))
+
+		self.assertEqual(['1', '2', None, None, None], repo.resolveImmutableVersions(['1', '@2', '3', '99', 'branch']))
+		self.assertEqual('1', repo.resolveImmutableVersion('@1'))
+		self.assertEqual(None, repo.resolveImmutableVersion(None))
+
+		files = repo.getFiles(['test_1', 'xxxxxxxxxxx', 'dir/test_3'])
+		self.assertEqual(['test_1', 'xxxxxxxxxxx', 'dir/test_3'], list(files))
+		self.assertEqual(['line 1', 'line 2'], files['test_1'])
+		self.assertEqual([], files['xxxxxxxxxxx'])
+		self.assertEqual(['in dir'], files['dir/test_3'])
+		self.assertEqual({'test_2': []}, dict(repo.getFiles(['test_2'], '1')))
+
+		self.assertEqual([('file', '//depot/test_1'), ('file', '//depot/test_2'), ('dir', '//depot/dir')], repo.getDirectoryListing(''))
+		self.assertEqual([('file', '//depot/dir/test_3')], repo.getDirectoryListing('dir'))
+
+		commands = self.readLog()
+
+		# one p4 each, and two for each directory listing.
+		self.assertEqual(0, len([command for command in commands if 'login' in command['command']]))
+		self.assertEqual(12, len(commands))
+		self.assertEqual(['//fake_client/test_1', '//fake_client/xxxxxxxxxxx', '//fake_client/dir/test_3', '//fake_client/dir/xxxxxxxx'], commands[0]['input'])
+
+		# once the login time has passed, the login is checked again.
+		repo.login_time = 0.0
+		repo.checkObjectExists('test_1')
+		self.assertEqual(['login', 'files'], [[item for item in command['command'] if item in ('login', 'files')][0] for command in self.readLog()])
+
+	def test_MarshalDecoder(self):
+		""" Marshal Decoder Test
+
+			The records should be the same however the data is split, and the
+			text between the records should be kept apart from them.
+		"""
+		records = [	{'code': 'stat', 'depotFile': '//depot/test_1', 'rev': 1, 'size': 2**40},
+					{'code': 'text', 'data': '{s' * 100},
+					{'code': 'error', 'data': 'no such file(s).', 'severity': 2},
+					{'code': 'stat', 'nested': {'code': 'info'}, 'empty': {}}]
+
+		data = b''.join([marshal.dumps(record, 0) for record in records])
+		self.assertEqual(records, readRecords(data))
+
+		for chunk_size in [1, 3, 7, 64, len(data)]:
+			decoder = MarshalDecoder()
+			found = []
+
+			for start in range(0, len(data), chunk_size):
+				found.extend(decoder.feed(data[start:start + chunk_size]))
+
+			self.assertEqual(records, found + decoder.close())
+			self.assertEqual(records, list(readRecordStream(io.BytesIO(data), chunk_size)))
+
+		# text between the records, with a '{' that is not a record.
+		text = b'@@ -1 +1 @@\n-a {some} text\n+{s\n'
+		mixed = marshal.dumps(records[0], 0) + text + marshal.dumps(records[2], 0) + text
+
+		found = list(readRecordStream(io.BytesIO(mixed), 5))
+		codes = [record['code'] for record in found]
+
+		self.assertEqual(records[0], found[0])
+		self.assertEqual(records[2], found[codes.index('error')])
+		self.assertEqual(['stat', 'error'], [code for code in codes if code != RAW_CODE])
+		self.assertEqual(text, b''.join([record['data'] for record in found[1:codes.index('error')]]))
+		self.assertEqual(text, b''.join([record['data'] for record in found[codes.index('error') + 1:]]))
+
+		# a record that is never finished is text.
+		self.assertEqual([{'code': RAW_CODE, 'data': data[:10]}], readRecords(data[:10]))
+
+		# the records are returned as soon as they are complete.
+		decoder = MarshalDecoder()
+		self.assertEqual([records[0]], decoder.feed(marshal.dumps(records[0], 0) + data[:5]))
+		self.assertEqual([], decoder.feed(b''))
+
+	def test_P4Stream(self):
+		""" P4 Stream Test
+
+			The diff text should be decoded from between the records and the
+			history generator can be stopped early.
+		"""
+		repo = SCM_P4(working_dir=self.workspace)
+
+		diffs = repo.getDiffDetails(path='test_1')
+		self.assertEqual(1, len(diffs))
+		self.assertEqual('test_1', diffs[0][0].new_file)
+		self.assertEqual([' line 1', '-line 2', '+line {s 2'], diffs[0][0].change_list[0].lines)
+
+		self.assertEqual(['3', '2', '1'], [item[0] for item in repo.getHistory()])
+
+		history = repo.getHistoryGenerator()
+		self.assertEqual('3', next(history)[0])
+		history.close()
+
+		self.assertEqual([('file', '//depot/test_1'), ('file', '//depot/test_2'), ('dir', '//depot/dir')], repo.getDirectoryListing(''))
+
+	def test_P4ChangeList(self):
+		""" P4 Change List Test
+
+			The files of the change should be returned as they are read.
+		"""
+		repo = SCM_P4(working_dir=self.workspace)
+
+		change_list = repo.getChangeList('2')
+		self.assertEqual('fake', change_list.author)
+		self.assertEqual(['//depot/test_1', '//depot/test_2'], [item.new_file for item in change_list.changes])
+		self.assertEqual([' line 1', '-line 2', '+line 3'], change_list.changes[0].change_list[0].lines)
+
+		# the first file is returned before the rest of the describe is read.
+		parser = PerforceDiffParser(repo, '2')
+		items = repo.getChangeItemGenerator('2', parser)
+
+		self.assertEqual(change_list.changes[0], next(items))
+		self.assertTrue(parser.lines_read < len(TEST_DESCRIBE.splitlines()))
+		self.assertEqual(change_list.changes[1:], list(items))
+
+	def test_P4CachedSCM(self):
+		""" P4 Cached SCM Test
+
+			A submitted change can not change, so once it has been seen it
+			should not be described again. A pending change is described each
+			time.
+		"""
+		repo = SCM_P4(working_dir=self.workspace)
+		cached = CachedSCM(repo)
+		self.readLog()
+
+		for index in range(3):
+			cached.getPatch('1')
+			cached.getPatch('3')
+
+		describes = [command['input'] for command in self.readLog() if 'describe' in command['command'] and '-s' in command['command']]
+		self.assertEqual([['1'], ['3'], ['3'], ['3']], describes)
+
+	def test_AsyncP4Login(self):
+		""" Async P4 Login Test
+
+			The async login check should use the workspace settings, as the
+			other async commands do.
+		"""
+		repo = SCM_P4(working_dir=self.workspace)
+		self.readLog()
+
+		history = asyncio.run(aio.new(repo).getHistory())
+		self.assertEqual(['3', '2', '1'], [item[0] for item in history])
+
+		commands = [command['command'] for command in self.readLog()]
+		login = [command for command in commands if 'login' in command]
+
+		self.assertEqual(1, len(login))
+		self.assertEqual(repo.buildCommand(True)[1:] + ['login', '-s'], login[0])
+		self.assertIn(self.workspace, login[0])
+
+# vim: ts=4 sw=4 noexpandtab nocin ai
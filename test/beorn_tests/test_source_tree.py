@@ -19,6 +19,7 @@
 #                      Released Under the MIT Licence
 #---------------------------------------------------------------------------------
 import os
+import shutil
 import unittest
 from beorn_lib import SourceTree
 
@@ -279,6 +280,146 @@ class TestSourceTree(unittest.TestCase):
 		walked_tree = source_tree.walkTree(self.all_nodes_function)
 		self.assertEqual(walked_tree, TestSourceTree.tree_format, "tree walk does not match built tree")
 
+	def test_UpdateParallel(self):
+		""" Test that the threaded update builds the same tree """
+		self.buildSourceTree(self.test_root, TestSourceTree.test_tree)
+
+		source_tree = SourceTree('test_source', root=self.test_root)
+		self.assertTrue(source_tree.update(workers=4))
+		self.assertEqual(source_tree.walkTree(self.all_nodes_function), TestSourceTree.tree_format)
+		self.assertFalse(source_tree.update(workers=4))
+
+		# links to directories are not followed.
+		link_name = os.path.join(self.test_root, 'dir_item_7')
+		os.symlink(os.path.join(self.test_root, 'dir_item_2'), link_name)
+
+		self.assertTrue(source_tree.update())
+		found = source_tree.findItemNode(link_name)
+		self.assertTrue(found.isLink())
+		self.assertFalse(found.isDir())
+		self.assertFalse(found.hasChild())
+
+		os.unlink(link_name)
+
+	def test_ChildIndex(self):
+		""" Test that the child index follows the changes to the children """
+		source_tree = SourceTree('test_source', root=self.test_root)
+
+		for name in ['m', 'c', 'x', 'a', 'p']:
+			source_tree.addChildNode(SourceTree(name), mode=SourceTree.INSERT_ASCENDING)
+
+		self.assertEqual([child.name for child in source_tree.getChildren()], ['a', 'c', 'm', 'p', 'x'])
+		self.assertEqual(source_tree.child_names, ['a', 'c', 'm', 'p', 'x'])
+		self.assertEqual(source_tree.last_child_node.name, 'x')
+
+		# siblings added directly are indexed by the parent.
+		source_tree.findChild('c').addNodeAfter(SourceTree('d'))
+		self.assertTrue('d' in source_tree)
+
+		source_tree.findChild('m').deleteNode(False)
+		self.assertIsNone(source_tree.findChild('m'))
+		self.assertFalse('m' in source_tree)
+
+		# replace the last item and make sure the parent points at the new one.
+		new_node = SourceTree('x')
+		source_tree.findChild('x').replace(new_node)
+		self.assertIs(source_tree.findChild('x'), new_node)
+		self.assertIs(source_tree.last_child_node, new_node)
+
+		source_tree.addChildNode(SourceTree('b'), mode=SourceTree.INSERT_ASCENDING)
+		self.assertEqual([child.name for child in source_tree.getChildren()], ['a', 'b', 'c', 'd', 'p', 'x'])
+		self.assertEqual(source_tree.child_names, ['a', 'b', 'c', 'd', 'p', 'x'])
+
+		# a directory with lots of files.
+		for index in range(2000):
+			source_tree.addTreeNodeByPath(os.path.join('flat', 'file_%04d' % (1999 - index)))
+
+		flat = source_tree.findChild('flat')
+		self.assertEqual(flat.getNumberChildren(), 2000)
+		self.assertEqual(flat.child_node.name, 'file_0000')
+		self.assertEqual(flat.last_child_node.name, 'file_1999')
+		self.assertIs(source_tree.findItemNode(os.path.join('flat', 'file_1234')), flat.findChild('file_1234'))
+
+	def test_EmptyDirectoryRefill(self):
+		""" Test that a directory that has had all its children pruned can be filled again """
+		directory = os.path.join(self.test_root, 'd')
+		os.makedirs(directory)
+		open(os.path.join(directory, 'old_file'), 'w').close()
+
+		source_tree = SourceTree('st', root=self.test_root)
+		source_tree.update()
+		self.assertIsNotNone(source_tree.findItemNode(os.path.join(directory, 'old_file')))
+
+		os.unlink(os.path.join(directory, 'old_file'))
+		source_tree.update()
+		source_tree.prune()
+
+		node = source_tree.findChild('d')
+		self.assertIsNone(node.last_child_node)
+		self.assertEqual(node.child_names, [])
+
+		open(os.path.join(directory, 'new_file'), 'w').close()
+		source_tree.update()
+
+		self.assertEqual([child.name for child in node.getChildren()], ['new_file'])
+		self.assertEqual(node.child_names, ['new_file'])
+		self.assertIs(node.last_child_node, node.findChild('new_file'))
+
+	def test_Refresh(self):
+		""" Test the incremental refresh with and without inotify """
+		for use_inotify in [True, False]:
+			self.buildSourceTree(self.test_root, TestSourceTree.test_tree)
+
+			source_tree = SourceTree('test_source', root=self.test_root)
+			changed = source_tree.refresh(use_inotify)
+			self.assertEqual(len(changed), len(TestSourceTree.tree_format))
+			self.assertEqual(source_tree.refresh(), set())
+
+			# add a file and a directory with a file in it.
+			new_file = os.path.join(self.test_root, 'dir_item_2', 'new_file')
+			new_dir = os.path.join(self.test_root, 'dir_item_2', 'dir_item_0', 'new_dir')
+			open(new_file, 'w').close()
+			os.mkdir(new_dir)
+			open(os.path.join(new_dir, 'other_file'), 'w').close()
+
+			changed = source_tree.refresh()
+			self.assertEqual(set([item.getPath(True) for item in changed]),
+							set([new_file, new_dir, os.path.join(new_dir, 'other_file')]))
+
+			# files added to the new directory are seen.
+			open(os.path.join(new_dir, 'another_file'), 'w').close()
+			changed = source_tree.refresh()
+			self.assertEqual([item.getPath(True) for item in changed], [os.path.join(new_dir, 'another_file')])
+
+			# a directory that is deleted and made again is still watched.
+			shutil.rmtree(os.path.dirname(new_dir))
+			os.makedirs(new_dir)
+			open(os.path.join(new_dir, 'again'), 'w').close()
+
+			changed = source_tree.refresh()
+			self.assertIn(os.path.join(new_dir, 'again'), [item.getPath(True) for item in changed])
+			self.assertFalse(source_tree.findItemNode(os.path.join(new_dir, 'another_file')).isOnFileSystem())
+			self.assertEqual(source_tree.refresh(), set())
+
+			open(os.path.join(new_dir, 'later'), 'w').close()
+			changed = source_tree.refresh()
+			self.assertEqual([item.getPath(True) for item in changed], [os.path.join(new_dir, 'later')])
+
+			# remove a file.
+			old_file = os.path.join(self.test_root, 'dir_item_1', 'dir_item_0', 'dir_item_1')
+			os.unlink(old_file)
+			changed = source_tree.refresh()
+			self.assertEqual([item.getPath(True) for item in changed], [old_file])
+			self.assertFalse(source_tree.findItemNode(old_file).isOnFileSystem())
+
+			self.assertEqual(source_tree.refresh(), set())
+			source_tree.stopRefresh()
+
+			self.deleteTree(self.test_root)
+
+		# need the tree for the tearDown
+		os.makedirs(self.test_root)
+
 	def test_StateAddAndRemove(self):
 		""" Test that SCM state changes amend the tree correctly """
 		pass
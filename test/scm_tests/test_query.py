@@ -15,9 +15,15 @@
 # Import the external modules.
 #---------------------------------------------------------------------------------
 import os
+import sys
+import shutil
+import asyncio
+import tempfile
+import subprocess
 from beorn_lib.scm.scmbase import SCM_BASE
 from test.utils.repo_builder import writefile
-from beorn_lib.scm import scm, SCMStatus
+from beorn_lib.source_tree import SourceTree
+from beorn_lib.scm import scm, scmgit, scmp4, scmhg, aio, scm_cache, MultiRepo, Ref, SCMStatus, SCMItem, StatusEntry, StatusSnapshot
 from .scm_test import SCMTest
 
 #---------------------------------------------------------------------------------
@@ -134,6 +140,121 @@ class TestQuery(SCMTest):
 		"""
 		self.assertFalse(self.repo.getBranches() == [])
 
+	def test_getRefs(self):
+		""" Get Refs
+
+			The refs should have the same branches and tags as getBranches() and
+			getTags().
+		"""
+		refs = self.repo.getRefs()
+
+		branches = sorted([(item.name, item.commit_id) for item in self.repo.getBranches()[1] if item.remote is None])
+		tags = sorted([(item[1], item[0]) for item in self.repo.getTags()[1]])
+
+		self.assertEqual(branches, sorted([(item.name, item.commit_id) for item in refs if item.ref_type == 'branch']))
+
+		if self.scm_type == 'Git':
+			self.assertNotEqual([], branches)
+
+			# the annotated tags, show-ref and getTags() only have these.
+			self.assertEqual(tags, sorted([(item.name, item.commit_id) for item in refs if item.ref_type == 'tag' and item.commit_id != item.object_id]))
+
+			output = (	'1111111 refs/heads/master\n'
+						'2222222 refs/remotes/origin/HEAD\n'
+						'2222222 refs/remotes/origin/feature/one\n'
+						'3333333 refs/stash\n'
+						'4444444 refs/tags/light\n'
+						'5555555 refs/tags/v1.0\n'
+						'6666666 refs/tags/v1.0^{}\n')
+
+			self.assertEqual([	Ref('1111111', 'master', 'branch', '1111111', None),
+								Ref('2222222', 'feature/one', 'remote', '2222222', 'origin'),
+								Ref('4444444', 'light', 'tag', '4444444', None),
+								Ref('6666666', 'v1.0', 'tag', '5555555', None)], scmgit.decodeRefs(output))
+
+	def test_getStatusSnapshot(self):
+		""" Get Status Snapshot
+
+			The snapshot should have the changes in the working tree and the
+			index, and isRepositoryClean() and getTreeChanges() should agree
+			with it.
+		"""
+		if self.scm_type == 'Git':
+			self.assertTrue(self.repo.setVersion("branch_12"))
+
+			snapshot = self.repo.getStatusSnapshot()
+			self.assertEqual(([], [], [], []), (snapshot.staged, snapshot.unstaged, snapshot.untracked, snapshot.conflicted))
+			self.assertIsNotNone(snapshot.commit_id)
+			self.assertTrue(self.repo.isRepositoryClean())
+
+			# untracked files don't make the repository unclean.
+			self.assertTrue(writefile(os.path.join(self.directory, 'test 4'), text_data_1))
+			self.assertEqual(['test 4'], self.repo.getStatusSnapshot().untracked)
+			self.assertTrue(self.repo.isRepositoryClean())
+
+			self.assertTrue(writefile(os.path.join(self.directory, 'test_1'), text_data_1))
+			self.assertEqual([StatusEntry('M', 'test_1', None)], self.repo.getStatusSnapshot().unstaged)
+			self.assertFalse(self.repo.isRepositoryClean())
+
+			subprocess.check_call(['git', '-C', self.directory, 'add', 'test_1'])
+			subprocess.check_call(['git', '-C', self.directory, 'mv', 'test_2', 'test_5'])
+
+			snapshot = self.repo.getStatusSnapshot()
+			self.assertEqual([], snapshot.unstaged)
+			self.assertEqual([StatusEntry('M', 'test_1', None), StatusEntry('R', 'test_5', 'test_2')], snapshot.staged)
+			self.assertFalse(self.repo.isRepositoryClean())
+
+			self.assertEqual([	SCMStatus('M', 'test_1'),
+								SCMStatus('D', 'test_2'),
+								SCMStatus('A', 'test_5'),
+								SCMStatus('A', 'test 4')], self.repo.getTreeChanges())
+
+			# the cached snapshot is used until the index changes.
+			self.repo.setStatusCacheTime(60)
+			snapshot = self.repo.getStatusSnapshot()
+
+			self.assertTrue(writefile(os.path.join(self.directory, 'test_6'), text_data_1))
+			self.assertIs(snapshot, self.repo.getStatusSnapshot())
+
+			subprocess.check_call(['git', '-C', self.directory, 'add', 'test_6'])
+			self.assertIn(StatusEntry('A', 'test_6', None), self.repo.getStatusSnapshot().staged)
+
+			self.repo.setStatusCacheTime(0)
+			self.repo.cleanRepository(True)
+			self.assertTrue(self.repo.isRepositoryClean())
+
+			# the clean check only uses the full status when it is cached.
+			try:
+				self.repo.statusCommand = None
+				self.assertTrue(self.repo.isRepositoryClean())
+				self.assertIn('--untracked-files=no', self.repo.cleanCommand())
+
+				del self.repo.statusCommand
+				self.repo.setStatusCacheTime(60)
+				self.repo.getStatusSnapshot()
+
+				self.repo.cleanCommand = None
+				self.assertTrue(self.repo.isRepositoryClean())
+
+			finally:
+				self.repo.__dict__.pop('statusCommand', None)
+				self.repo.__dict__.pop('cleanCommand', None)
+				self.repo.setStatusCacheTime(0)
+
+			self.assertEqual((0, 0), scmgit.decodeStatusSnapshot(b'# branch.oid 1111111111111111111111111111111111111111\0# branch.ab +? -?\0')[3:5])
+
+			output = (	b'# branch.oid 1111111111111111111111111111111111111111\0'
+						b'# branch.head main\0'
+						b'# branch.upstream origin/main\0'
+						b'# branch.ab +2 -3\0'
+						b'1 .D N... 100644 100644 000000 1111111 1111111 gone\0'
+						b'u UU N... 100644 100644 100644 100644 1111111 2222222 3333333 both\0'
+						b'? new file\0')
+
+			self.assertEqual(StatusSnapshot('1111111111111111111111111111111111111111', 'main', 'origin/main', 2, 3,
+											[], [StatusEntry('D', 'gone', None)], ['new file'], [StatusEntry('UU', 'both', None)]),
+											scmgit.decodeStatusSnapshot(output))
+
 	def test_getBranch(self):
 		""" Test Get Branch
 
@@ -192,6 +313,35 @@ class TestQuery(SCMTest):
 
 		self.assertFalse(history_file != [] and default_file == history_file)
 
+	def test_getFiles(self):
+		""" Get Files
+
+			This function will test that getting a set of files returns the same
+			contents as getting them one at a time.
+		"""
+		if self.scm_type != 'P4':
+			self.assertTrue(self.repo.setVersion("branch_1"))
+
+		names = ["test_1", "test_2", "xxxxxxxxxxx"]
+		history = self.repo.getHistory("test_1")
+
+		for commit in [None, history[1][0]]:
+			files = self.repo.getFiles(names, commit)
+
+			self.assertEqual(names, list(files.keys()))
+
+			for name in names:
+				self.assertEqual(self.repo.getFile(name, commit), files[name])
+
+		self.assertEqual([], files["xxxxxxxxxxx"])
+		self.assertNotEqual([], files["test_1"])
+
+		if self.scm_type == 'Git':
+			# and the same via the batch process.
+			self.repo.setBatchMode(True)
+			self.assertEqual(files, self.repo.getFiles(names, history[1][0]))
+			self.repo.close()
+
 	def test_setgetVersion(self):
 		""" Set and Get Version Tests.
 
@@ -227,6 +377,83 @@ class TestQuery(SCMTest):
 			# P4 returns full history if the version did not exist.
 			self.assertTrue(self.repo.getHistory('test_1', '5555555555') == [])
 
+	def test_queryGenerators(self):
+		""" Query Generators
+
+			The generators should return the same items as the list functions
+			and should be able to be stopped before the end.
+		"""
+		self.assertEqual(self.repo.getHistory(), list(self.repo.getHistoryGenerator()))
+		self.assertEqual(self.repo.getHistory('test_2'), list(self.repo.getHistoryGenerator('test_2')))
+		self.assertEqual(self.repo.getHistory(max_entries=3), list(self.repo.getHistoryGenerator(max_entries=3)))
+		self.assertEqual([], list(self.repo.getHistoryGenerator('xxxxxxxxxx')))
+		self.assertEqual(self.repo.getCommitList(), list(self.repo.getCommitListGenerator()))
+
+		# the backends that do not stream take the same arguments.
+		hg_repo = scmhg.SCM_HG(None, working_dir = self.directory)
+		self.assertEqual([], list(hg_repo.getHistoryGenerator(max_entries = 3)))
+		self.assertEqual([], asyncio.run(aio.new(hg_repo).getHistory(max_entries = 3)))
+
+		# stop early, the rest of the history is not read.
+		generator = self.repo.getHistoryGenerator()
+		first = next(generator)
+		generator.close()
+		self.assertEqual(self.repo.getHistory()[0], first)
+
+		if self.scm_type != 'P4':
+			self.assertEqual(self.repo.getTreeChanges(from_version = 'HEAD~8'), list(self.repo.getTreeChangesGenerator(from_version = 'HEAD~8')))
+
+			listing = list(self.repo.getTreeListingGenerator())
+			self.assertTrue(SCMItem('file', 'test_1') in listing)
+			self.assertEqual([], [item for item in listing if item.type != 'file'])
+
+	def test_asyncQueries(self):
+		""" Async Queries
+
+			The async versions should return the same as the blocking functions,
+			and a cancelled query should kill the scm process.
+		"""
+		async_repo = aio.new(self.repo, 2)
+
+		async def queries():
+			return await asyncio.gather(async_repo.getBranches(),
+										async_repo.getTags(),
+										async_repo.getHistory('test_2'),
+										async_repo.getCommitList(),
+										async_repo.getTreeChanges(),
+										async_repo.getCurrentVersion(),
+										async_repo.isRepositoryClean())
+
+		(branches, tags, history, commits, changes, version, clean) = asyncio.run(queries())
+
+		self.assertEqual(self.repo.getRefs(), asyncio.run(async_repo.getRefs()))
+		self.assertEqual(self.repo.getStatusSnapshot(), asyncio.run(async_repo.getStatusSnapshot()))
+		self.assertEqual(self.repo.getBranches(), branches)
+		self.assertEqual(self.repo.getTags(), tags)
+		self.assertEqual(self.repo.getHistory('test_2'), history)
+		self.assertEqual(self.repo.getCommitList(), commits)
+		self.assertEqual(self.repo.getTreeChanges(), changes)
+		self.assertEqual(self.repo.getCurrentVersion(), version)
+		self.assertEqual(self.repo.isRepositoryClean(), clean)
+
+		async def cancelled():
+			task = asyncio.ensure_future(async_repo.runCommand([sys.executable, '-c', 'import time; time.sleep(30)']))
+
+			while len(async_repo.processes) == 0:
+				await asyncio.sleep(0.01)
+
+			process = next(iter(async_repo.processes))
+			task.cancel()
+
+			with self.assertRaises(asyncio.CancelledError):
+				await task
+
+			return process
+
+		process = asyncio.run(cancelled())
+		self.assertIsNotNone(process.returncode)
+		self.assertEqual(set(), async_repo.processes)
+
 	def test_searchCommits(self):
 		""" Search Commits.
 
@@ -310,6 +537,38 @@ class TestQuery(SCMTest):
 		modified = source_tree.walkTree(self.all_nodes_function)
 		self.assertTrue(modified[0][-1] == 'M' and len(modified) == 2)
 
+	def test_getSourceTreeSpaces(self):
+		""" Source Tree with spaces.
+
+			This function will test that the paths with spaces in them are added
+			to the source tree correctly and that the timings are recorded.
+		"""
+		if self.scm_type != 'P4':
+			os.mkdir(os.path.join(self.directory, 'space dir'))
+			self.assertTrue(writefile(os.path.join(self.directory, 'space dir', 'space file'), text_data_1))
+			self.assertTrue(writefile(os.path.join(self.directory, 'test_1'), text_data_1))
+
+			source_tree = self.repo.getSourceTree('HEAD')
+
+			new_file = source_tree.findItemNode(os.path.join('space dir', 'space file'))
+			self.assertIsNotNone(new_file)
+			self.assertEqual('A', new_file.getFlag())
+			self.assertTrue(new_file.isOnFilesystem())
+			self.assertTrue(new_file.getParent().isDir())
+
+			self.assertEqual('M', source_tree.findItemNode('test_1').getFlag())
+			self.assertIsNone(source_tree.findItemNode('test_2').getFlag())
+
+			timings = self.repo.getTimings('getSourceTree')
+			self.assertEqual(['listing', 'changes', 'build', 'total'], list(timings.keys()))
+
+			# the compact tree should be the same.
+			compact_tree = self.repo.getSourceTree('HEAD', compact=True)
+			self.assertEqual(source_tree.walkTree(self.all_nodes_function), compact_tree.walkTree(self.all_nodes_function))
+			self.assertEqual('A', compact_tree.findItemNode(os.path.join('space dir', 'space file')).getFlag())
+
+			self.repo.cleanRepository(True)
+
 	def test_checkObjectExists(self):
 		""" Test Object Existence.
 
@@ -340,6 +599,53 @@ class TestQuery(SCMTest):
 		if self.repo.getType() != 'P4':
 			self.assertFalse(self.repo.checkObjectExists("xxxxxxxxxxx", specific_commit))
 
+	def test_batchMode(self):
+		""" Test Batch Mode.
+
+			This function will test that reading files and checking that objects
+			exist gives the same results when using the long running batch
+			processes. It also checks that the batch process is restarted if it
+			dies.
+		"""
+		if self.scm_type == 'Git':
+			self.assertTrue(self.repo.setVersion("branch_1"))
+
+			default_file = self.repo.getFile("test_1")
+			history = self.repo.getHistory("test_1")
+			old_file = self.repo.getFile("test_1", history[1][0])
+
+			self.repo.setBatchMode(True)
+
+			self.assertEqual(default_file, self.repo.getFile("test_1"))
+			self.assertEqual(old_file, self.repo.getFile("test_1", history[1][0]))
+			self.assertEqual([], self.repo.getFile("xxxxxxxxxxx"))
+
+			self.assertTrue(self.repo.checkObjectExists("test_1"))
+			self.assertTrue(self.repo.checkObjectExists("test_1", "branch_1"))
+			self.assertFalse(self.repo.checkObjectExists("xxxxxxxxxxx"))
+
+			# a missing name with spaces is not an object, and does not restart the process.
+			process = self.repo.batch_reader.process
+			self.assertEqual([], self.repo.getFile("a blob"))
+			self.assertFalse(self.repo.checkObjectExists("a blob"))
+			self.assertFalse(self.repo.checkObjectExists("a blob 12"))
+			self.assertIs(process, self.repo.batch_reader.process)
+			self.assertEqual(default_file, self.repo.getFile("test_1"))
+
+			# kill the process - should be restarted.
+			self.repo.batch_reader.process.kill()
+			self.repo.batch_reader.process.wait()
+			self.assertEqual(default_file, self.repo.getFile("test_1"))
+
+			# should shutdown and restart cleanly.
+			self.repo.close()
+			self.assertIsNone(self.repo.batch_reader)
+			self.assertEqual(default_file, self.repo.getFile("test_1"))
+
+			self.repo.setBatchMode(False)
+			self.assertIsNone(self.repo.batch_reader)
+			self.assertEqual(default_file, self.repo.getFile("test_1"))
+
 	def test_getTreeChanges(self):
 		""" Get Tree Changes
 
@@ -419,6 +725,249 @@ class TestQuery(SCMTest):
 			self.assertEqual(1, len(diff))
 			self.assertEqual(4, len(diff[0].change_list))
 
+	def test_getDiffDetailsGenerator(self):
+		""" Get Diff Details Generator
+
+			The generator should give the same files as getDiffDetails.
+		"""
+		if self.scm_type != 'P4':
+			from_version = self.repo.generateRelativeReference('branch_9', -3)
+			expected = self.repo.getDiffDetails(from_version = from_version, to_version = 'branch_9')
+
+			self.assertNotEqual([], expected)
+			self.assertEqual(expected, list(self.repo.getDiffDetailsGenerator(from_version = from_version, to_version = 'branch_9')))
+
+			change_list = self.repo.getChangeList('branch_9')
+			self.assertNotEqual([], change_list.changes)
+			self.assertNotEqual([], change_list.description)
+
+	def test_discoveryCache(self):
+		""" Discovery Cache
+
+			The repository of a directory should be found from the cache without
+			checking the directories again, until a ".git" is added or removed.
+		"""
+		if self.scm_type == 'Git':
+			root = os.path.realpath(self.directory)
+			directory = os.path.join(root, 'discovery', 'inner')
+			os.makedirs(directory)
+			calls = []
+			supported = list(scm.supported_scms)
+
+			def counter(check_function):
+				def check(repository):
+					calls.append(repository)
+					return check_function(repository)
+
+				return check
+
+			try:
+				scm.supported_scms[:] = [item._replace(check_function = counter(item.check_function)) for item in supported if item.type == 'Git']
+				scm.clearDiscoveryCache()
+
+				self.assertEqual(('Git', root), scm.findRepositoryRoot(directory))
+				self.assertEqual(3, len(calls))
+
+				self.assertEqual(('Git', root), scm.findRepositoryRoot(directory))
+				self.assertEqual(('Git', root), scm.findRepositoryRoot(os.path.dirname(directory)))
+				self.assertEqual(3, len(calls))
+				self.assertEqual(root, scm.new(directory).getRoot())
+
+				# a new repository in the directory.
+				os.mkdir(os.path.join(directory, '.git'))
+				self.assertEqual(('Git', directory), scm.findRepositoryRoot(directory))
+				self.assertEqual(('Git', root), scm.findRepositoryRoot(os.path.dirname(directory)))
+
+				os.rmdir(os.path.join(directory, '.git'))
+				self.assertEqual(('Git', root), scm.findRepositoryRoot(directory))
+
+				calls[:] = []
+				self.assertEqual(('Git', root), scm.findRepositoryRoot(directory, use_cache = False))
+				self.assertEqual(3, len(calls))
+
+			finally:
+				scm.supported_scms[:] = supported
+				scm.clearDiscoveryCache()
+				shutil.rmtree(os.path.join(root, 'discovery'))
+
+			# an entry must not be used after a repository is created above it.
+			outside = os.path.realpath(tempfile.mkdtemp())
+			top = os.path.join(outside, 'disc', 'A')
+			inner = os.path.join(top, 'B')
+			os.makedirs(inner)
+
+			try:
+				scm.clearDiscoveryCache()
+				self.assertEqual((None, None), scm.findRepositoryRoot(inner))
+
+				subprocess.check_call(['git', 'init', '-q', top])
+				self.assertEqual(('Git', top), scm.findRepositoryRoot(top))
+				self.assertEqual(('Git', top), scm.findRepositoryRoot(inner))
+				self.assertEqual(scm.findRepositoryRoot(inner, use_cache = False), scm.findRepositoryRoot(inner))
+
+			finally:
+				scm.clearDiscoveryCache()
+				shutil.rmtree(outside)
+
+			# the paths that are not workspaces are only checked once.
+			scmp4.clearCheckCache()
+			self.assertFalse(scmp4.checkForType(directory + '_missing'))
+			self.assertNotIn(directory + '_missing', scmp4.negative_checks)
+
+			self.assertFalse(scmp4.checkForType(root))
+			self.assertIn(root, scmp4.negative_checks)
+			scmp4.clearCheckCache()
+
+	def test_multiRepo(self):
+		""" Multi Repo
+
+			The repositories and the worktrees in the tree should be found, but
+			not the ones in the filtered directories, and the queries should run
+			on all of them.
+		"""
+		if self.scm_type == 'Git':
+			tree = os.path.realpath(tempfile.mkdtemp())
+			old_filter = SourceTree.getDirectoryFilter()
+			git = ['git', '-c', 'user.name=test', '-c', 'user.email=test@test']
+
+			try:
+				for name in ['first', os.path.join('second', 'inner'), os.path.join('filtered', 'third')]:
+					directory = os.path.join(tree, name)
+					os.makedirs(directory)
+					subprocess.check_output(git + ['-C', directory, 'init', '-q'])
+					self.assertTrue(writefile(os.path.join(directory, 'file'), text_data_1))
+					subprocess.check_output(git + ['-C', directory, 'add', 'file'])
+					subprocess.check_output(git + ['-C', directory, 'commit', '-q', '-m', 'first'])
+
+				subprocess.check_output(git + ['-C', os.path.join(tree, 'first'), 'worktree', 'add', '-q', os.path.join(tree, 'first', 'work')])
+				self.assertTrue(writefile(os.path.join(tree, 'second', 'inner', 'file'), ['changed\n']))
+
+				# a link back up the tree should not be followed.
+				os.symlink(tree, os.path.join(tree, 'second', 'loop'))
+
+				SourceTree.setDirectoryFilter(['filtered'])
+
+				expected = ([os.path.join(tree, 'first'), os.path.join(tree, 'second', 'inner')], [os.path.join(tree, 'first', 'work')])
+				self.assertEqual(expected, scmgit.SCM_GIT.findAllReposInTree(tree))
+				self.assertEqual(expected, scmgit.SCM_GIT.findAllReposInTree(tree, 4))
+
+				multi_repo = MultiRepo(tree, workers = 4, wanted = ['Git'])
+				self.assertEqual(expected[0] + expected[1], multi_repo.discover())
+
+				results = multi_repo.runAll('isRepositoryClean')
+				self.assertEqual([True, False, True], [item.result for item in results.values()])
+
+				snapshots = dict([(item.directory, item.result) for item in multi_repo.getStatusSnapshots()])
+				self.assertEqual(['file'], [entry.path for entry in snapshots[os.path.join(tree, 'second', 'inner')].unstaged])
+
+				def failing(scm_object):
+					raise ValueError(scm_object.getRoot())
+
+				for item in multi_repo.run(failing):
+					self.assertIsNone(item.result)
+					self.assertEqual(ValueError(item.directory).args, item.error.args)
+
+				multi_repo.close()
+
+			finally:
+				SourceTree.setDirectoryFilter(old_filter)
+				shutil.rmtree(tree)
+
+	def test_cachedSCM(self):
+		""" Cached SCM
+
+			The immutable results should be read from the memory then the disk
+			cache, the results for the working tree should not be cached.
+		"""
+		if self.scm_type != 'P4':
+			cache_dir = tempfile.mkdtemp()
+
+			try:
+				# the scm is called with the commits that the versions resolved to.
+				from_version = self.repo.generateRelativeReference('branch_9', -3)
+				expected = self.repo.getDiffDetails(from_version = self.repo.resolveImmutableVersion(from_version), to_version = self.repo.resolveImmutableVersion('branch_9'))
+
+				cached = scm_cache.CachedSCM(self.repo, scm_cache.SCMCache(cache_dir))
+				self.assertEqual(expected, cached.getDiffDetails(from_version = from_version, to_version = 'branch_9'))
+				self.assertEqual(expected, cached.getDiffDetails(from_version = from_version, to_version = 'branch_9'))
+				self.assertEqual(self.repo.getFile('test_1', 'branch_9'), cached.getFile('test_1', 'branch_9'))
+
+				counters = cached.getCounters()
+				self.assertEqual(2, counters['misses'])
+				self.assertEqual(1, counters['memory_hits'])
+
+				# other calls go to the scm.
+				self.assertEqual(self.repo.getBranch(), cached.getBranch())
+
+				# the working tree can change.
+				cached.getDiffDetails()
+				self.assertEqual(1, cached.getCounters()['uncacheable'])
+
+				# the entries are on the disk.
+				cached.cache.close()
+				cached = scm_cache.CachedSCM(self.repo, scm_cache.SCMCache(cache_dir))
+
+				self.assertEqual(expected, cached.getDiffDetails(from_version = from_version, to_version = 'branch_9'))
+				self.assertEqual(1, cached.getCounters()['disk_hits'])
+
+				self.assertEqual(40, len(self.repo.resolveImmutableVersion('branch_9')))
+				self.assertEqual(None, self.repo.resolveImmutableVersion('not_a_branch'))
+
+				# a full hash is only resolved once, a branch every time.
+				resolved = []
+				commit_hash = self.repo.resolveImmutableVersion('branch_9')
+				resolve_function = self.repo.resolveImmutableVersion
+				memory_cached = scm_cache.CachedSCM(self.repo)
+
+				try:
+					self.repo.resolveImmutableVersion = lambda version: resolved.append(version) or resolve_function(version)
+
+					for index in range(3):
+						self.assertEqual(self.repo.getFile('test_1', commit_hash), memory_cached.getFile('test_1', commit_hash))
+						self.assertEqual(self.repo.getFile('test_1', 'branch_9'), memory_cached.getFile('test_1', 'branch_9'))
+
+				finally:
+					del self.repo.resolveImmutableVersion
+
+				self.assertEqual([commit_hash] + ['branch_9'] * 3, resolved)
+
+				# the ref moves after it was resolved, the result is for the resolved commit.
+				old_hash = self.repo.resolveImmutableVersion('branch_9~1')
+				subprocess.check_call(['git', '-C', self.directory, 'branch', '-f', 'moving', old_hash])
+				memory_cached = scm_cache.CachedSCM(self.repo)
+
+				def moveAfterResolve(version):
+					result = resolve_function(version)
+					subprocess.check_call(['git', '-C', self.directory, 'branch', '-f', 'moving', 'branch_9'])
+					return result
+
+				try:
+					self.repo.resolveImmutableVersion = moveAfterResolve
+					details = memory_cached.getCommitDetails('moving')
+
+				finally:
+					del self.repo.resolveImmutableVersion
+					subprocess.check_call(['git', '-C', self.directory, 'branch', '-D', '-q', 'moving'])
+
+				self.assertEqual(self.repo.getCommitDetails(old_hash), details)
+				self.assertNotEqual(self.repo.getCommitDetails('branch_9'), details)
+
+				# a tiny cache has to evict.
+				cached.cache.close()
+				cache = scm_cache.SCMCache(cache_dir, memory_size = 100, disk_size = 100)
+				self.assertTrue(cache.disk_used <= 100)
+
+				for index in range(3):
+					cache.put(str(index), 'x' * 40)
+
+				self.assertEqual((False, None), cache.get('0'))
+				self.assertEqual((True, 'x' * 40), cache.get('2'))
+				self.assertTrue(cache.getCounters()['evictions'] > 0)
+				cache.close()
+
+			finally:
+				shutil.rmtree(cache_dir)
+
 	def test_getTreeChangeDetails(self):
 		""" Get Tree Changes Details
 
@@ -432,5 +981,8 @@ class TestQuery(SCMTest):
 			self.assertEqual(2, len(diff[1]))
 			self.assertEqual(1, len(diff[2]))
 
+			# the same when parsed by the worker processes.
+			self.assertEqual(diff, self.repo.getTreeChangeDetails(from_version = self.repo.generateRelativeReference('branch_9', -3), to_version = 'branch_9', workers = 2))
+
 # vim: ts=4 sw=4 noexpandtab nocin ai
 
@@ -17,6 +17,7 @@
 # Import the external modules.
 #---------------------------------------------------------------------------------
 import unittest
+import subprocess
 import beorn_lib.scm as scm
 from beorn_lib.scm.bigraph import BIGRAPH as BIGRAPH
 from .scm_test import SCMTest
@@ -42,6 +43,210 @@ class TestSearch(SCMTest):
 			self.assertNotEqual(graph.index, [], "Graph index is empty, and should have elements in it")
 			self.assertEqual(len(graph.index), 50, "Graph index has the wrong number of commits in it.")
 
+	def test_BiGraphEntries(self):
+		""" BIGRAPH Entries Test
+
+			The entries are views of the graph arrays, the parents and the
+			children must agree and the branches walk back to the root.
+		"""
+		if self.scm_type == 'P4':
+			unittest.skip("No testing for P4")
+		else:
+			test = scm.new(self.directory)
+			graph = BIGRAPH.buildGraph(test)
+
+			for entry in graph.index:
+				self.assertEqual(entry, graph.nodes[entry.commit_id])
+
+				for parent in entry.parents:
+					self.assertIn(entry, parent.children)
+
+				for child in entry.children:
+					self.assertIn(entry, child.parents)
+
+			# the branches are attached to their commits
+			self.assertIn('branch_0', graph.nodes[graph.branches['branch_0']].branches)
+
+			history = graph.retrieveBranch(graph.branches['branch_10'])
+			found = set([item.version for item in history])
+
+			self.assertEqual(graph.branches['branch_10'], history[0].version)
+			self.assertIn(graph.head, found)
+
+			for item in history:
+				self.assertTrue(set(item.parents) <= found)
+
+	def test_BiGraphCache(self):
+		""" BIGRAPH Cache Test
+
+			The saved graph should be loaded, and if the references have moved
+			only the new commits should be added to it.
+		"""
+		if self.scm_type == 'P4':
+			unittest.skip("No testing for P4")
+		else:
+			test = scm.new(self.directory)
+			full = BIGRAPH.buildGraph(test, use_cache = False)
+			cache_file = BIGRAPH.cacheFile(test)
+
+			# save a graph that only has the commits of branch_1.
+			history = set([item.version for item in full.retrieveBranch(full.branches['branch_1'])])
+			partial = BIGRAPH()
+			partial.addCommits([commit for commit in test.getCommitList() if commit.commit_id in history])
+			partial.tips = set([full.branches['branch_1']])
+			self.assertTrue(partial.save(cache_file))
+
+			self.assertEqual(len(history), len(BIGRAPH.load(cache_file).index))
+			self.assertEqual([], test.getCommitList(exclude = list(full.tips)))
+
+			for graph in [BIGRAPH.buildGraph(test), BIGRAPH.buildGraph(test)]:
+				self.assertEqual(set(full.nodes), set(graph.nodes))
+
+				for commit_id in full.nodes:
+					self.assertEqual(	[entry.commit_id for entry in full.nodes[commit_id].parents],
+										[entry.commit_id for entry in graph.nodes[commit_id].parents])
+					self.assertEqual(	sorted([entry.commit_id for entry in full.nodes[commit_id].children]),
+										sorted([entry.commit_id for entry in graph.nodes[commit_id].children]))
+
+			self.assertEqual(full.tips, BIGRAPH.load(cache_file).tips)
+
+	def test_BiGraphCommonAncestors(self):
+		""" BIGRAPH Common Ancestors Test
+
+			The common ancestors and the ancestor test should agree with git.
+		"""
+		if self.scm_type == 'P4':
+			unittest.skip("No testing for P4")
+		else:
+			test = scm.new(self.directory)
+			graph = BIGRAPH.buildGraph(test, use_cache = False)
+			generations = graph.getGenerations()
+
+			for entry in graph.index:
+				for parent in entry.parents:
+					self.assertTrue(generations[parent.node] < generations[entry.node])
+
+			names = sorted(graph.branches)
+
+			for (first, second) in zip(names, names[1:] + names[:1]):
+				output = subprocess.check_output(['git', '-C', self.directory, 'merge-base', '--all', first, second])
+				expected = output.decode().split()
+				result = graph.commonAncestors([graph.branches[first], graph.branches[second]])
+
+				# git gives the full hashes.
+				self.assertEqual(len(expected), len(result))
+
+				for commit_id in result:
+					self.assertEqual(1, len([commit_hash for commit_hash in expected if commit_hash.startswith(commit_id)]))
+
+				for commit_id in result:
+					self.assertTrue(graph.isAncestor(commit_id, graph.branches[first]))
+					self.assertTrue(graph.isAncestor(commit_id, graph.branches[second]))
+
+				code = subprocess.call(['git', '-C', self.directory, 'merge-base', '--is-ancestor', first, second])
+				self.assertEqual(code == 0, graph.isAncestor(graph.branches[first], graph.branches[second]))
+
+	def test_BiGraphReachable(self):
+		""" BIGRAPH Reachable Test
+
+			The reachability functions should agree with git.
+		"""
+		if self.scm_type == 'P4':
+			unittest.skip("No testing for P4")
+		else:
+			test = scm.new(self.directory)
+			graph = BIGRAPH.buildGraph(test, use_cache = False)
+			names = sorted(graph.branches)
+
+			for (first, second) in zip(names, names[1:] + names[:1]):
+				output = subprocess.check_output(['git', '-C', self.directory, 'rev-list', '--abbrev-commit', first, '^' + second])
+				result = graph.sinceForkPoint(first, second)
+
+				self.assertEqual(sorted(output.decode().split()), sorted(result))
+				self.assertEqual(result, graph.reachable([graph.branches[first]], [graph.branches[second]]))
+
+			# the tags containing a commit.
+			graph.tags = {'tag_1': graph.branches['branch_1'], 'tag_10': graph.branches['branch_10'], 'also_10': graph.branches['branch_10']}
+			graph.attachReferences()
+
+			for entry in graph.index:
+				expected = sorted([name for (name, commit_id) in graph.tags.items() if graph.isAncestor(entry.commit_id, commit_id)])
+				self.assertEqual(expected, graph.tagsContaining(entry.commit_id))
+
+			self.assertEqual(['also_10', 'tag_10'], graph.tagsContaining(graph.branches['branch_10']))
+			self.assertEqual(['also_10', 'tag_10'], sorted(graph.nodes[graph.branches['branch_10']].tags))
+			self.assertEqual(graph.retrieveBranch(graph.branches['branch_10']), graph.searchByTags(['tag_10']))
+			self.assertEqual(graph.retrieveBranch(graph.branches['branch_10']), graph.searchByTags(['also_10']))
+			self.assertEqual([], graph.searchByTags(['tag_10', 'not_a_tag']))
+
+			# following the first parents only.
+			first_parents = graph.retrieveBranch(graph.branches['branch_10'], stop_at_merge = True)
+
+			for (item, parent) in zip(first_parents, first_parents[1:]):
+				self.assertEqual(parent.version, item.parents[0])
+
+			# two tags on one commit, read from git.
+			try:
+				for name in ['two_tags_1', 'two_tags_2']:
+					subprocess.check_output(['git', '-C', self.directory, 'tag', name, 'branch_5'])
+
+				tagged = BIGRAPH.buildGraph(test, use_cache = False)
+				commit_id = tagged.branches['branch_5']
+
+				self.assertEqual(commit_id, tagged.tags['two_tags_1'])
+				self.assertEqual(commit_id, tagged.tags['two_tags_2'])
+				self.assertEqual(['two_tags_1', 'two_tags_2'], sorted(tagged.nodes[commit_id].tags))
+				self.assertEqual(['two_tags_1', 'two_tags_2'], tagged.tagsContaining(commit_id))
+				self.assertEqual(tagged.retrieveBranch(commit_id), tagged.searchByTags(['two_tags_2']))
+
+			finally:
+				subprocess.call(['git', '-C', self.directory, 'tag', '-d', 'two_tags_1', 'two_tags_2'], stdout=subprocess.DEVNULL)
+
+	def test_BiGraphLayout(self):
+		""" BIGRAPH Layout Test
+
+			Each edge from a commit should follow its lane down to the row of
+			the parent, and the rows of a window should be the same as the rows
+			of the full layout.
+		"""
+		if self.scm_type == 'P4':
+			unittest.skip("No testing for P4")
+		else:
+			test = scm.new(self.directory)
+			graph = BIGRAPH.buildGraph(test)
+			layout = graph.layout()
+			rows = layout.getRows()
+
+			self.assertEqual(len(graph.index), len(rows))
+
+			for (row, layout_row) in enumerate(rows):
+				self.assertEqual(row, layout.getRow(layout_row.commit_id))
+				parents = [entry.commit_id for entry in graph.nodes[layout_row.commit_id].parents]
+
+				for (parent, (from_column, to_column)) in zip(parents, layout_row.edges):
+					self.assertEqual(layout_row.column, from_column)
+					lane = to_column
+
+					for next_row in rows[row + 1:layout.getRow(parent)]:
+						self.assertIn(lane, next_row.lanes)
+						lane = [to_column for (from_column, to_column) in next_row.edges if from_column == lane][0]
+
+					self.assertEqual(lane, rows[layout.getRow(parent)].column)
+
+			window = graph.layout()
+
+			for start in [30, 0, 45, 10]:
+				self.assertEqual(rows[start:start + 8], window.getRows(start, 8))
+
+			self.assertEqual(len(layout.render()), len([line for line in layout.render() if line.strip() != '']))
+
+			# only the commits of the branch.
+			history = graph.retrieveBranch(graph.branches['branch_10'])
+			branch_layout = graph.layout([graph.branches['branch_10']])
+
+			self.assertEqual([item.version for item in history], [layout_row.commit_id for layout_row in branch_layout.getRows()])
+			self.assertEqual(-1, branch_layout.getRow(graph.branches['branch_0']))
+
 	def test_BiGraphSearch(self):
 		""" BIGRAPH Search Test
 
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#---------------------------------------------------------------------------------
+#
+#                    ,--.
+#                    |  |-.  ,---.  ,---. ,--.--.,--,--,
+#                    | .-. '| .-. :| .-. ||  .--'|      \
+#                    | `-' |\   --.' '-' '|  |   |  ||  |
+#                     `---'  `----' `---' `--'   `--''--'
+#
+#    file: fake_p4
+#    desc: A fake "p4" command for testing.
+#
+#          This answers the p4 commands that SCM_P4 uses from a depot that is
+#          described by a json file, so SCM_P4 can be tested without a server.
+#          The depot file is given by $FAKE_P4_DEPOT:
+#
+#          {	"clients": [{"client": "name", "Root": "/path", ...}],
+#          	"files": {"dir/name": {"change": "1", "text": "contents", "diff": "..."}},
+#          	"changes": {"1": {"status": "submitted", "desc": "text", "describe": "..."}}	}
+#
+#          If $FAKE_P4_LOG is set then each command is written to it as a json
+#          line of the arguments and the "-x" input, so the tests can count the
+#          p4 processes. The line also has the time that the input was read,
+#          and if $FAKE_P4_DELAY is set the command waits that many seconds
+#          before it answers, so the tests can see which processes overlap.
+#
+#  author: Peter Antoine
+#    date: 18/10/2026
+#---------------------------------------------------------------------------------
+#                     Copyright (c) 2026 Peter Antoine
+#                           All rights Reserved.
+#                      Released Under the MIT Licence
+#---------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import marshal
+
+GLOBAL_OPTIONS = ['-d', '-c', '-p', '-u', '-P', '-x']
+VALUE_OPTIONS = ['-m', '-u']
+
+def writeRecord(record, marshalled):
+	if record['code'] == 'raw':
+		# p4 writes the diffs as text between the records.
+		sys.stdout.buffer.write(record['data'].encode())
+	elif marshalled:
+		sys.stdout.buffer.write(marshal.dumps(record, 0))
+	elif record['code'] == 'error':
+		sys.stderr.write(record['data'])
+	elif record['code'] == 'text':
+		sys.stdout.write(record['data'])
+	else:
+		sys.stdout.write(' '.join([str(record[key]) for key in sorted(record) if key != 'code']) + '\n')
+
+def errorRecord(text):
+	return {'code': 'error', 'data': text + '\n', 'severity': 2, 'generic': 17}
+
+def splitPath(path):
+	""" returns (depot relative name, change or None) for a client or depot path """
+	change = None
+
+	if '@' in path:
+		(path, change) = path.split('@', 1)
+
+	elif '#' in path:
+		path = path.split('#', 1)[0]
+
+	if path.startswith('//'):
+		path = path[2:].split('/', 1)[1] if '/' in path[2:] else ''
+
+	return (path, change)
+
+def matchFiles(depot, path):
+	""" returns the files that the path matches, at the change in the path """
+	(name, change) = splitPath(path)
+	result = []
+
+	for (file_name, details) in sorted(depot['files'].items()):
+		if change is not None and change.isdigit() and int(details['change']) > int(change):
+			continue
+
+		if name.endswith('...'):
+			found = file_name.startswith(name[:-3])
+		elif name.endswith('*'):
+			found = file_name.startswith(name[:-1]) and '/' not in file_name[len(name) - 1:]
+		else:
+			found = file_name == name
+
+		if found:
+			result.append((file_name, details))
+
+	return result
+
+def fileRecord(file_name, details):
+	return {	'code': 'stat',
+				'depotFile': '//depot/' + file_name,
+				'rev': '1',
+				'change': details['change'],
+				'action': 'add',
+				'type': 'text'}
+
+def changeRecord(change, details):
+	result = {'code': 'stat', 'change': change, 'time': '0', 'user': 'fake', 'client': 'fake'}
+	result.update(details)
+	return result
+
+def splitArguments(arguments):
+	""" returns (options, paths) of the command arguments """
+	options = {}
+	paths = []
+	index = 0
+
+	while index < len(arguments):
+		if arguments[index] in VALUE_OPTIONS:
+			options[arguments[index]] = arguments[index + 1]
+			index += 2
+
+		elif arguments[index].startswith('-'):
+			options[arguments[index]] = None
+			index += 1
+
+		else:
+			paths.append(arguments[index])
+			index += 1
+
+	return (options, paths)
+
+def runCommand(depot, command, arguments):
+	""" returns the records for the command """
+	result = []
+	(options, paths) = splitArguments(arguments)
+
+	if command == 'clients':
+		for client in depot['clients']:
+			record = {'code': 'stat', 'Update': '0', 'Access': '0', 'Owner': 'fake', 'Options': 'noallwrite', 'Description': 'fake\n'}
+			record.update(client)
+			result.append(record)
+
+	elif command == 'files':
+		for path in paths:
+			found = matchFiles(depot, path)
+			result.extend([fileRecord(file_name, details) for (file_name, details) in found])
+
+			if len(found) == 0:
+				result.append(errorRecord(path + ' - no such file(s).'))
+
+	elif command == 'dirs':
+		for path in paths:
+			(name, change) = splitPath(path)
+			prefix = name.rstrip('*')
+			found = sorted(set([file_name[len(prefix):].split('/')[0] for file_name in depot['files'] if file_name.startswith(prefix) and '/' in file_name[len(prefix):]]))
+			result.extend([{'code': 'stat', 'dir': '//depot/' + prefix + item} for item in found])
+
+			if len(found) == 0:
+				result.append(errorRecord(path + ' - no such file(s).'))
+
+	elif command == 'print':
+		for path in paths:
+			found = matchFiles(depot, path)
+
+			for (file_name, details) in found:
+				result.append(fileRecord(file_name, details))
+				result.append({'code': 'text', 'data': details['text']})
+
+			if len(found) == 0:
+				result.append(errorRecord(path + ' - no such file(s).'))
+
+	elif command == 'diff' or command == 'diff2':
+		for (file_name, details) in matchFiles(depot, paths[0]):
+			result.append(fileRecord(file_name, details))
+
+			if 'diff' in details:
+				result.append({'code': 'raw', 'data': details['diff']})
+
+	elif command == 'describe':
+		for change in paths:
+			if change in depot['changes'] and '-du' in options and 'describe' in depot['changes'][change]:
+				# the text of "describe -du" is not faked, it is in the depot.
+				result.append({'code': 'raw', 'data': depot['changes'][change]['describe']})
+
+			elif change in depot['changes']:
+				result.append(changeRecord(change, depot['changes'][change]))
+			else:
+				result.append(errorRecord(change + ' - no such changelist.'))
+
+	elif command == 'changes':
+		changes = sorted(depot['changes'], key=int, reverse=True)
+
+		if '-m' in options:
+			changes = changes[:int(options['-m'])]
+
+		result.extend([changeRecord(change, depot['changes'][change]) for change in changes])
+
+	else:
+		result.append(errorRecord('Unknown command.  Try \'p4 help\' for info.'))
+
+	return result
+
+def main(argv):
+	marshalled = False
+	batched = None
+	index = 0
+
+	while index < len(argv) and argv[index].startswith('-'):
+		if argv[index] == '-G':
+			marshalled = True
+			index += 1
+
+		elif argv[index] in GLOBAL_OPTIONS:
+			if argv[index] == '-x':
+				batched = argv[index + 1]
+
+			index += 2
+
+		else:
+			index += 1
+
+	command = argv[index] if index < len(argv) else 'help'
+	arguments = argv[index + 1:]
+	lines = []
+
+	if batched == '-':
+		lines = [line.rstrip('\n') for line in sys.stdin if line.strip() != '']
+	elif batched is not None:
+		with open(batched) as f:
+			lines = [line.rstrip('\n') for line in f if line.strip() != '']
+
+	if 'FAKE_P4_LOG' in os.environ:
+		with open(os.environ['FAKE_P4_LOG'], 'a') as f:
+			f.write(json.dumps({'command': argv, 'input': lines, 'time': time.time()}) + '\n')
+
+	if 'FAKE_P4_DELAY' in os.environ:
+		time.sleep(float(os.environ['FAKE_P4_DELAY']))
+
+	if command == 'login':
+		sys.stdout.write('User fake ticket expires in 12 hours 0 minutes.\n')
+		return 0
+
+	with open(os.environ['FAKE_P4_DEPOT']) as f:
+		depot = json.load(f)
+
+	records = runCommand(depot, command, arguments + lines)
+
+	for record in records:
+		writeRecord(record, marshalled)
+
+	if len([record for record in records if record['code'] == 'error']) > 0 and not marshalled:
+		return 1
+	else:
+		return 0
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv[1:]))
+
+# vim: ts=4 sw=4 noexpandtab nocin ai